@@ -1,14 +1,13 @@
 # STDLIB
-from typing import Optional, Union
+from typing import Any, Callable, Optional, Union
 
+import collections
 import logging
 import logging.handlers
+import os
 import sys
-import textwrap
-from typing import Dict
-
-# EXT
-import humanfriendly.cli  # type: ignore  # noqa
+import threading
+from typing import Dict, List, NamedTuple, Tuple
 
 # OWN
 import lib_parameter
@@ -17,14 +16,20 @@ import lib_parameter
 # imports for local pytest
 try:
     from .log_config import log_settings
+    from . import log_config
     from . import log_handlers
     from . import log_levels
+    from . import log_rate_limit
     from . import log_traceback
+    from . import log_wrap
 except ImportError:  # pragma: no cover
     from log_config import log_settings  # type: ignore # pragma: no cover
+    import log_config  # type: ignore # pragma: no cover
     import log_handlers  # type: ignore # pragma: no cover
     import log_levels  # type: ignore # pragma: no cover
+    import log_rate_limit  # type: ignore # pragma: no cover
     import log_traceback  # type: ignore # pragma: no cover
+    import log_wrap  # type: ignore # pragma: no cover
 
 
 # Custom Types
@@ -32,12 +37,14 @@ FieldAndLevelStyles = Dict[str, Dict[str, Union[str, bool]]]
 
 
 def banner_spam(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner SPAM
@@ -45,16 +52,21 @@ def banner_spam(
     >>> banner_spam('spam')
 
     """
-    log_level(message=message, level=log_levels.SPAM, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.SPAM, logger, quiet):
+        log_level(
+            message=message, level=log_levels.SPAM, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_debug(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner DEBUG
@@ -62,16 +74,21 @@ def banner_debug(
     >>> banner_debug('debug')
 
     """
-    log_level(message=message, level=logging.DEBUG, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.DEBUG, logger, quiet):
+        log_level(
+            message=message, level=logging.DEBUG, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_verbose(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner VERBOSE
@@ -79,16 +96,21 @@ def banner_verbose(
     >>> banner_verbose('verbose')
 
     """
-    log_level(message=message, level=log_levels.VERBOSE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.VERBOSE, logger, quiet):
+        log_level(
+            message=message, level=log_levels.VERBOSE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_info(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner INFO
@@ -96,16 +118,21 @@ def banner_info(
     >>> banner_info('info')
 
     """
-    log_level(message=message, level=logging.INFO, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.INFO, logger, quiet):
+        log_level(
+            message=message, level=logging.INFO, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_notice(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner NOTICE
@@ -113,16 +140,21 @@ def banner_notice(
     >>> banner_notice('notice')
 
     """
-    log_level(message=message, level=log_levels.NOTICE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.NOTICE, logger, quiet):
+        log_level(
+            message=message, level=log_levels.NOTICE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_success(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner SUCCESS
@@ -130,16 +162,21 @@ def banner_success(
     >>> banner_success('success')
 
     """
-    log_level(message=message, level=log_levels.SUCCESS, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.SUCCESS, logger, quiet):
+        log_level(
+            message=message, level=log_levels.SUCCESS, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_warning(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner WARNING
@@ -147,16 +184,21 @@ def banner_warning(
     >>> banner_warning('warning')
 
     """
-    log_level(message=message, level=logging.WARNING, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.WARNING, logger, quiet):
+        log_level(
+            message=message, level=logging.WARNING, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_error(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner ERROR
@@ -164,16 +206,21 @@ def banner_error(
     >>> banner_error('error')
 
     """
-    log_level(message=message, level=logging.ERROR, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.ERROR, logger, quiet):
+        log_level(
+            message=message, level=logging.ERROR, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def banner_critical(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a banner CRITICAL
@@ -181,16 +228,21 @@ def banner_critical(
     >>> banner_critical('critical')
 
     """
-    log_level(message=message, level=logging.CRITICAL, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.CRITICAL, logger, quiet):
+        log_level(
+            message=message, level=logging.CRITICAL, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_spam(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs SPAM
@@ -198,16 +250,21 @@ def log_spam(
     >>> log_spam('spam')
 
     """
-    log_level(message=message, level=log_levels.SPAM, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.SPAM, logger, quiet):
+        log_level(
+            message=message, level=log_levels.SPAM, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_debug(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs DEBUG
@@ -215,16 +272,21 @@ def log_debug(
     >>> log_debug('debug')
 
     """
-    log_level(message=message, level=logging.DEBUG, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.DEBUG, logger, quiet):
+        log_level(
+            message=message, level=logging.DEBUG, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_verbose(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs VERBOSE
@@ -232,16 +294,21 @@ def log_verbose(
     >>> log_verbose('verbose')
 
     """
-    log_level(message=message, level=log_levels.VERBOSE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.VERBOSE, logger, quiet):
+        log_level(
+            message=message, level=log_levels.VERBOSE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_info(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs INFO
@@ -249,16 +316,21 @@ def log_info(
     >>> log_info('info')
 
     """
-    log_level(message=message, level=logging.INFO, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.INFO, logger, quiet):
+        log_level(
+            message=message, level=logging.INFO, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_notice(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs NOTICE
@@ -266,16 +338,21 @@ def log_notice(
     >>> log_notice('notice')
 
     """
-    log_level(message=message, level=log_levels.NOTICE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.NOTICE, logger, quiet):
+        log_level(
+            message=message, level=log_levels.NOTICE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_success(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs SUCCESS
@@ -283,16 +360,21 @@ def log_success(
     >>> log_success('success')
 
     """
-    log_level(message=message, level=log_levels.SUCCESS, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(log_levels.SUCCESS, logger, quiet):
+        log_level(
+            message=message, level=log_levels.SUCCESS, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_warning(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs WARNING
@@ -300,16 +382,21 @@ def log_warning(
     >>> log_warning('warning')
 
     """
-    log_level(message=message, level=logging.WARNING, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.WARNING, logger, quiet):
+        log_level(
+            message=message, level=logging.WARNING, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_error(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs ERROR
@@ -317,16 +404,21 @@ def log_error(
     >>> log_error('error')
 
     """
-    log_level(message=message, level=logging.ERROR, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.ERROR, logger, quiet):
+        log_level(
+            message=message, level=logging.ERROR, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
 
 
 def log_critical(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs CRITICAL
@@ -335,23 +427,57 @@ def log_critical(
 
     """
 
-    log_level(message=message, level=logging.CRITICAL, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner)
+    if is_enabled(logging.CRITICAL, logger, quiet):
+        log_level(
+            message=message, level=logging.CRITICAL, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+def is_enabled(level: int, logger: Optional[logging.Logger] = None, quiet: Optional[bool] = None) -> bool:
+    """
+    returns if log_level would log a message with that level - checks the quiet flag and logger.isEnabledFor,
+    the log_* and banner_* helpers call it before they pass all the parameters to log_level
+
+    >>> logger = logging.getLogger('test_is_enabled')
+    >>> logger.setLevel(logging.INFO)
+    >>> is_enabled(logging.DEBUG, logger)
+    False
+    >>> is_enabled(logging.INFO, logger)
+    True
+    >>> is_enabled(logging.INFO, logger, quiet=True)
+    False
+
+    """
+    if quiet is None:
+        quiet = log_settings.quiet
+    if quiet:
+        return False
+    if logger is None:
+        logger = logging.getLogger()
+    return logger.isEnabledFor(level)
 
 
 def log_level(
-    message: str,
+    message: Union[str, Callable[[], Any]],
     level: Optional[int] = None,
     width: Optional[int] = None,
     wrap: Optional[bool] = None,
     logger: Optional[logging.Logger] = None,
     quiet: Optional[bool] = None,
     banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
 ) -> None:
     """
     logs a message
 
     if there is no logger passed, the root logger will be used.
 
+    the message can be a callable without arguments which returns the message, and/or a %-style format with args.
+    those lazy messages are only built if the level is enabled, and they are logged as one LogRecord (like single_record)
+    with a LazyMessage as msg - the message is built and wrapped when the record is formatted, with async handlers
+    in the writer thread (see log_handlers.set_async_handlers).
+
     >>> logger = logging.getLogger()
     >>> log_level('test')
     >>> log_level('test', quiet=True)
@@ -369,50 +495,318 @@ def log_level(
                    logging.ERROR, width=10, wrap=True, banner = True)
     >>> log_level('this is\\none nice piece of ham\\none nice piece of spam\\none more piece of wonderful spam', \
                    logging.ERROR, width=10, wrap=False, banner = True)
-    """
 
-    quiet = bool(lib_parameter.get_default_if_none(quiet, default=log_settings.quiet))
+    >>> # single_record - the whole banner is one LogRecord, every physical line gets the prefix
+    >>> logger = logging.getLogger('test_single_record')
+    >>> logger.propagate = False
+    >>> handler = log_handlers.set_stream_handler(logger, stream=sys.stdout, fmt='[%(levelname)s] %(message)s')
+    >>> log_level('this is\\nham', logging.ERROR, width=12, logger=logger, banner=True, single_record=True)
+    [ERROR] ************
+    [ERROR] * this is  *
+    [ERROR] * ham      *
+    [ERROR] ************
+    >>> logger.removeHandler(handler)
+
+    >>> # lazy messages
+    >>> handler = log_handlers.set_stream_handler(logger, stream=sys.stdout, fmt='[%(levelname)s] %(message)s')
+    >>> log_level('%s and %s', logging.ERROR, logger=logger, args=('spam', 'eggs'))
+    [ERROR] spam and eggs
+    >>> log_level(lambda: 'ham\\nspam', logging.ERROR, logger=logger)
+    [ERROR] ham
+    [ERROR] spam
+    >>> logger.setLevel(logging.INFO)
+    >>> log_level(lambda: 1 / 0, logging.DEBUG, logger=logger)  # the level is disabled, the message is never built
+    >>> # with async handlers, the message is built in the writer thread
+    >>> import threading
+    >>> async_handler = log_handlers.set_async_handlers(logger)
+    >>> log_level(lambda: f'main thread: {threading.current_thread() is threading.main_thread()}', logging.ERROR, logger=logger)
+    >>> log_handlers.remove_async_handlers(logger)
+    [ERROR] main thread: False
+    >>> # rate limiting - by call site or by message template, see log_rate_limit.RateLimiter
+    >>> log_settings.rate_limiter = log_rate_limit.RateLimiter(rate=1, burst=2)
+    >>> for number in range(5):
+    ...     log_level(f'connection {number} failed', logging.ERROR, logger=logger)
+    [ERROR] connection 0 failed
+    [ERROR] connection 1 failed
+    >>> log_settings.rate_limiter.suppressed()
+    {('<doctest ...>', 2): 3}
+    >>> log_settings.rate_limiter = None
+    >>> logger.setLevel(logging.NOTSET)
+    >>> logger.removeHandler(handler)
+
+    >>> # flush policy
+    >>> log_settings.flush_policy = 'records'
+    >>> log_level('test')
+    >>> log_settings.flush_policy = 'message'
+    """
 
+    # the quiet flag and the level are checked first, without any string processing -
+    # a disabled log_debug in a hot loop costs only those checks
+    if quiet is None:
+        quiet = log_settings.quiet
     if quiet:
         return
 
-    message = str(message)
+    if level is None:
+        level = log_settings.new_logger_level
 
-    level = int(lib_parameter.get_default_if_none(level, default=log_settings.new_logger_level))
+    if logger is None:
+        logger = logging.getLogger()
+
+    if not logger.isEnabledFor(level):
+        return
+
+    rate_limiter = log_settings.rate_limiter
+    if rate_limiter is not None:
+        rate_limit_key = log_rate_limit.get_message_key(rate_limiter, message)
+        n_suppressed = rate_limiter.check(level, rate_limit_key)
+        if n_suppressed is None:
+            rate_limiter.set_reporter(level, rate_limit_key, logger)
+            return
+        if n_suppressed:
+            logger.log(level=level, msg=log_rate_limit.format_summary(n_suppressed, rate_limit_key))
+
+    level = int(level)
     width = int(lib_parameter.get_default_if_none(width, default=log_settings.width))
     wrap = bool(lib_parameter.get_default_if_none(wrap, default=log_settings.wrap))
 
-    if logger is None:
-        logger = logging.getLogger()
+    if args is not None or callable(message):
+        l_messages: List[Any] = [LazyMessage(message, args=args, width=width, wrap=wrap, banner=banner)]
+        extra: Optional[Dict[str, Any]] = None
+    else:
+        l_lines = render_lines(message=str(message), width=width, wrap=wrap, banner=banner)
+        if single_record is None:
+            single_record = log_settings.single_record
+            if not single_record and len(l_lines) > 1:
+                # a multi-line message must be one record for a JsonFormatter of the logger, to go out as one JSON object
+                single_record = log_handlers.single_record_required(logger)
+        if single_record and l_lines:
+            # one LogRecord for the whole block - the formatters installed by log_handlers
+            # put the prefix in front of every physical line (see log_handlers.MultiLineFormatterMixin)
+            l_messages = ["\n".join(l_lines)]
+            extra = {"block_lines": l_lines}
+        else:
+            l_messages = l_lines
+            extra = None
+
+    flush_always = log_settings.flush_policy == "always"
+    for msg in l_messages:
+        logger.log(level=level, msg=msg, extra=extra)
+        if flush_always:
+            log_handlers.logger_flush_all_handlers(logger)
+
+    log_handlers.logger_flush_by_policy(
+        logger,
+        level=level,
+        n_records=len(l_messages),
+        flush_policy=log_settings.flush_policy,
+        flush_records=log_settings.flush_records,
+        flush_level=log_settings.flush_level,
+        flush_interval=log_settings.flush_interval,
+    )
+
+
+class LazyMessage(object):
+    """
+    the msg of the LogRecord of a lazy message (see log_level) - the message is built and rendered to lines
+    when the record is formatted, and only once, even if the record is formatted by many handlers.
+    the formatters installed by log_handlers put the prefix in front of every line (see log_handlers.MultiLineFormatterMixin)
+
+    >>> lazy_message = LazyMessage(lambda: 'this is one nice piece of ham', width=10, wrap=True)
+    >>> lazy_message.block_lines
+    ['this is', 'one nice', 'piece of', 'ham']
+    >>> str(LazyMessage('%(food)s', args={'food': 'spam'}))
+    'spam'
+
+    """
+
+    __slots__ = ("message", "args", "width", "wrap", "banner", "_lines")
+
+    def __init__(
+        self, message: Union[str, Callable[[], Any]], args: Any = None, width: Optional[int] = None, wrap: Optional[bool] = None, banner: bool = False
+    ) -> None:
+        self.message = message
+        self.args = args
+        self.width = int(lib_parameter.get_default_if_none(width, default=log_settings.width))
+        self.wrap = bool(lib_parameter.get_default_if_none(wrap, default=log_settings.wrap))
+        self.banner = banner
+        self._lines: Optional[List[str]] = None
+
+    @property
+    def block_lines(self) -> List[str]:
+        if self._lines is None:
+            message = self.message() if callable(self.message) else self.message
+            message = str(message)
+            if self.args is not None:
+                message = message % self.args
+            self._lines = render_lines(message=message, width=self.width, wrap=self.wrap, banner=self.banner)
+        return self._lines
+
+    def __str__(self) -> str:
+        return "\n".join(self.block_lines)
+
+
+class RenderCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+    max_bytes: int
+    current_bytes: int
+
+
+# the LRU cache of render_lines, key = (message, width, wrap, banner), value = (lines, size of the entry)
+_render_cache: "collections.OrderedDict[Tuple[str, int, bool, bool], Tuple[Tuple[str, ...], int]]" = collections.OrderedDict()
+_render_cache_lock = threading.Lock()
+_render_cache_hits = 0
+_render_cache_misses = 0
+_render_cache_bytes = 0
+
+
+def render_lines(message: str, width: int, wrap: bool, banner: bool = False) -> List[str]:
+    """
+    renders the message to the physical lines which are logged by log_level.
+    the results are kept in a LRU cache, limited by log_settings.render_cache_size and log_settings.render_cache_max_bytes
+
+    >>> render_lines('test', width=10, wrap=True)
+    ['test']
+    >>> render_lines('this is\\none nice piece of ham', width=12, wrap=True, banner=True)
+    ['************', '* this is  *', '* one nice *', '* piece of *', '* ham      *', '************']
+
+    >>> # a repeated banner is taken from the cache
+    >>> clear_render_cache()
+    >>> lines = render_lines('phase 1', width=20, wrap=True, banner=True)
+    >>> lines = render_lines('phase 1', width=20, wrap=True, banner=True)
+    >>> render_cache_info()
+    RenderCacheInfo(hits=1, misses=1, maxsize=..., currsize=1, max_bytes=..., current_bytes=67)
+
+    >>> # disable the cache
+    >>> save_render_cache_size = log_settings.render_cache_size
+    >>> log_settings.render_cache_size = 0
+    >>> lines = render_lines('phase 1', width=20, wrap=True, banner=True)
+    >>> render_cache_info().hits
+    1
+    >>> log_settings.render_cache_size = save_render_cache_size
+
+    """
+    global _render_cache_hits, _render_cache_misses, _render_cache_bytes
+
+    max_size = log_settings.render_cache_size
+    if max_size <= 0:
+        return _render_lines(message=message, width=width, wrap=wrap, banner=banner)
+
+    key = (message, width, wrap, banner)
+    with _render_cache_lock:
+        entry = _render_cache.get(key)
+        if entry is not None:
+            _render_cache.move_to_end(key)
+            _render_cache_hits += 1
+            return list(entry[0])
+        _render_cache_misses += 1
+
+    l_lines = _render_lines(message=message, width=width, wrap=wrap, banner=banner)
+
+    # the size of an entry is approximated by the number of characters of the message and the lines.
+    # entries bigger than 1/16 of the cache are not cached, so a huge message does not evict all the banners
+    max_bytes = log_settings.render_cache_max_bytes
+    entry_size = len(message) + sum(map(len, l_lines))
+    if entry_size * 16 > max_bytes:
+        return l_lines
+
+    with _render_cache_lock:
+        if key not in _render_cache:
+            _render_cache[key] = (tuple(l_lines), entry_size)
+            _render_cache_bytes += entry_size
+        while _render_cache and (len(_render_cache) > max_size or _render_cache_bytes > max_bytes):
+            _, (_, evicted_size) = _render_cache.popitem(last=False)
+            _render_cache_bytes -= evicted_size
+    return l_lines
+
+
+def render_cache_info() -> RenderCacheInfo:
+    """
+    returns the hits, misses, the number of entries and the size of the render_lines cache, like functools.lru_cache.cache_info
+
+    >>> assert render_cache_info().maxsize == log_settings.render_cache_size
+
+    """
+    with _render_cache_lock:
+        return RenderCacheInfo(
+            hits=_render_cache_hits,
+            misses=_render_cache_misses,
+            maxsize=log_settings.render_cache_size,
+            currsize=len(_render_cache),
+            max_bytes=log_settings.render_cache_max_bytes,
+            current_bytes=_render_cache_bytes,
+        )
+
+
+def clear_render_cache() -> None:
+    """
+    clears the render_lines cache and resets the hits and misses
+
+    >>> clear_render_cache()
+    >>> assert render_cache_info().currsize == 0
+
+    """
+    global _render_cache_hits, _render_cache_misses, _render_cache_bytes
+    with _render_cache_lock:
+        _render_cache.clear()
+        _render_cache_hits = 0
+        _render_cache_misses = 0
+        _render_cache_bytes = 0
 
+
+def _reset_render_cache_lock() -> None:
+    # a fork while another thread holds the lock would leave it locked forever in the child
+    global _render_cache_lock
+    _render_cache_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_reset_render_cache_lock)
+
+
+def _render_lines(message: str, width: int, wrap: bool, banner: bool = False) -> List[str]:
+    """
+    renders the message to the physical lines, without the cache
+
+    >>> _render_lines('test', width=10, wrap=True)
+    ['test']
+    >>> _render_lines('this is\\none nice piece of ham', width=10, wrap=True)
+    ['this is', 'one nice', 'piece of', 'ham']
+    >>> _render_lines('this is\\none nice piece of ham', width=10, wrap=False)
+    ['this is', 'one nice piece of ham']
+    >>> _render_lines('this is\\none nice piece of ham', width=12, wrap=True, banner=True)
+    ['************', '* this is  *', '* one nice *', '* piece of *', '* ham      *', '************']
+    >>> _render_lines('this is\\none nice piece of ham', width=12, wrap=False, banner=True)
+    ['************', '* this is  *', '* one nice piece of ham', '************']
+
+    """
     l_message = message.split("\n")
+    l_lines: List[str] = []
 
     if banner:
-        sep_line = "*" * width
-        logger.log(level=level, msg=sep_line)  # 140 characters is about the width in travis log screen
+        sep_line = "*" * width  # 140 characters is about the width in travis log screen
+        l_lines.append(sep_line)
         for line in l_message:
             if wrap:
-                l_wrapped_lines = textwrap.wrap(line, width=width - 2, tabsize=4, replace_whitespace=False, initial_indent="* ", subsequent_indent="* ")
+                l_wrapped_lines = log_wrap.wrap(line, width=width - 2, initial_indent="* ", subsequent_indent="* ")
                 for wrapped_line in l_wrapped_lines:
-                    msg_line = wrapped_line + (width - len(wrapped_line) - 1) * " " + "*"
-                    logger.log(level=level, msg=msg_line)
+                    l_lines.append(wrapped_line + (width - len(wrapped_line) - 1) * " " + "*")
             else:
                 line = "* " + line.rstrip()
                 if len(line) < width - 1:
                     line = line + (width - len(line) - 1) * " " + "*"
-                logger.log(level=level, msg=line)
-        logger.log(level=level, msg=sep_line)
-        log_handlers.logger_flush_all_handlers(logger)
+                l_lines.append(line)
+        l_lines.append(sep_line)
     else:
         for line in l_message:
             if wrap:
-                l_wrapped_lines = textwrap.wrap(line, width=width, tabsize=4, replace_whitespace=False)
-                for msg_line in l_wrapped_lines:
-                    logger.log(level=level, msg=msg_line)
+                l_lines.extend(log_wrap.wrap(line, width=width))
             else:
-                msg_line = line.rstrip()
-                logger.log(level=level, msg=msg_line)
-                log_handlers.logger_flush_all_handlers(logger)
+                l_lines.append(line.rstrip())
+    return l_lines
 
 
 def colortest(quiet: bool = False) -> None:
@@ -443,6 +837,9 @@ def colortest(quiet: bool = False) -> None:
         log_warning("test level warning")
         log_error("test level error")
         log_critical("test level critical")
+        # humanfriendly is imported here, only the colortest needs it
+        import humanfriendly.cli  # type: ignore
+
         humanfriendly.cli.demonstrate_ansi_formatting()
 
 
@@ -457,16 +854,31 @@ def setup_handler(logger: logging.Logger = logging.getLogger(), remove_existing_
     >>> setup_handler()
     >>> assert log_handlers.exists_handler_with_name('stream_handler_color')
 
+    >>> # Test colored without coloredlogs
+    >>> log_settings.use_native_color_formatter = True
+    >>> setup_handler()
+    >>> assert isinstance(log_handlers.get_handler_by_name('stream_handler_color').formatter, log_handlers.ColorFormatter)
+    >>> log_settings.use_native_color_formatter = False
+
     >>> # Test non colored
     >>> log_settings.use_colored_stream_handler = False
     >>> setup_handler()
     >>> assert log_handlers.exists_handler_with_name('stream_handler')
 
+    >>> # Test async
+    >>> log_settings.use_async_handlers = True
+    >>> setup_handler()
+    >>> assert log_handlers.get_async_queue_handler() is not None
+    >>> assert log_handlers.exists_handler_with_name('stream_handler')
+    >>> log_handlers.remove_async_handlers()
+    >>> log_settings.use_async_handlers = False
+
     >>> # Teardown
     >>> log_settings.use_colored_stream_handler = save_use_use_colored_stream_handler
 
     """
     if log_settings.use_colored_stream_handler:
+        log_config.autodetect_level_styles()
         log_handlers.set_stream_handler_color(
             logger=logger,
             level=log_settings.stream_handler_log_level,
@@ -476,6 +888,7 @@ def setup_handler(logger: logging.Logger = logging.getLogger(), remove_existing_
             level_styles=log_settings.level_styles,
             stream=log_settings.stream,
             remove_existing_stream_handlers=remove_existing_stream_handlers,
+            native=log_settings.use_native_color_formatter,
         )
     else:
         log_handlers.set_stream_handler(
@@ -486,3 +899,6 @@ def setup_handler(logger: logging.Logger = logging.getLogger(), remove_existing_
             stream=log_settings.stream,
             remove_existing_stream_handlers=remove_existing_stream_handlers,
         )
+
+    if log_settings.use_async_handlers and log_handlers.get_async_queue_handler(logger) is None:
+        log_handlers.set_async_handlers(logger)
@@ -1,26 +1,34 @@
 # STDLIB
+import functools
 import logging
 import os
 import sys
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 # EXT
-import click
-
-# OWN
-import cli_exit_tools
+# click and cli_exit_tools are imported lazily, only when the commandline is parsed
+if TYPE_CHECKING:  # pragma: no cover
+    import click
 
 # PROJ
 try:
     from . import __init__conf__
     from . import lib_log_utils
+    from . import log_daemon
+    from . import log_handlers
     from . import log_levels
+    from . import log_shell_lib
+    from . import log_stream
     from .log_config import log_settings
 except (ImportError, ModuleNotFoundError):  # pragma: no cover
     # imports for doctest
     import __init__conf__  # type: ignore  # pragma: no cover
     import lib_log_utils  # type: ignore  # pragma: no cover
+    import log_daemon  # type: ignore  # pragma: no cover
+    import log_handlers  # type: ignore  # pragma: no cover
     import log_levels  # type: ignore  # pragma: no cover
+    import log_shell_lib  # type: ignore  # pragma: no cover
+    import log_stream  # type: ignore  # pragma: no cover
     from log_config import log_settings  # type: ignore  # pragma: no cover
 
 # CONSTANTS
@@ -66,6 +74,22 @@ def do_log(
             quiet = False
 
     level = log_levels.get_log_level_from_str(level_str)
+    setup_logging(extended=extended, width=width, wrap=wrap, quiet=quiet, force=force)
+
+    if colortest:
+        lib_log_utils.colortest()
+    else:
+        lib_log_utils.log_level(message=message, level=level, banner=banner)
+
+
+def setup_logging(
+    extended: Optional[bool] = None,
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    quiet: Optional[bool] = None,
+    force: bool = False,
+) -> None:
+    """applies the commandline parameters and the environment settings to log_settings, and sets up the handlers"""
     set_logger_level_from_env()
     set_extended_from_env(extended, force)
     set_width_from_env(width, force)
@@ -75,10 +99,199 @@ def do_log(
     logger.level = log_settings.new_logger_level
     lib_log_utils.setup_handler(logger)
 
-    if colortest:
-        lib_log_utils.colortest()
-    else:
-        lib_log_utils.log_level(message=message, level=level, banner=banner)
+
+def do_serve(
+    extended: Optional[bool] = None,
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    force: bool = False,
+) -> None:
+    """
+    sets up the handlers once and serves log requests on the unix domain socket (see log_daemon.get_socket_path),
+    until SIGTERM or SIGINT. The messages are written to the stderr of the client.
+    """
+    setup_logging(extended=extended, width=width, wrap=wrap, force=force)
+    log_daemon.serve(logger=logger)
+
+
+def do_log_stdin(
+    level_str: str = "info",
+    extended: Optional[bool] = None,
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    silent: Optional[str] = None,
+    quiet: Optional[bool] = None,
+    force: bool = False,
+    null: bool = False,
+    level_prefix: bool = False,
+    banner_marker: Optional[str] = None,
+    max_line_length: int = 65536,
+) -> None:
+    """
+    logs every line (or NUL delimited record) of stdin, with one process for all messages
+
+    >>> import io
+    >>> save_stdin = sys.stdin
+    >>> sys.stdin = io.TextIOWrapper(io.BytesIO(b'ERROR: line1\\nline2\\n'))
+    >>> do_log_stdin(level_prefix=True)
+    >>> sys.stdin = save_stdin
+
+    """
+    if silent is not None:
+        quiet = silent.lower().startswith("true")
+
+    level = log_levels.get_log_level_from_str(level_str)
+    setup_logging(extended=extended, width=width, wrap=wrap, quiet=quiet, force=force)
+    log_stream.log_stream(
+        sys.stdin.buffer,
+        level=level,
+        level_prefix=level_prefix,
+        banner_marker=banner_marker,
+        delimiter=b"\x00" if null else b"\n",
+        max_record_length=max_line_length,
+        logger=logger,
+    )
+
+
+def do_emit_shell_lib(
+    path: str,
+    extended: Optional[bool] = None,
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    quiet: Optional[bool] = None,
+    force: bool = False,
+) -> None:
+    """
+    writes a bash library with the log_* and banner_* functions, with the commandline parameters
+    and the environment settings baked in (see log_shell_lib.generate_shell_lib). "-" writes to stdout.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     do_emit_shell_lib(os.path.join(tmp_dir, 'log_lib.sh'))
+
+    """
+    set_logger_level_from_env()
+    set_extended_from_env(extended, force)
+    set_width_from_env(width, force)
+    set_wrap_from_env(wrap, force)
+    set_quiet_from_env(quiet, force)
+    log_shell_lib.write_shell_lib(path)
+
+
+def do_read_ring_buffer(path: str) -> None:
+    """
+    prints the records of a ring buffer file of log_handlers.MmapRingBufferHandler to stdout, the oldest first
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     handler = log_handlers.MmapRingBufferHandler(os.path.join(tmp_dir, 'flight.ring'), size=1024)
+    ...     handler.emit(logging.makeLogRecord(dict(msg='recorded')))
+    ...     handler.close()
+    ...     do_read_ring_buffer(os.path.join(tmp_dir, 'flight.ring'))
+    recorded
+
+    """
+    for record in log_handlers.read_ring_buffer(path):
+        print(record)
+
+
+def do_decode(paths: List[str], extended: Optional[bool] = None, colored: Optional[bool] = None, force: bool = False) -> None:
+    """
+    prints the records of binary log files of log_handlers.BinaryFileHandler to stdout, formatted with the log format of log_settings.
+    the extended format shows the identity of the process which wrote the records, not of log_util.
+    colored defaults to log_settings.use_colored_stream_handler, if stdout is a terminal
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     handler = log_handlers.BinaryFileHandler(os.path.join(tmp_dir, 'test.llb'))
+    ...     handler.emit(logging.makeLogRecord(dict(name='test', msg='recorded %s', args=('spam',), levelno=logging.INFO)))
+    ...     handler.close()
+    ...     do_decode([os.path.join(tmp_dir, 'test.llb')], colored=False)
+    recorded spam
+
+    """
+    set_extended_from_env(extended, force)
+    fmt = log_settings.fmt
+    if fmt == log_settings.fmt_extended_cli:
+        fmt = log_handlers.default_fmt
+    if colored is None:
+        colored = log_settings.use_colored_stream_handler and sys.stdout.isatty()
+    for path in paths:
+        log_handlers.decode_binary_log(
+            path,
+            stream=sys.stdout,
+            fmt=fmt,
+            datefmt=log_settings.datefmt,
+            colored=colored,
+            field_styles=log_settings.field_styles,
+            level_styles=log_settings.level_styles,
+        )
+
+
+def parse_daemon_args(args: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    parses the commandline for the log daemon without click - returns None if the commandline
+    has other options than message, level, banner, width and wrap, then the commandline is parsed by click.
+
+    >>> parse_daemon_args(['-l', 'error', '-b', 'test'])
+    {'message': 'test', 'level_str': 'error', 'banner': True, 'width': None, 'wrap': None}
+    >>> parse_daemon_args(['--level=error', '--width', '80', '--nowrap', 'test'])
+    {'message': 'test', 'level_str': 'error', 'banner': False, 'width': 80, 'wrap': False}
+    >>> parse_daemon_args(['-e', 'test'])
+    >>> parse_daemon_args(['test', 'two messages'])
+    >>> parse_daemon_args(['-w', 'abc', 'test'])
+
+    """
+    parsed_args: Dict[str, Any] = dict(message=None, level_str="info", banner=False, width=None, wrap=None)
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        option, has_value, value = arg.partition("=")
+        if option in ("-l", "--level", "-w", "--width"):
+            if not has_value:
+                if not args:
+                    return None
+                value = args.pop(0)
+            if option in ("-l", "--level"):
+                parsed_args["level_str"] = value
+            elif value.isdigit():
+                parsed_args["width"] = int(value)
+            else:
+                return None
+        elif arg in ("-b", "--banner"):
+            parsed_args["banner"] = True
+        elif arg in ("--wrap", "--nowrap"):
+            parsed_args["wrap"] = arg == "--wrap"
+        elif arg == "--" and len(args) == 1 and parsed_args["message"] is None:
+            parsed_args["message"] = args.pop(0)
+        elif arg.startswith("-") or parsed_args["message"] is not None:
+            return None
+        else:
+            parsed_args["message"] = arg
+    if parsed_args["message"] is None:
+        return None
+    return parsed_args
+
+
+def forward_to_daemon(args: List[str]) -> bool:
+    """
+    sends the message to the log daemon, without importing click or coloredlogs.
+    returns False if there is no daemon running, or the commandline needs to be parsed by click.
+
+    >>> save_socket = os.environ.get('LOG_UTIL_SOCKET')
+    >>> os.environ['LOG_UTIL_SOCKET'] = '/non/existing/socket'
+    >>> forward_to_daemon(['test'])
+    False
+    >>> if save_socket is None:
+    ...     del os.environ['LOG_UTIL_SOCKET']
+    ... else:
+    ...     os.environ['LOG_UTIL_SOCKET'] = save_socket
+
+    """
+    daemon_args = parse_daemon_args(args)
+    if daemon_args is None:
+        return False
+    return log_daemon.send(**daemon_args)
 
 
 def set_logger_level_from_env() -> None:
@@ -377,66 +590,202 @@ def set_quiet_from_env(quiet: Optional[bool] = None, force: bool = False) -> Non
             log_settings.quiet = quiet
 
 
-@click.command(help=__init__conf__.title, context_settings=CLICK_CONTEXT_SETTINGS)
-@click.version_option(
-    version=__init__conf__.version, prog_name=__init__conf__.shell_command, message=f"{__init__conf__.shell_command} version {__init__conf__.version}"
-)
-@click.option("-e", "--extended", is_flag=True, type=bool, default=None, help="extended log format")
-@click.option("-p", "--plain", is_flag=True, type=bool, default=None, help="plain log format")
-@click.option("-b", "--banner", is_flag=True, type=bool, default=False, help="log as banner")
-@click.option("-w", "--width", type=int, default=None, help="wrap width, default=140")
-@click.option("--wrap/--nowrap", type=bool, default=None, help="wrap text")
-# if parameter -q is anything else then "True" (not case sensitive), or not set, it is considered as False.
-# This makes it possible to silence messages elegantly in a shellscript
-@click.option("-s", "--silent", type=str, default=None, help='disable logging if "True"')
-@click.option("-q", "--quiet", is_flag=True, type=bool, default=None, help="disable logging as flag")
-@click.option("-f", "--force", is_flag=True, type=bool, default=False, help="take precedence over environment settings")
-@click.option("-l", "--level", type=str, default="info", help="log level as number or predefined Level")
-@click.option("--program_info", is_flag=True, type=bool, default=False, help="get program info")
-@click.option("-c", "--colortest", is_flag=True, type=bool, default=False, help="color test")
-@click.option("--traceback/--no-traceback", is_flag=True, type=bool, default=None, help="return traceback information on cli")
-@click.argument("message", required=False, default="")
-def cli_main(
-    message: str,
-    level: str,
-    extended: Optional[bool],
-    plain: Optional[bool],
-    banner: bool,
-    width: Optional[int],
-    wrap: Optional[bool],
-    silent: Optional[str],
-    quiet: Optional[bool],
-    force: bool,
-    program_info: bool,
-    colortest: bool,
-    traceback: Optional[bool] = None,
-) -> None:
-    """log a message"""
-    if traceback is not None:
-        cli_exit_tools.config.traceback = traceback
-    if program_info:
-        cli_info()
-    else:
+@functools.lru_cache(maxsize=None)
+def get_cli_command() -> "click.Command":
+    """
+    builds the click command - click is imported here and not at module level, to keep the import of this module cheap
+
+    >>> assert get_cli_command().name == 'cli-main'
+
+    """
+    import click
+
+    @click.command(help=__init__conf__.title, context_settings=CLICK_CONTEXT_SETTINGS)
+    @click.version_option(
+        version=__init__conf__.version, prog_name=__init__conf__.shell_command, message=f"{__init__conf__.shell_command} version {__init__conf__.version}"
+    )
+    @click.option("-e", "--extended", is_flag=True, type=bool, default=None, help="extended log format")
+    @click.option("-p", "--plain", is_flag=True, type=bool, default=None, help="plain log format")
+    @click.option("-b", "--banner", is_flag=True, type=bool, default=False, help="log as banner")
+    @click.option("-w", "--width", type=int, default=None, help="wrap width, default=140")
+    @click.option("--wrap/--nowrap", type=bool, default=None, help="wrap text")
+    # if parameter -q is anything else then "True" (not case sensitive), or not set, it is considered as False.
+    # This makes it possible to silence messages elegantly in a shellscript
+    @click.option("-s", "--silent", type=str, default=None, help='disable logging if "True"')
+    @click.option("-q", "--quiet", is_flag=True, type=bool, default=None, help="disable logging as flag")
+    @click.option("-f", "--force", is_flag=True, type=bool, default=False, help="take precedence over environment settings")
+    @click.option("-l", "--level", type=str, default="info", help="log level as number or predefined Level")
+    @click.option("--program_info", is_flag=True, type=bool, default=False, help="get program info")
+    @click.option("-c", "--colortest", is_flag=True, type=bool, default=False, help="color test")
+    @click.option("--traceback/--no-traceback", is_flag=True, type=bool, default=None, help="return traceback information on cli")
+    @click.option("--serve", is_flag=True, type=bool, default=False, help="run as log daemon on a unix domain socket")
+    @click.option("--stdin", is_flag=True, type=bool, default=False, help="log every line of stdin")
+    @click.option("-0", "--null", is_flag=True, type=bool, default=False, help="with --stdin: the records are NUL delimited")
+    @click.option("--level-prefix", is_flag=True, type=bool, default=False, help='with --stdin: use the level of lines like "ERROR: message"')
+    @click.option("--banner-marker", type=str, default=None, help="with --stdin: log lines starting with that marker as banner")
+    @click.option("--max-line-length", type=int, default=65536, help="with --stdin: split longer lines, default=65536 bytes")
+    @click.option("--emit-shell-lib", type=str, default=None, metavar="PATH", help='write a bash library with log_* and banner_* functions, "-" for stdout')
+    @click.option("--read-ring-buffer", type=str, default=None, metavar="PATH", help="print the records of a ring buffer file to stdout")
+    @click.argument("message", required=False, default="")
+    def cli_main(
+        message: str,
+        level: str,
+        extended: Optional[bool],
+        plain: Optional[bool],
+        banner: bool,
+        width: Optional[int],
+        wrap: Optional[bool],
+        silent: Optional[str],
+        quiet: Optional[bool],
+        force: bool,
+        program_info: bool,
+        colortest: bool,
+        traceback: Optional[bool] = None,
+        serve: bool = False,
+        stdin: bool = False,
+        null: bool = False,
+        level_prefix: bool = False,
+        banner_marker: Optional[str] = None,
+        max_line_length: int = 65536,
+        emit_shell_lib: Optional[str] = None,
+        read_ring_buffer: Optional[str] = None,
+    ) -> None:
+        """log a message"""
+        if traceback is not None:
+            import cli_exit_tools
+
+            cli_exit_tools.config.traceback = traceback
         if plain:
             extended = False
-        do_log(
-            message=message,
-            level_str=level,
-            extended=extended,
-            banner=banner,
-            width=width,
-            wrap=wrap,
-            silent=silent,
-            quiet=quiet,
-            force=force,
-            colortest=colortest,
-        )
+        if program_info:
+            cli_info()
+        elif emit_shell_lib is not None:
+            do_emit_shell_lib(emit_shell_lib, extended=extended, width=width, wrap=wrap, quiet=quiet, force=force)
+        elif read_ring_buffer is not None:
+            do_read_ring_buffer(read_ring_buffer)
+        elif serve:
+            do_serve(extended=extended, width=width, wrap=wrap, force=force)
+        elif stdin:
+            do_log_stdin(
+                level_str=level,
+                extended=extended,
+                width=width,
+                wrap=wrap,
+                silent=silent,
+                quiet=quiet,
+                force=force,
+                null=null,
+                level_prefix=level_prefix,
+                banner_marker=banner_marker,
+                max_line_length=max_line_length,
+            )
+        else:
+            do_log(
+                message=message,
+                level_str=level,
+                extended=extended,
+                banner=banner,
+                width=width,
+                wrap=wrap,
+                silent=silent,
+                quiet=quiet,
+                force=force,
+                colortest=colortest,
+            )
+
+    return cli_main
+
+
+@functools.lru_cache(maxsize=None)
+def get_decode_command() -> "click.Command":
+    """
+    builds the click command of "log_util decode" - the main command takes a message as argument, so decode is dispatched by main
+
+    >>> assert get_decode_command().name == 'decode'
+
+    """
+    import click
+
+    @click.command(name="decode", help="print the records of binary log files", context_settings=CLICK_CONTEXT_SETTINGS)
+    @click.option("-e", "--extended", is_flag=True, type=bool, default=None, help="extended log format")
+    @click.option("-p", "--plain", is_flag=True, type=bool, default=None, help="plain log format")
+    @click.option("--color/--no-color", type=bool, default=None, help="colored output, default: if stdout is a terminal")
+    @click.option("-f", "--force", is_flag=True, type=bool, default=False, help="take precedence over environment settings")
+    @click.argument("paths", nargs=-1, required=True, metavar="PATH...")
+    def decode(paths: List[str], extended: Optional[bool], plain: Optional[bool], color: Optional[bool], force: bool) -> None:
+        """print the records of binary log files"""
+        if plain:
+            extended = False
+        do_decode(list(paths), extended=extended, colored=color, force=force)
+
+    return decode
+
+
+# the options of the log command which take a value
+_log_options_with_value = ("-l", "--level", "-w", "--width", "-s", "--silent", "--banner-marker", "--max-line-length", "--emit-shell-lib", "--read-ring-buffer")
+
+
+def is_decode_command(args: List[str]) -> bool:
+    """
+    returns True for the subcommand "decode <path>...". without a path, "decode" is the message to log -
+    the log command takes only one message, so a second positional argument can only be a path
+
+    >>> is_decode_command(['decode', '-e', 'app.llb'])
+    True
+    >>> is_decode_command(['decode', '--help'])
+    True
+    >>> is_decode_command(['decode'])
+    False
+    >>> is_decode_command(['decode', '-l', 'error', '--width=80'])
+    False
+    >>> is_decode_command(['-l', 'error', 'decode'])
+    False
+
+    """
+    if args[:1] != ["decode"]:
+        return False
+    remaining_args = iter(args[1:])
+    for arg in remaining_args:
+        if arg in ("-h", "--help"):
+            return True
+        if arg in _log_options_with_value:
+            next(remaining_args, None)
+        elif not arg.startswith("-"):
+            return True
+    return False
+
+
+def __getattr__(name: str) -> Any:
+    """
+    cli_main, the click command of log_util, is built on first access - click is not imported with this module
+
+    >>> assert __getattr__('cli_main') is get_cli_command()
+
+    """
+    if name == "cli_main":
+        return get_cli_command()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(*args: Any, **kwargs: Any) -> Any:
+    """
+    the commandline entry point - "log_util decode <path>..." decodes binary log files. otherwise sends the message to the log daemon
+    if it is running, or parses the commandline with click (the command cli_main) and logs in-process
+    """
+    if not args and not kwargs:
+        if is_decode_command(sys.argv[1:]):
+            return get_decode_command()(args=sys.argv[2:], prog_name=f"{__init__conf__.shell_command} decode")
+        if forward_to_daemon(sys.argv[1:]):
+            return None
+    return get_cli_command()(*args, **kwargs)
 
 
 # entry point if main
 if __name__ == "__main__":
+    import cli_exit_tools
+
     try:
-        cli_main()  # type: ignore
+        main()
     except Exception as exc:
         cli_exit_tools.print_exception_message()
         sys.exit(cli_exit_tools.get_system_exit_code(exc))
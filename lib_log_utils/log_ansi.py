@@ -0,0 +1,220 @@
+# STDLIB
+import re
+from typing import Any, Dict, List, Mapping, Optional
+
+# the ANSI escape sequences, compatible with humanfriendly.terminal.ansi_style, which is used by coloredlogs
+ANSI_CSI = "\x1b["
+ANSI_SGR = "m"
+ANSI_RESET = ANSI_CSI + "0" + ANSI_SGR
+ANSI_COLOR_CODES = dict(black=0, red=1, green=2, yellow=3, blue=4, magenta=5, cyan=6, white=7)
+ANSI_TEXT_STYLES = dict(bold=1, faint=2, italic=3, underline=4, inverse=7, strike_through=9)
+
+# a %-style formatting directive like coloredlogs.FORMAT_STYLE_PATTERNS['%'], the field name is captured
+format_directive_pattern = re.compile(r"%\((\w+)\)[#0 +-]*\d*(?:\.\d+)?[hlL]?[diouxXeEfFgGcrs%]")
+whitespace_pattern = re.compile(r"(\s+)")
+
+# level names which coloredlogs resolves to the canonical level name
+level_name_aliases = {"warn": "warning", "fatal": "critical"}
+
+# the default styles of coloredlogs (coloredlogs.DEFAULT_FIELD_STYLES and coloredlogs.DEFAULT_LEVEL_STYLES)
+DEFAULT_FIELD_STYLES: Dict[str, Dict[str, Any]] = {
+    "asctime": {"color": "green"},
+    "hostname": {"color": "magenta"},
+    "levelname": {"color": "black", "bold": True},
+    "name": {"color": "blue"},
+    "programname": {"color": "cyan"},
+    "username": {"color": "yellow"},
+}
+DEFAULT_LEVEL_STYLES: Dict[str, Dict[str, Any]] = {
+    "spam": {"color": "green", "faint": True},
+    "debug": {"color": "green"},
+    "verbose": {"color": "blue"},
+    "info": {},
+    "notice": {"color": "magenta"},
+    "warning": {"color": "yellow"},
+    "success": {"color": "green", "bold": True},
+    "error": {"color": "red"},
+    "critical": {"color": "red", "bold": True},
+}
+
+
+def ansi_style(style: Mapping[str, Any]) -> str:
+    """
+    returns the ANSI escape sequence for a coloredlogs style like {'color': 'red', 'bold': True},
+    the same sequence as humanfriendly.terminal.ansi_style(**style)
+
+    >>> ansi_style({'color': 'red', 'bold': True})
+    '\\x1b[1;31m'
+    >>> ansi_style({'background': 'red', 'bright': True})
+    '\\x1b[101m'
+    >>> ansi_style({'color': 208})
+    '\\x1b[38;5;208m'
+    >>> ansi_style({'color': (255, 0, 0)})
+    '\\x1b[38;2;255;0;0m'
+    >>> ansi_style({})
+    ''
+    >>> ansi_style({'color': 'pink'})
+    Traceback (most recent call last):
+        ...
+    ValueError: invalid color value 'pink', must be an integer, a RGB tuple or one of ...
+
+    """
+    sequences: List[int] = [ANSI_TEXT_STYLES[key] for key, value in style.items() if key in ANSI_TEXT_STYLES and value]
+    for color_type in ("color", "background"):
+        color_value = style.get(color_type)
+        if isinstance(color_value, (tuple, list)):
+            if len(color_value) != 3:
+                raise ValueError(f"invalid color value {color_value!r}, must be a tuple or list with three numbers")
+            sequences.extend((48 if color_type == "background" else 38, 2))
+            sequences.extend(int(value) for value in color_value)
+        elif isinstance(color_value, (int, float)) and not isinstance(color_value, bool):
+            # humanfriendly uses 39 for numeric background colors, we keep that to produce identical sequences
+            sequences.extend((39 if color_type == "background" else 38, 5, int(color_value)))
+        elif color_value:
+            if color_value not in ANSI_COLOR_CODES:
+                raise ValueError(f"invalid color value {color_value!r}, must be an integer, a RGB tuple or one of {sorted(ANSI_COLOR_CODES)}")
+            if color_type == "background":
+                offset = 100 if style.get("bright") else 40
+            else:
+                offset = 90 if style.get("bright") else 30
+            sequences.append(offset + ANSI_COLOR_CODES[color_value])
+    if sequences:
+        return ANSI_CSI + ";".join(map(str, sequences)) + ANSI_SGR
+    return ""
+
+
+def ansi_wrap(text: str, style: Mapping[str, Any]) -> str:
+    """
+    wraps the text in the ANSI escape sequence of the style and the reset sequence, returns the text unchanged for an empty style
+
+    >>> ansi_wrap('test', {'color': 'green'})
+    '\\x1b[32mtest\\x1b[0m'
+    >>> ansi_wrap('test', {})
+    'test'
+
+    """
+    start = ansi_style(style)
+    if start:
+        return start + text + ANSI_RESET
+    return text
+
+
+def normalize_style_name(name: str) -> str:
+    """
+    >>> normalize_style_name('WARN')
+    'warning'
+
+    """
+    name = name.lower()
+    return level_name_aliases.get(name, name)
+
+
+def get_style(styles: Mapping[str, Mapping[str, Any]], name: str) -> Dict[str, Any]:
+    """
+    returns the style for a level name or field name, like coloredlogs does (not case sensitive, level name aliases resolved)
+
+    >>> get_style({'warning': {'color': 'red'}}, 'WARN')
+    {'color': 'red'}
+    >>> get_style({'warning': {'color': 'red'}}, 'info')
+    {}
+
+    """
+    normalized_styles = {normalize_style_name(key): value for key, value in styles.items()}
+    return dict(normalized_styles.get(normalize_style_name(name), {}))
+
+
+def parse_encoded_styles(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    parses styles encoded in a string, like coloredlogs.parse_encoded_styles (used for COLOREDLOGS_FIELD_STYLES and COLOREDLOGS_LEVEL_STYLES)
+
+    >>> parse_encoded_styles('debug=green;warning=yellow;error=red;critical=red,bold')
+    {'debug': {'color': 'green'}, 'warning': {'color': 'yellow'}, 'error': {'color': 'red'}, 'critical': {'color': 'red', 'bold': True}}
+    >>> parse_encoded_styles('info=208 ; error=background=red,bright')
+    {'info': {'color': 208}, 'error': {'background': 'red', 'bright': True}}
+
+    """
+    parsed_styles: Dict[str, Dict[str, Any]] = dict()
+    for assignment in _split(text, ";"):
+        name, _, styles = assignment.partition("=")
+        target = parsed_styles.setdefault(name, dict())
+        for token in _split(styles, ","):
+            # a color name or number without a key is the text color
+            if token.isdigit():
+                target["color"] = int(token)
+            elif token in ANSI_COLOR_CODES:
+                target["color"] = token
+            elif "=" in token:
+                key, _, value = token.partition("=")
+                if key in ("color", "background"):
+                    if value.isdigit():
+                        target[key] = int(value)
+                    elif value in ANSI_COLOR_CODES:
+                        target[key] = value
+            else:
+                target[token] = True
+    return parsed_styles
+
+
+def _split(text: str, delimiter: str) -> List[str]:
+    """splits like humanfriendly.text.split : the tokens are stripped, empty tokens are dropped"""
+    return [token.strip() for token in text.split(delimiter) if token.strip()]
+
+
+def colorize_fmt(fmt: str, field_styles: Optional[Mapping[str, Mapping[str, Any]]] = None) -> str:
+    """
+    injects the ANSI escape sequences of the field styles into a %-style log format, like coloredlogs.ColoredFormatter.colorize_format :
+    the format is grouped by whitespace - if a group has exactly one styled field, the whole group is styled,
+    otherwise each styled field is styled individually.
+
+    >>> colorize_fmt('%(asctime)s [%(levelname)s] %(message)s', {'asctime': {'color': 'green'}, 'levelname': {'color': 'yellow'}})
+    '\\x1b[32m%(asctime)s\\x1b[0m \\x1b[33m[%(levelname)s]\\x1b[0m %(message)s'
+    >>> colorize_fmt('[%(asctime)s][%(levelname)-8s]: %(message)s', {'asctime': {'color': 'green'}, 'levelname': {'color': 'yellow'}})
+    '[\\x1b[32m%(asctime)s\\x1b[0m][\\x1b[33m%(levelname)-8s\\x1b[0m]: %(message)s'
+
+    """
+    if not field_styles:
+        return fmt
+    result: List[str] = []
+    for group in get_grouped_tokens(fmt):
+        applicable_styles = [get_style(field_styles, name) for name, _ in group if name]
+        styled = [style for style in applicable_styles if style]
+        if len(styled) == 1:
+            result.append(ansi_wrap("".join(text for _, text in group), styled[0]))
+        else:
+            for name, text in group:
+                if name:
+                    text = ansi_wrap(text, get_style(field_styles, name))
+                result.append(text)
+    return "".join(result)
+
+
+def get_grouped_tokens(fmt: str) -> List[List[Any]]:
+    """
+    splits a %-style log format into (field_name, text) tokens, grouped by whitespace. field_name is None for literal text.
+
+    >>> get_grouped_tokens('[%(asctime)s] %(message)s')
+    [[(None, '['), ('asctime', '%(asctime)s'), (None, ']')], [(None, ' ')], [('message', '%(message)s')]]
+
+    """
+    tokens: List[Any] = []
+    position = 0
+    for match in format_directive_pattern.finditer(fmt):
+        if match.start() > position:
+            tokens.extend((None, text) for text in whitespace_pattern.split(fmt[position : match.start()]) if text)
+        tokens.append((match.group(1), match.group(0)))
+        position = match.end()
+    tokens.extend((None, text) for text in whitespace_pattern.split(fmt[position:]) if text)
+
+    groups: List[List[Any]] = []
+    current_group: List[Any] = []
+    for name, text in tokens:
+        if name is None and text.isspace():
+            if current_group:
+                groups.append(current_group)
+            groups.append([(name, text)])
+            current_group = []
+        else:
+            current_group.append((name, text))
+    if current_group:
+        groups.append(current_group)
+    return groups
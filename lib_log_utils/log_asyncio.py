@@ -0,0 +1,673 @@
+# STDLIB
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Any, Callable, List, Optional, Set, Tuple, Union
+
+# PROJ
+try:
+    from . import lib_log_utils
+    from . import log_handlers
+    from . import log_levels
+except ImportError:  # pragma: no cover
+    import lib_log_utils  # type: ignore # pragma: no cover
+    import log_handlers  # type: ignore # pragma: no cover
+    import log_levels  # type: ignore # pragma: no cover
+
+
+class FlushRequest(object):
+    """put into the queue by flush() - the listener flushes the handlers when it gets there, and resolves the future in the event loop"""
+
+    __slots__ = ("loop", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, future: "asyncio.Future[None]") -> None:
+        self.loop = loop
+        self.future = future
+
+    def done(self) -> None:
+        try:
+            self.loop.call_soon_threadsafe(_set_result, self.future)
+        except RuntimeError:
+            # the event loop is closed
+            pass
+
+
+def _set_result(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AsyncioQueueHandler(log_handlers.AsyncQueueHandler):
+    """
+    puts the records into a bounded queue and never blocks - if the queue is full, the record is dropped and counted,
+    the listener reports the number of dropped records. the alog_* and abanner_* coroutines wait for space instead.
+    """
+
+    listener: "AsyncioQueueListener"
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.listener.count_dropped()
+
+
+class AsyncioQueueListener(log_handlers.BatchQueueListener):
+    """
+    the writer thread of the AsyncioQueueHandler : writes the records in batches like the BatchQueueListener, resolves the
+    futures of flush() and wakes the coroutines which wait for space in the queue (see wait_for_space)
+    """
+
+    def __init__(self, queue: "queue.Queue[Any]", *handlers: logging.Handler, batch_size: int = 256):
+        super().__init__(queue, *handlers, batch_size=batch_size)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._space_waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = list()
+
+    def restart_after_fork(self, record_queue: "queue.Queue[Any]") -> None:
+        # the futures of the waiters belong to the event loop of the parent
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._space_waiters = list()
+        super().restart_after_fork(record_queue)
+
+    def count_dropped(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def enqueue_sentinel(self) -> None:
+        # called by stop() from synchronous code - waits for space, the sentinel must not be dropped
+        self.queue.put(self._sentinel)  # type: ignore
+
+    async def wait_for_space(self) -> None:
+        """waits until the queue is not full, without blocking the event loop"""
+        record_queue: "queue.Queue[Any]" = self.queue  # type: ignore
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                # the listener wakes the waiters after every batch - a full queue is never empty, so there is a next batch
+                if not record_queue.full():
+                    return
+                future = loop.create_future()
+                self._space_waiters.append((loop, future))
+            await future
+
+    def handle_batch(self, records: List[Any]) -> None:
+        l_records: List[logging.LogRecord] = list()
+        for record in records:
+            if isinstance(record, FlushRequest):
+                if l_records:
+                    super().handle_batch(l_records)
+                    l_records = list()
+                for handler in self.handlers:
+                    handler.flush()
+                record.done()
+            else:
+                l_records.append(record)
+        if l_records:
+            super().handle_batch(l_records)
+
+        with self._lock:
+            dropped, self.dropped = self.dropped, 0
+            space_waiters, self._space_waiters = self._space_waiters, list()
+        if dropped:
+            super().handle_batch(
+                [
+                    logging.makeLogRecord(
+                        dict(name=__name__, msg=f"dropped {dropped} log records, the log queue was full", levelno=logging.WARNING, levelname="WARNING")
+                    )
+                ]
+            )
+        for loop, future in space_waiters:
+            try:
+                loop.call_soon_threadsafe(_set_result, future)
+            except RuntimeError:
+                pass
+
+
+def get_asyncio_queue_handler(logger: Optional[logging.Logger] = None) -> Optional[AsyncioQueueHandler]:
+    """returns the AsyncioQueueHandler which gets the records of the logger - of the logger itself, or of the loggers it propagates to"""
+    current_logger: Optional[logging.Logger] = logging.getLogger() if logger is None else logger
+    while current_logger is not None:
+        for handler in current_logger.handlers:
+            if isinstance(handler, AsyncioQueueHandler):
+                return handler
+        current_logger = current_logger.parent if current_logger.propagate else None  # type: ignore
+    return None
+
+
+def set_asyncio_handlers(
+    logger: logging.Logger = logging.getLogger(), name: str = "asyncio_queue_handler", queue_size: int = 10000, batch_size: int = 256
+) -> AsyncioQueueHandler:
+    """
+    moves all handlers of the logger to a writer thread and puts an AsyncioQueueHandler on the logger, like log_handlers.set_async_handlers -
+    but the queue is bounded and the caller is never blocked : log_* and banner_* from coroutines only render the message and put
+    the record into the queue. if the queue is full, log_* and banner_* drop the record (the writer reports the number of dropped records),
+    alog_* and abanner_* wait for space. await flush() to wait until the records are written.
+    the queue is drained and the handlers are flushed at interpreter exit, or with remove_asyncio_handlers()
+
+    queue_size: the maximum number of records in the queue
+    batch_size: the maximum number of records written with one writelines()
+
+    >>> import sys
+    >>> logger = logging.getLogger('test_set_asyncio_handlers')
+    >>> logger.propagate = False
+    >>> handler = log_handlers.set_stream_handler(logger, stream=sys.stdout, fmt='%(message)s')
+    >>> asyncio_queue_handler = set_asyncio_handlers(logger)
+    >>> assert asyncio_queue_handler.listener.handlers == (handler, )
+    >>> async def main() -> None:
+    ...     await alog_warning('test', logger=logger)
+    ...     await flush(logger)
+    >>> asyncio.run(main())
+    test
+    >>> remove_asyncio_handlers(logger)
+    >>> assert logger.handlers == [handler]
+    >>> logger.removeHandler(handler)
+
+    """
+    if queue_size < 1:
+        raise ValueError("queue_size must be at least 1")
+    remove_asyncio_handlers(logger)
+    log_handlers.remove_async_handlers(logger)
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    record_queue: "queue.Queue[Any]" = queue.Queue(queue_size)
+    asyncio_queue_handler = AsyncioQueueHandler(record_queue)
+    asyncio_queue_handler.name = name
+    asyncio_queue_handler.listener = AsyncioQueueListener(record_queue, *handlers, batch_size=batch_size)
+    asyncio_queue_handler.listener.start()
+    logger.addHandler(asyncio_queue_handler)
+    _asyncio_loggers.add(logger.name)
+    return asyncio_queue_handler
+
+
+def remove_asyncio_handlers(logger: logging.Logger = logging.getLogger()) -> None:
+    """
+    drains the queue, stops the writer thread and puts the handlers back on the logger
+
+    >>> remove_asyncio_handlers(logging.getLogger('test_remove_asyncio_handlers'))
+
+    """
+    asyncio_queue_handler = None
+    for handler in logger.handlers:
+        if isinstance(handler, AsyncioQueueHandler):
+            asyncio_queue_handler = handler
+    if asyncio_queue_handler is None:
+        return
+    logger.removeHandler(asyncio_queue_handler)
+    asyncio_queue_handler.listener.stop()
+    for handler in asyncio_queue_handler.listener.handlers:
+        logger.addHandler(handler)
+        handler.flush()
+    _asyncio_loggers.discard(logger.name)
+
+
+_asyncio_loggers: Set[str] = set()
+
+
+@atexit.register
+def _remove_all_asyncio_handlers() -> None:
+    for logger_name in list(_asyncio_loggers):
+        remove_asyncio_handlers(logging.getLogger(logger_name))
+
+
+def _restart_asyncio_handlers_after_fork() -> None:
+    for logger_name in list(_asyncio_loggers):
+        for handler in logging.getLogger(logger_name).handlers:
+            if isinstance(handler, AsyncioQueueHandler):
+                handler.restart_after_fork()
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_restart_asyncio_handlers_after_fork)
+
+
+async def flush(logger: Optional[logging.Logger] = None) -> None:
+    """
+    waits until the records which were logged before are written and the handlers are flushed, without blocking the event loop.
+    without asyncio handlers, the handlers of the logger are flushed directly
+    """
+    asyncio_queue_handler = get_asyncio_queue_handler(logger)
+    if asyncio_queue_handler is None:
+        log_handlers.logger_flush_all_handlers(logging.getLogger() if logger is None else logger)
+        return
+    listener = asyncio_queue_handler.listener
+    loop = asyncio.get_running_loop()
+    flush_request = FlushRequest(loop, loop.create_future())
+    while True:
+        try:
+            listener.queue.put_nowait(flush_request)
+            break
+        except queue.Full:
+            await listener.wait_for_space()
+    await flush_request.future
+
+
+async def alog_level(
+    message: Union[str, Callable[[], Any]],
+    level: Optional[int] = None,
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a message like lib_log_utils.log_level, for coroutines : if the queue of the asyncio handlers (see set_asyncio_handlers) is full,
+    waits for space instead of dropping the record. without asyncio handlers, the message is logged directly.
+    multi-line messages and banners are logged as one record by default (single_record), so they need one place in the queue.
+
+    >>> asyncio.run(alog_level('test', logging.ERROR))
+
+    """
+    asyncio_queue_handler = get_asyncio_queue_handler(logger)
+    if asyncio_queue_handler is not None and asyncio_queue_handler.queue.full():  # type: ignore
+        await asyncio_queue_handler.listener.wait_for_space()
+    if single_record is None:
+        single_record = True
+    lib_log_utils.log_level(
+        message=message, level=level, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+    )
+
+
+async def abanner_spam(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner SPAM from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_spam('spam'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.SPAM, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.SPAM, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_debug(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner DEBUG from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_debug('debug'))
+
+    """
+    if lib_log_utils.is_enabled(logging.DEBUG, logger, quiet):
+        await alog_level(
+            message=message, level=logging.DEBUG, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_verbose(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner VERBOSE from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_verbose('verbose'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.VERBOSE, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.VERBOSE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_info(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner INFO from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_info('info'))
+
+    """
+    if lib_log_utils.is_enabled(logging.INFO, logger, quiet):
+        await alog_level(
+            message=message, level=logging.INFO, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_notice(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner NOTICE from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_notice('notice'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.NOTICE, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.NOTICE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_success(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner SUCCESS from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_success('success'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.SUCCESS, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.SUCCESS, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_warning(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner WARNING from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_warning('warning'))
+
+    """
+    if lib_log_utils.is_enabled(logging.WARNING, logger, quiet):
+        await alog_level(
+            message=message, level=logging.WARNING, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_error(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner ERROR from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_error('error'))
+
+    """
+    if lib_log_utils.is_enabled(logging.ERROR, logger, quiet):
+        await alog_level(
+            message=message, level=logging.ERROR, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def abanner_critical(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = True,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs a banner CRITICAL from a coroutine, see alog_level
+
+    >>> asyncio.run(abanner_critical('critical'))
+
+    """
+    if lib_log_utils.is_enabled(logging.CRITICAL, logger, quiet):
+        await alog_level(
+            message=message, level=logging.CRITICAL, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_spam(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs SPAM from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_spam('spam'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.SPAM, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.SPAM, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_debug(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs DEBUG from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_debug('debug'))
+
+    """
+    if lib_log_utils.is_enabled(logging.DEBUG, logger, quiet):
+        await alog_level(
+            message=message, level=logging.DEBUG, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_verbose(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs VERBOSE from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_verbose('verbose'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.VERBOSE, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.VERBOSE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_info(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs INFO from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_info('info'))
+
+    """
+    if lib_log_utils.is_enabled(logging.INFO, logger, quiet):
+        await alog_level(
+            message=message, level=logging.INFO, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_notice(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs NOTICE from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_notice('notice'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.NOTICE, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.NOTICE, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_success(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs SUCCESS from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_success('success'))
+
+    """
+    if lib_log_utils.is_enabled(log_levels.SUCCESS, logger, quiet):
+        await alog_level(
+            message=message, level=log_levels.SUCCESS, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_warning(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs WARNING from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_warning('warning'))
+
+    """
+    if lib_log_utils.is_enabled(logging.WARNING, logger, quiet):
+        await alog_level(
+            message=message, level=logging.WARNING, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_error(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs ERROR from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_error('error'))
+
+    """
+    if lib_log_utils.is_enabled(logging.ERROR, logger, quiet):
+        await alog_level(
+            message=message, level=logging.ERROR, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
+
+
+async def alog_critical(
+    message: Union[str, Callable[[], Any]],
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    logger: Optional[logging.Logger] = None,
+    quiet: Optional[bool] = None,
+    banner: bool = False,
+    single_record: Optional[bool] = None,
+    args: Any = None,
+) -> None:
+    """
+    logs CRITICAL from a coroutine, see alog_level
+
+    >>> asyncio.run(alog_critical('critical'))
+
+    """
+    if lib_log_utils.is_enabled(logging.CRITICAL, logger, quiet):
+        await alog_level(
+            message=message, level=logging.CRITICAL, width=width, wrap=wrap, logger=logger, quiet=quiet, banner=banner, single_record=single_record, args=args
+        )
@@ -0,0 +1,284 @@
+# STDLIB
+import logging
+import marshal
+import mmap
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# PROJ
+try:
+    from . import log_identity
+except ImportError:  # pragma: no cover
+    import log_identity  # type: ignore # pragma: no cover
+
+# the binary log format of log_handlers.BinaryFileHandler :
+#   the file starts with the magic, followed by frames : varint length of the payload, payload. the first byte of the payload is the frame type.
+#   session frame : varint time in microseconds, varint pid, username, hostname_short, hostname, program_name -
+#                   written when a process starts to write, resets the string dictionary and the time base
+#   string frame  : the string - the next id of the string dictionary, ids start with 1
+#   record frame  : varint time delta in microseconds (zigzag), varint level, varint id of the logger name,
+#                   varint id of the message (template) or 0 followed by the message, the args, the exception text (empty if none)
+#   strings are varint length + utf-8, the args are varint length + the args in the marshal format version 4 (length 0 = no args).
+#   a frame which is cut off at the end of the file (the process was killed) is ignored
+magic = b"LLUBIN1\n"
+frame_session = 1
+frame_string = 2
+frame_record = 3
+marshal_version = 4
+
+# varints of one byte - most of the varints of a record
+_small_varints = [bytes((value,)) for value in range(128)]
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    >>> encode_varint(5), encode_varint(300)
+    (b'\\x05', b'\\xac\\x02')
+
+    """
+    if value < 128:
+        return _small_varints[value]
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def decode_varint(data: Any, position: int) -> Tuple[int, int]:
+    """
+    returns the value and the position after the varint
+
+    >>> decode_varint(b'\\xac\\x02', 0)
+    (300, 2)
+
+    """
+    value = data[position]
+    position += 1
+    if value < 0x80:
+        return value, position
+    value &= 0x7F
+    shift = 7
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode_string(text: str) -> bytes:
+    encoded = text.encode("utf-8", "surrogatepass")
+    return encode_varint(len(encoded)) + encoded
+
+
+def decode_string(data: Any, position: int) -> Tuple[str, int]:
+    length, position = decode_varint(data, position)
+    end = position + length
+    return bytes(data[position:end]).decode("utf-8", "surrogatepass"), end
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return encode_varint(len(payload)) + payload
+
+
+class BinaryLogEncoder(object):
+    """
+    encodes LogRecords into the frames of the binary log format. logger names are always interned in the string dictionary,
+    messages and message templates up to max_string_length characters, until the dictionary has max_strings entries.
+    the args of a template are encoded with marshal (in C, much faster than encoding them one by one), if they are of the builtin types
+    marshal supports (the exact types - not subclasses like IntEnum, which are formatted differently) - otherwise the message is encoded.
+    marshal is not secure against maliciously constructed data - decode only binary logs from trusted sources.
+
+    >>> encoder = BinaryLogEncoder()
+    >>> record = logging.makeLogRecord(dict(name='app', msg='connected to %s in %d ms', args=('db', 12), levelno=logging.INFO, created=1700000000.5))
+    >>> data = magic + encoder.session_frame(record.created) + encoder.encode(record)
+    >>> record.created = 1700000000.75
+    >>> data += encoder.encode(record)
+    >>> [(decoded.name, decoded.levelno, decoded.getMessage(), decoded.created) for decoded in iter_records(data)]
+    [('app', 20, 'connected to db in 12 ms', 1700000000.5), ('app', 20, 'connected to db in 12 ms', 1700000000.75)]
+
+    """
+
+    def __init__(self, max_strings: int = 65536, max_string_length: int = 256) -> None:
+        self.max_strings = max_strings
+        self.max_string_length = max_string_length
+        self._string_ids: Dict[str, int] = dict()
+        # (level, logger name, message) : the encoded level, logger name id and message id
+        self._headers: Dict[Tuple[int, str, str], bytes] = dict()
+        self._last_time = 0
+        self._exception_formatter = logging.Formatter()
+
+    def session_frame(self, created: float) -> bytes:
+        """returns the session frame with the identity of the process - and resets the string dictionary and the time base"""
+        self._string_ids = dict()
+        self._headers = dict()
+        self._last_time = int(created * 1000000)
+        identity = log_identity.get_identity()
+        payload = (
+            _small_varints[frame_session]
+            + encode_varint(self._last_time)
+            + encode_varint(os.getpid())
+            + b"".join(encode_string(identity[field]) for field in ("username", "hostname_short", "hostname", "program_name"))
+        )
+        return encode_frame(payload)
+
+    def encode(self, record: logging.LogRecord) -> bytes:
+        """returns the frames of the record : the string frames of new strings, and the record frame"""
+        created = int(record.created * 1000000)
+        time_delta = created - self._last_time
+        self._last_time = created
+        time_delta = time_delta << 1 if time_delta >= 0 else ((-time_delta) << 1) - 1
+
+        msg = record.msg
+        args = record.args
+        encoded_args = b"\x00"
+        if args:
+            encoded_args = b""
+            if isinstance(msg, str):
+                try:
+                    marshalled_args = marshal.dumps(args, marshal_version)  # type: ignore
+                    encoded_args = encode_varint(len(marshalled_args)) + marshalled_args
+                except ValueError:
+                    pass
+            if not encoded_args:
+                msg = record.getMessage()
+                encoded_args = b"\x00"
+        elif not isinstance(msg, str):
+            msg = record.getMessage()
+
+        # level, logger name and message (template) are encoded once
+        string_frames = b""
+        header_key = (record.levelno, record.name, msg)
+        header = self._headers.get(header_key)
+        if header is None:
+            header, string_frames = self._encode_header(record.levelno, record.name, msg)
+            if len(self._headers) < self.max_strings and len(header) < len(msg):
+                self._headers[header_key] = header
+
+        if record.exc_info or record.exc_text or record.stack_info:
+            encoded_exception = encode_string(self._format_exception(record))
+        else:
+            encoded_exception = b"\x00"
+
+        payload = b"\x03" + (_small_varints[time_delta] if time_delta < 128 else encode_varint(time_delta)) + header + encoded_args + encoded_exception
+        return string_frames + (_small_varints[len(payload)] if len(payload) < 128 else encode_varint(len(payload))) + payload
+
+    def _encode_header(self, levelno: int, name: str, msg: str) -> Tuple[bytes, bytes]:
+        """returns the encoded level, logger name and message (template), and the string frames of new strings"""
+        string_frames: List[bytes] = list()
+        name_id = self._string_ids.get(name)
+        if name_id is None:
+            name_id = self._intern(name, string_frames, always=True)
+        msg_id = self._string_ids.get(msg)
+        if msg_id is None:
+            msg_id = self._intern(msg, string_frames)
+        encoded_msg = encode_varint(msg_id) if msg_id else b"\x00" + encode_string(msg)
+        return encode_varint(levelno) + encode_varint(name_id) + encoded_msg, b"".join(string_frames)
+
+    def _intern(self, text: str, string_frames: List[bytes], always: bool = False) -> int:
+        if not always and (len(text) > self.max_string_length or len(self._string_ids) >= self.max_strings):
+            return 0
+        string_id = self._string_ids[text] = len(self._string_ids) + 1
+        string_frames.append(encode_frame(_small_varints[frame_string] + text.encode("utf-8", "surrogatepass")))
+        return string_id
+
+    def _format_exception(self, record: logging.LogRecord) -> str:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+        text = record.exc_text or ""
+        if record.stack_info:
+            text = (text + "\n" if text else "") + self._exception_formatter.formatStack(record.stack_info)
+        return text
+
+
+def iter_records(data: Any) -> Iterator[logging.LogRecord]:
+    """
+    decodes the records of a binary log (bytes or mmap). the records have the fields name, levelno, levelname, msg, args, created, msecs,
+    process, exc_text - and hostname, username and programname, like the records of the handlers of lib_log_utils
+
+    >>> list(iter_records(b'no binary log'))
+    Traceback (most recent call last):
+        ...
+    ValueError: not a binary log file of lib_log_utils
+
+    """
+    if bytes(data[: len(magic)]) != magic:
+        raise ValueError("not a binary log file of lib_log_utils")
+    position = len(magic)
+    data_length = len(data)
+    strings: List[str] = [""]
+    session: Optional[Dict[str, Any]] = None
+    last_time = 0
+    while position < data_length:
+        try:
+            payload_length, position = decode_varint(data, position)
+        except IndexError:
+            return
+        end = position + payload_length
+        if end > data_length or payload_length == 0:
+            # cut off at the end of the file
+            return
+        frame_type = data[position]
+        position += 1
+        if frame_type == frame_record and session is not None:
+            time_delta, position = decode_varint(data, position)
+            last_time += (time_delta >> 1) if not time_delta & 1 else -((time_delta + 1) >> 1)
+            levelno, position = decode_varint(data, position)
+            name_id, position = decode_varint(data, position)
+            msg_id, position = decode_varint(data, position)
+            if msg_id:
+                msg = strings[msg_id]
+            else:
+                msg, position = decode_string(data, position)
+            args, position = _decode_args(data, position)
+            exc_text, position = decode_string(data, position)
+            created = last_time / 1000000
+            yield logging.makeLogRecord(
+                dict(
+                    name=strings[name_id],
+                    levelno=levelno,
+                    levelname=logging.getLevelName(levelno),
+                    msg=msg,
+                    args=args,
+                    created=created,
+                    msecs=(created - int(created)) * 1000,
+                    exc_text=exc_text or None,
+                    **session,
+                )
+            )
+        elif frame_type == frame_string:
+            strings.append(bytes(data[position:end]).decode("utf-8", "surrogatepass"))
+        elif frame_type == frame_session:
+            last_time, position = decode_varint(data, position)
+            pid, position = decode_varint(data, position)
+            identity: List[str] = list()
+            for _ in range(4):
+                field, position = decode_string(data, position)
+                identity.append(field)
+            username, hostname_short, hostname, program_name = identity
+            session = dict(
+                process=pid, username=username, hostname=hostname, programname=program_name, hostname_short=hostname_short, program_name=program_name
+            )
+            strings = [""]
+        # unknown frames are skipped
+        position = end
+
+
+def _decode_args(data: Any, position: int) -> Tuple[Any, int]:
+    length, position = decode_varint(data, position)
+    if not length:
+        return (), position
+    end = position + length
+    return marshal.loads(bytes(data[position:end])), end
+
+
+def read_binary_log(filename: str) -> Iterator[logging.LogRecord]:
+    """returns the records of a binary log file, the file is memory mapped"""
+    with open(filename, "rb") as binary_file:
+        if os.fstat(binary_file.fileno()).st_size == 0:
+            raise ValueError("not a binary log file of lib_log_utils")
+        with mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from iter_records(data)
@@ -1,32 +1,78 @@
 # stdlib
-import getpass
+import json
 import logging
 import os
+import pathlib
 import platform
-import subprocess
 import sys
-from typing import Dict, Union
+from typing import Any, Callable, Dict, Optional, Union
 
-# OWN
-import lib_platform
-import lib_programname
+# PROJ
+try:
+    from . import log_identity
+    from . import log_rate_limit
+except ImportError:  # pragma: no cover
+    import log_identity  # type: ignore # pragma: no cover
+    import log_rate_limit  # type: ignore # pragma: no cover
 
 # Custom Types
 FieldAndLevelStyles = Dict[str, Dict[str, Union[str, bool]]]
 
 
+class IdentityFormat(object):
+    """
+    a format string with the identity fields of log_identity, which are resolved on first use - it reads like a plain
+    class attribute, on the class and on the instances. an assigned format takes precedence, None restores the default.
+
+    >>> class Settings(object):
+    ...     fmt = IdentityFormat(lambda identity: f"[{identity['program_name']}] %(message)s")
+    >>> assert Settings.fmt == Settings().fmt == f"[{log_identity.get_identity()['program_name']}] %(message)s"
+    >>> settings = Settings()
+    >>> settings.fmt = '%(message)s'
+    >>> settings.fmt
+    '%(message)s'
+    >>> settings.fmt = None
+    >>> assert settings.fmt == Settings.fmt
+
+    """
+
+    def __init__(self, get_fmt: Callable[[Dict[str, str]], str]) -> None:
+        self.get_fmt = get_fmt
+        self.attribute_name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.attribute_name = f"_{name}"
+
+    def __get__(self, instance: Any, owner: type) -> str:
+        fmt: Optional[str] = getattr(owner if instance is None else instance, self.attribute_name, None)
+        if fmt is not None:
+            return fmt
+        return self.get_fmt(log_identity.get_identity())
+
+    def __set__(self, instance: Any, fmt: Optional[str]) -> None:
+        setattr(instance, self.attribute_name, fmt)
+
+
+def _get_fmt_extended(identity: Dict[str, str]) -> str:
+    return f"[{identity['username']}@{identity['hostname_short']}][{identity['program_name']}@%(process)d][%(asctime)s][%(levelname)-8s]: %(message)s"
+
+
+def _get_fmt_extended_cli(identity: Dict[str, str]) -> str:
+    # todo: we might can get the ppid program name for cli
+    return f"[{identity['username']}@{identity['hostname_short']}][%(asctime)s][%(levelname)-8s]: %(message)s"
+
+
 class LogSettings(object):
     """this holds all the Logger Settings - You can overwrite that values as needed from Your module"""
 
     use_colored_stream_handler = True
+    # if the colored stream handler should use the ColorFormatter of lib_log_utils instead of coloredlogs, see log_handlers.set_stream_handler_color
+    use_native_color_formatter = False
 
-    fmt_extended = (
-        f"[{getpass.getuser()}@{lib_platform.hostname_short}]"
-        f"[{lib_programname.get_path_executed_script().stem}@%(process)d][%(asctime)s][%(levelname)-8s]: %(message)s"
-    )
+    # the identity fields of fmt_extended and fmt_extended_cli are resolved on first use (see log_identity)
+    fmt_extended = IdentityFormat(_get_fmt_extended)
+    fmt_extended_cli = IdentityFormat(_get_fmt_extended_cli)
 
-    # todo: we might can get the ppid program name for cli
-    fmt_extended_cli = f"[{getpass.getuser()}@{lib_platform.hostname_short}][%(asctime)s][%(levelname)-8s]: %(message)s"
     fmt_plain = "%(message)s"
     fmt = fmt_plain
 
@@ -38,12 +84,32 @@ class LogSettings(object):
     wrap = True
     # if console logging should be skipped
     quiet = False
+    # if multi-line messages and banners should be emitted as one single LogRecord instead of one LogRecord per line
+    single_record = False
+    # when log_level flushes the handlers : "always" (after every line), "message" (once per message),
+    # "records" (every flush_records records), "level" (only at flush_level), "interval" (background thread every flush_interval seconds)
+    flush_policy = "message"
+    flush_records = 100
+    # records with this level or above are flushed immediately with every flush policy
+    flush_level = logging.ERROR
+    flush_interval = 1.0
+    # the LRU cache of the rendered lines of log_level (see lib_log_utils.render_lines), keyed by message, width, wrap and banner.
+    # render_cache_size = number of cached messages, 0 disables the cache. render_cache_max_bytes = size limit of all cached lines
+    render_cache_size = 256
+    render_cache_max_bytes = 1024 * 1024
+    # if set, log_level suppresses messages above the budget of the rate limiter, keyed by call site or message template,
+    # and logs a summary "suppressed N similar messages" - see log_rate_limit.RateLimiter
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None
     # if there is no logger set, we set up a new logger with level new_logger_level
     new_logger_level = logging.INFO
     # default log_level of the stream_handler that will be added, 0 = NOTSET = every message will be taken
     stream_handler_log_level = 0
     # the stream the stream_handler should use
     stream = sys.stderr
+    # if setup_handler should move the handlers to a background thread, see log_handlers.set_async_handlers
+    use_async_handlers = False
+    # if the number of colors of the terminal is cached per TERM in ~/.cache/lib_log_utils/terminal_colors.json, see get_number_of_colors
+    use_colors_cache_file = True
 
     field_styles: FieldAndLevelStyles = {
         "asctime": {"color": "green"},
@@ -136,6 +202,26 @@ def autodetect_settings() -> int:
     >>> os.unsetenv('JUPYTERHUB_BASE_URL')
     """
 
+    colors = autodetect_environment()
+    if colors is None:
+        colors = get_number_of_colors()
+    return colors
+
+
+def autodetect_environment() -> Optional[int]:
+    """
+    sets the settings for travis and jupyter binder, only looks at the environment and is cheap enough to run at import.
+    returns the number of colors for those environments, otherwise None
+
+    >>> save_travis = os.environ.pop('TRAVIS', None)
+    >>> save_jupyter = os.environ.pop('JUPYTERHUB_BASE_URL', None)
+    >>> assert autodetect_environment() is None
+    >>> if save_travis is not None:
+    ...     os.environ['TRAVIS'] = save_travis
+    >>> if save_jupyter is not None:
+    ...     os.environ['JUPYTERHUB_BASE_URL'] = save_jupyter
+
+    """
     if "TRAVIS" in os.environ:
         # note that there will be no colored output on travis, as soon as
         # a secret is in travis.yaml, since then the output is filtered.
@@ -151,19 +237,152 @@ def autodetect_settings() -> int:
             log_settings.stream = sys.stdout
             colors = 256
             return colors
+    return None
 
-    if platform.system().lower() != "windows":
-        try:
-            # capture_output not available under python 3.6 !
-            # my_process = subprocess.run(['tput', 'colors'], check=True, capture_output=True)
-            # colors = int(my_process.stdout)
-            output = subprocess.check_output(["tput", "colors"], stderr=subprocess.PIPE)
-            colors = int(output)
-        except subprocess.CalledProcessError:  # pragma: no cover
-            colors = 256  # pragma: no cover
-    else:
-        colors = 256
+
+def autodetect_level_styles() -> None:
+    """
+    selects level_styles_8 if the terminal supports less than 256 colors and the level_styles were not changed.
+    this is called when a colored stream handler is set up - so the terminal is only examined if colors are used.
+
+    >>> save_level_styles = log_settings.level_styles
+    >>> autodetect_level_styles()
+    >>> assert log_settings.level_styles in (log_settings.level_styles_8, log_settings.level_styles_256)
+    >>> log_settings.level_styles = save_level_styles
+
+    """
+    if log_settings.level_styles is log_settings.level_styles_256 and 0 < get_number_of_colors() < 256:
+        log_settings.level_styles = log_settings.level_styles_8
+
+
+# the number of colors per TERM, for this process
+_number_of_colors: Dict[str, int] = dict()
+
+
+def get_number_of_colors() -> int:
+    """
+    returns the number of colors of the terminal, like "tput colors" - but without starting a subprocess.
+    the result is cached per TERM in memory, and in a small file in the users cache directory if log_settings.use_colors_cache_file is set.
+    terminfo is only read if the stream of log_settings is a terminal - otherwise, or if that fails, 256 like "tput colors" without a terminal
+
+    >>> save_term = os.environ.get('TERM')
+    >>> os.environ['TERM'] = 'xterm-256color'
+    >>> get_number_of_colors()
+    256
+    >>> if save_term is None:
+    ...     del os.environ['TERM']
+    ... else:
+    ...     os.environ['TERM'] = save_term
+    >>> assert get_number_of_colors() != 0
+
+    """
+    if platform.system().lower() == "windows":
+        return 256
+
+    term = os.environ.get("TERM", "")
+    if term in _number_of_colors:
+        return _number_of_colors[term]
+
+    colors = _detect_colors_by_environment(term)
+    if colors is None:
+        disk_cache = _read_colors_cache() if log_settings.use_colors_cache_file else dict()
+        colors = disk_cache.get(term)
+        if colors is None:
+            colors = _detect_colors_by_terminfo(term)
+            if colors is None:
+                colors = 256
+            elif log_settings.use_colors_cache_file:
+                disk_cache[term] = colors
+                _write_colors_cache(disk_cache)
+
+    _number_of_colors[term] = colors
     return colors
 
 
-autodetect_settings()
+def _detect_colors_by_environment(term: str) -> Optional[int]:
+    """
+    >>> _detect_colors_by_environment('xterm-256color')
+    256
+    >>> assert _detect_colors_by_environment('') == 256
+    """
+    if os.environ.get("COLORTERM", "").lower() in ("truecolor", "24bit"):
+        return 256
+    if term.endswith("256color"):
+        return 256
+    if not term:
+        # same as "tput colors" failing without a TERM
+        return 256
+    return None
+
+
+def _detect_colors_by_terminfo(term: str, stream: Any = None) -> Optional[int]:
+    """
+    reads the number of colors from terminfo in-process - returns None if the stream (default: log_settings.stream) is not a terminal,
+    there is no curses or terminfo, or the terminal is unknown
+
+    >>> import io
+    >>> _detect_colors_by_terminfo('xterm', stream=io.StringIO()) is None
+    True
+    >>> if hasattr(os, 'openpty'):
+    ...     master_fd, slave_fd = os.openpty()
+    ...     with open(slave_fd, 'w') as tty_stream:
+    ...         assert _detect_colors_by_terminfo('no-such-terminal', stream=tty_stream) is None
+    ...         assert _detect_colors_by_terminfo('xterm', stream=tty_stream) in (None, 8)
+    ...     os.close(master_fd)
+    """
+    stream = stream if stream is not None else log_settings.stream
+    try:
+        if not stream.isatty():
+            return None
+    except (AttributeError, ValueError):
+        return None
+
+    try:
+        import curses
+    except ImportError:  # pragma: no cover
+        return None
+    try:
+        fd = os.open(os.devnull, os.O_WRONLY)
+        try:
+            curses.setupterm(term, fd)
+        finally:
+            os.close(fd)
+        colors = curses.tigetnum("colors")
+    except (curses.error, OSError, ValueError):
+        # unknown terminal, no terminfo database
+        return None
+    if colors < 0:  # pragma: no cover
+        # -1 : no colors capability, -2 : not a numeric capability
+        return None
+    return int(colors)
+
+
+def _get_colors_cache_path() -> pathlib.Path:
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or str(pathlib.Path.home() / ".cache")
+    return pathlib.Path(cache_dir) / "lib_log_utils" / "terminal_colors.json"
+
+
+def _read_colors_cache() -> Dict[str, int]:
+    try:
+        with open(_get_colors_cache_path(), "r") as cache_file:
+            disk_cache = json.load(cache_file)
+        if isinstance(disk_cache, dict):
+            return {str(term): int(colors) for term, colors in disk_cache.items()}
+    except (OSError, ValueError, TypeError, AttributeError):
+        pass
+    return dict()
+
+
+def _write_colors_cache(disk_cache: Dict[str, int]) -> None:
+    cache_path = _get_colors_cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as cache_file:
+            json.dump(disk_cache, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError:  # pragma: no cover
+        pass
+
+
+autodetect_environment()
@@ -0,0 +1,300 @@
+# STDLIB
+import array
+import json
+import logging
+import os
+import pathlib
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+# PROJ
+try:
+    from . import lib_log_utils
+    from . import log_handlers
+    from . import log_levels
+except ImportError:  # pragma: no cover
+    import lib_log_utils  # type: ignore # pragma: no cover
+    import log_handlers  # type: ignore # pragma: no cover
+    import log_levels  # type: ignore # pragma: no cover
+
+# the answers of the daemon
+answer_ok = b"ok\n"
+# the client should log in-process, for instance because its environment settings differ from the daemon
+answer_fallback = b"fallback\n"
+
+# the timeout of the client in seconds - if the daemon does not answer in time, the client falls back to in-process logging
+client_timeout = 5.0
+
+# the timeout of the daemon in seconds to read a request - a stalled client must not block the daemon
+server_timeout = 1.0
+
+
+def get_socket_dir() -> str:
+    """
+    returns the private directory of the default socket : log_util-<uid> in $XDG_RUNTIME_DIR or the temp directory
+
+    >>> assert os.path.basename(get_socket_dir()).startswith('log_util-')
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return str(pathlib.Path(runtime_dir) / f"log_util-{uid}")
+
+
+def get_socket_path() -> str:
+    """
+    returns the path of the unix domain socket : $LOG_UTIL_SOCKET, or log_util.sock in the private directory get_socket_dir()
+
+    >>> save_socket = os.environ.pop('LOG_UTIL_SOCKET', None)
+    >>> assert get_socket_path() == os.path.join(get_socket_dir(), 'log_util.sock')
+    >>> os.environ['LOG_UTIL_SOCKET'] = '/tmp/test.sock'
+    >>> get_socket_path()
+    '/tmp/test.sock'
+    >>> if save_socket is None:
+    ...     del os.environ['LOG_UTIL_SOCKET']
+    ... else:
+    ...     os.environ['LOG_UTIL_SOCKET'] = save_socket
+
+    """
+    if "LOG_UTIL_SOCKET" in os.environ:
+        return os.environ["LOG_UTIL_SOCKET"]
+    return str(pathlib.Path(get_socket_dir()) / "log_util.sock")
+
+
+def is_private_dir(path: str) -> bool:
+    """
+    returns True if path is a directory (not a symlink) of the current user, which is not accessible by other users.
+    in a shared temp directory, any user can create log_util-<uid> first - then it is not used.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     os.chmod(tmp_dir, 0o700)
+    ...     assert is_private_dir(tmp_dir)
+    ...     os.chmod(tmp_dir, 0o755)
+    ...     assert not is_private_dir(tmp_dir)
+    >>> is_private_dir('/non/existing/dir')
+    False
+
+    """
+    try:
+        dir_stat = os.lstat(path)
+    except OSError:
+        return False
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return stat.S_ISDIR(dir_stat.st_mode) and dir_stat.st_uid == uid and not dir_stat.st_mode & 0o077
+
+
+def make_private_dir(path: str) -> None:
+    """
+    creates the directory with mode 0700, raises RuntimeError if it exists and is not private
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     make_private_dir(os.path.join(tmp_dir, 'private'))
+    ...     make_private_dir(os.path.join(tmp_dir, 'private'))
+    ...     os.chmod(tmp_dir, 0o755)
+    ...     make_private_dir(tmp_dir)
+    Traceback (most recent call last):
+        ...
+    RuntimeError: the socket directory "..." is not a private directory of the current user
+
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    if not is_private_dir(path):
+        raise RuntimeError(f'the socket directory "{path}" is not a private directory of the current user')
+
+
+def is_trusted_socket_path(socket_path: str) -> bool:
+    """
+    the default socket is only used in a private directory, a socket path set with LOG_UTIL_SOCKET is trusted
+
+    >>> save_socket = os.environ.pop('LOG_UTIL_SOCKET', None)
+    >>> is_trusted_socket_path('/tmp/some.sock')
+    True
+    >>> assert is_trusted_socket_path(get_socket_path()) == is_private_dir(get_socket_dir())
+    >>> if save_socket is not None:
+    ...     os.environ['LOG_UTIL_SOCKET'] = save_socket
+
+    """
+    if "LOG_UTIL_SOCKET" in os.environ or os.path.dirname(socket_path) != get_socket_dir():
+        return True
+    return is_private_dir(get_socket_dir())
+
+
+def get_environment_settings() -> Dict[str, str]:
+    """the LOG_UTIL_* and COLOREDLOGS_* environment settings which influence the output, the socket path excluded"""
+    return {key: value for key, value in os.environ.items() if (key.startswith("LOG_UTIL_") or key.startswith("COLOREDLOGS_")) and key != "LOG_UTIL_SOCKET"}
+
+
+def send(
+    message: str, level_str: str = "info", banner: bool = False, width: Optional[int] = None, wrap: Optional[bool] = None, socket_path: Optional[str] = None
+) -> bool:
+    """
+    sends the message to the log daemon, returns False if there is no daemon, or the daemon can not log the message,
+    in that case the caller has to log the message in-process.
+    the stderr file descriptor of the client is passed to the daemon (SCM_RIGHTS), so the message is written
+    to the stderr of the client. returns after the daemon has logged the message, so the order of the output is kept.
+
+    >>> send('test', socket_path='/non/existing/socket')
+    False
+
+    """
+    if not hasattr(socket, "AF_UNIX") or not hasattr(socket, "SCM_RIGHTS"):  # pragma: no cover
+        return False
+    socket_path = socket_path or get_socket_path()
+    if not os.path.exists(socket_path) or not is_trusted_socket_path(socket_path):
+        return False
+
+    sys.stderr.flush()
+    request = dict(message=message, level=level_str, banner=banner, width=width, wrap=wrap, env=get_environment_settings(), isatty=os.isatty(2))
+    data = json.dumps(request).encode("utf-8") + b"\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+            client_socket.settimeout(client_timeout)
+            client_socket.connect(socket_path)
+            sent = client_socket.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", [2]))])
+            if sent < len(data):
+                client_socket.sendall(data[sent:])
+            answer = client_socket.makefile("rb").readline()
+    except OSError:
+        return False
+    return answer == answer_ok
+
+
+class LogRequestHandler(socketserver.StreamRequestHandler):
+    """logs the message of one client connection - one json object, with the stderr file descriptor of the client"""
+
+    server: "LogDaemon"
+    timeout = server_timeout
+
+    def receive_request(self) -> Tuple[bytes, List[int]]:
+        """reads the request line and the passed file descriptors, raises socket.timeout if the client stalls"""
+        fd_size = array.array("i").itemsize
+        data = b""
+        fds: List[int] = list()
+        while not data.endswith(b"\n"):
+            chunk, ancdata, _, _ = self.request.recvmsg(65536, socket.CMSG_SPACE(fd_size))
+            for cmsg_level, cmsg_type, cmsg_data in ancdata:
+                if cmsg_level == socket.SOL_SOCKET and cmsg_type == socket.SCM_RIGHTS:
+                    fds.extend(array.array("i", cmsg_data[: len(cmsg_data) - len(cmsg_data) % fd_size]))
+            if not chunk:
+                break
+            data += chunk
+        return data, fds
+
+    def handle(self) -> None:
+        fds: List[int] = list()
+        try:
+            data, fds = self.receive_request()
+            if len(fds) != 1:
+                answer = answer_fallback
+            else:
+                answer = self.server.log_request(json.loads(data), stderr_fd=fds[0])
+        except OSError:
+            # the client stalled or closed the connection
+            return
+        except Exception:  # noqa
+            answer = answer_fallback
+        finally:
+            for fd in fds:
+                os.close(fd)
+        self.wfile.write(answer)
+        self.wfile.flush()
+
+
+if hasattr(socketserver, "UnixStreamServer"):  # not available on Windows
+    _UnixStreamServer = socketserver.UnixStreamServer
+else:  # pragma: no cover
+    _UnixStreamServer = socketserver.TCPServer  # type: ignore # pragma: no cover
+
+
+class LogDaemon(_UnixStreamServer):  # type: ignore
+    """
+    the log daemon, handles one connection after the other, so the messages are logged in the order they arrive.
+    the handlers have to be set up before - see lib_log_utils_cli.do_serve
+    """
+
+    def __init__(self, socket_path: str, logger: logging.Logger = logging.getLogger()):
+        self.logger = logger
+        self.environment_settings = get_environment_settings()
+        # the colors are chosen when the handlers are set up, for the stderr of the daemon
+        self.isatty = os.isatty(2)
+        super().__init__(socket_path, LogRequestHandler)
+
+    def log_request(self, request: Dict[str, Any], stderr_fd: int) -> bytes:
+        """logs the message to the stderr of the client : fd 2 of the daemon is redirected to stderr_fd meanwhile"""
+        if request.get("env", dict()) != self.environment_settings or request.get("isatty") != self.isatty:
+            return answer_fallback
+        level = log_levels.get_log_level_from_str(str(request["level"]))
+        sys.stderr.flush()
+        saved_stderr_fd = os.dup(2)
+        os.dup2(stderr_fd, 2)
+        try:
+            lib_log_utils.log_level(
+                message=str(request["message"]),
+                level=level,
+                width=request.get("width"),
+                wrap=request.get("wrap"),
+                logger=self.logger,
+                banner=bool(request.get("banner", False)),
+            )
+            log_handlers.logger_flush_all_handlers(self.logger)
+            sys.stderr.flush()
+        finally:
+            os.dup2(saved_stderr_fd, 2)
+            os.close(saved_stderr_fd)
+        return answer_ok
+
+
+def is_daemon_running(socket_path: str) -> bool:
+    """
+    >>> is_daemon_running('/non/existing/socket')
+    False
+    """
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+            client_socket.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+def serve(socket_path: Optional[str] = None, logger: logging.Logger = logging.getLogger()) -> None:
+    """
+    serves log requests on the unix domain socket until SIGTERM or SIGINT, the socket is removed at exit.
+    the default socket is created in a private directory (mode 0700). the handlers have to be set up before.
+    """
+    socket_path = socket_path or get_socket_path()
+    if "LOG_UTIL_SOCKET" not in os.environ and os.path.dirname(socket_path) == get_socket_dir():
+        make_private_dir(get_socket_dir())
+    if is_daemon_running(socket_path):
+        raise RuntimeError(f'the log daemon is already running on socket "{socket_path}"')
+    if os.path.exists(socket_path):
+        # stale socket of a daemon which was killed
+        os.unlink(socket_path)
+
+    def stop(signum: int, frame: Optional[FrameType]) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    log_daemon = LogDaemon(socket_path, logger=logger)
+    try:
+        log_daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_daemon.server_close()
+        try:
+            os.unlink(socket_path)
+        except OSError:  # pragma: no cover
+            pass
@@ -1,22 +1,43 @@
 # STDLIB
+import atexit
+import collections
+import copy
+import json
 import logging
 import logging.handlers
-import getpass
+import mmap
+import operator
 import os
 import platform
+import queue
+import re
+import struct
 import sys
+import threading
+import time
+import weakref
 from types import TracebackType
-from typing import Any, Dict, Optional, Tuple, Union, TextIO, Type
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union, TextIO, Type
 
 LogHandler = Union[type, Tuple[Union[type, Tuple[Any, ...]], ...]]
 
 # OWN
 import lib_parameter
-import lib_platform
-import lib_programname
+
+# PROJ
+try:
+    from . import log_ansi
+    from . import log_binary
+    from . import log_identity
+    from . import log_rate_limit
+except ImportError:  # pragma: no cover
+    import log_ansi  # type: ignore # pragma: no cover
+    import log_binary  # type: ignore # pragma: no cover
+    import log_identity  # type: ignore # pragma: no cover
+    import log_rate_limit  # type: ignore # pragma: no cover
 
 # EXT
-import coloredlogs  # type: ignore
+# coloredlogs is imported lazily, only if a colored stream handler is set up with coloredlogs (see set_stream_handler_color)
 
 # Custom Types
 FieldAndLevelStyles = Dict[str, Dict[str, Union[str, bool]]]
@@ -46,6 +67,809 @@ class HostnameFilter(logging.Filter):
         return True
 
 
+class MultiLineFormatterMixin(object):
+    """
+    formats records which carry the attribute 'block_lines' (see lib_log_utils.log_level, single_record=True),
+    or which have a msg with the attribute 'block_lines' (lib_log_utils.LazyMessage, built only now)
+    with the complete format prefix (and suffix) on every physical line, otherwise formats as usual.
+
+    >>> formatter = MultiLineFormatter('[%(levelname)s] %(message)s')
+    >>> record = logging.makeLogRecord(dict(msg='line1\\nline2', levelname='INFO', block_lines=['line1', 'line2']))
+    >>> print(formatter.format(record))
+    [INFO] line1
+    [INFO] line2
+    >>> record = logging.makeLogRecord(dict(msg='line1\\nline2', levelname='INFO'))
+    >>> print(formatter.format(record))
+    [INFO] line1
+    line2
+
+    """
+
+    _block_marker = "\x00lib_log_utils_block\x00"
+
+    def format(self, record: logging.LogRecord) -> str:
+        block_lines = getattr(record, "block_lines", None) or getattr(record.msg, "block_lines", None)
+        if not block_lines or record.exc_info or record.exc_text or record.stack_info:
+            return super().format(record)  # type: ignore
+
+        # format once with a marker as message, then reuse prefix and suffix for every line
+        marker_record = copy.copy(record)
+        marker_record.msg = self._block_marker
+        marker_record.args = None
+        formatted = super().format(marker_record)  # type: ignore
+        prefix, marker, suffix = formatted.partition(self._block_marker)
+        if not marker:
+            # the format has no %(message)s field
+            return "\n".join([formatted] * len(block_lines))
+        return "\n".join([prefix + line + suffix for line in block_lines])
+
+
+class CachedTimeFormatterMixin(object):
+    """
+    caches the rendered timestamp of formatTime for the current second, if the date format has second resolution.
+    the cache is one tuple, which is replaced as a whole - so it is thread safe without a lock.
+    the converter (time.localtime) is still used for every new second, so timezone and DST are correct.
+    date formats with '%f' (coloredlogs) and datefmt=None (logging adds the milliseconds) are passed to the formatter.
+
+    >>> formatter = MultiLineFormatter('%(asctime)s %(message)s', default_date_fmt)
+    >>> record = logging.makeLogRecord(dict(msg='test', created=1700000000.25))
+    >>> assert formatter.formatTime(record, default_date_fmt) == logging.Formatter.formatTime(formatter, record, default_date_fmt)
+    >>> formatter._time_cache[0]
+    1700000000
+    >>> record.created = 1700000000.75
+    >>> assert formatter.formatTime(record, default_date_fmt) == logging.Formatter.formatTime(formatter, record, default_date_fmt)
+    >>> record.created = 1700000001.0
+    >>> assert formatter.formatTime(record, default_date_fmt) == logging.Formatter.formatTime(formatter, record, default_date_fmt)
+    >>> formatter._time_cache[0]
+    1700000001
+
+    """
+
+    # (second, date format, rendered timestamp)
+    _time_cache: Tuple[Optional[int], Optional[str], str] = (None, None, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        if not datefmt or "%f" in datefmt:
+            return super().formatTime(record, datefmt)  # type: ignore
+        second = int(record.created)
+        cached_second, cached_datefmt, rendered = self._time_cache
+        if second != cached_second or datefmt != cached_datefmt:
+            rendered = super().formatTime(record, datefmt)  # type: ignore
+            self._time_cache = (second, datefmt, rendered)
+        return rendered
+
+
+class MultiLineFormatter(MultiLineFormatterMixin, CachedTimeFormatterMixin, logging.Formatter):
+    pass
+
+
+# an escaped percent sign, or a formatting directive with the field name captured
+compile_directive_pattern = re.compile(r"%%|" + log_ansi.format_directive_pattern.pattern)
+
+
+class CompiledFormatter(MultiLineFormatter):
+    """
+    a MultiLineFormatter for %-style formats, which renders the fields that are constant within a process
+    (the process id - the identity fields are already filled in by format_fmt) into the format once.
+    every record interpolates only its own fields, fetched with one attrgetter call.
+    the format is compiled again after a fork (another record.process), or if the format was changed (see set_log_handler_formatter_prefix).
+    the output is the same as the output of logging.Formatter.
+
+    >>> formatter = CompiledFormatter('[%(process)d][%(levelname)-8s] 100%% %(message)s')
+    >>> record = logging.makeLogRecord(dict(msg='test', levelname='INFO', process=4711))
+    >>> formatter.format(record)
+    '[4711][INFO    ] 100% test'
+    >>> formatter._compiled[2]
+    '[4711][%-8s] 100%% %s'
+    >>> record = logging.makeLogRecord(dict(msg='forked', levelname='INFO', process=4712))
+    >>> formatter.format(record)
+    '[4712][INFO    ] 100% forked'
+    >>> assert formatter.format(record) == logging.Formatter('[%(process)d][%(levelname)-8s] 100%% %(message)s').format(record)
+
+    """
+
+    # the fields which are the same for every record of the process
+    static_fields = ("process",)
+
+    def __init__(self, fmt: Optional[str] = None, datefmt: Optional[str] = None) -> None:
+        super().__init__(fmt, datefmt)
+        # (source format, process id, compiled format, getter of the per record fields) - replaced as a whole, so it is thread safe
+        self._compiled: Tuple[Optional[str], Optional[int], str, Callable[[logging.LogRecord], Tuple[Any, ...]]] = (None, None, "", _get_no_fields)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        source, pid, compiled_fmt, get_fields = self._compiled
+        if source is not self._style._fmt or pid != record.process:
+            if not isinstance(self._style, logging.PercentStyle):
+                return super().formatMessage(record)
+            source, pid, compiled_fmt, get_fields = self._compiled = self._compile(self._style._fmt, record.process)
+        try:
+            return compiled_fmt % get_fields(record)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # a missing field, a value which does not fit the directive or a directive we do not compile - let logging.Formatter handle it
+            return super().formatMessage(record)
+
+    def _compile(self, source: str, pid: Optional[int]) -> Tuple[str, Optional[int], str, Callable[[logging.LogRecord], Tuple[Any, ...]]]:
+        static_values = dict(process=pid)
+        l_parts: List[str] = []
+        l_fields: List[str] = []
+        position = 0
+        for match in compile_directive_pattern.finditer(source):
+            l_parts.append(source[position : match.start()])
+            field_name = match.group(1)
+            if field_name is None:
+                # an escaped percent sign
+                l_parts.append(match.group(0))
+            elif field_name in self.static_fields:
+                l_parts.append((match.group(0) % static_values).replace("%", "%%"))
+            else:
+                l_parts.append(match.group(0).replace(f"({field_name})", "", 1))
+                l_fields.append(field_name)
+            position = match.end()
+        l_parts.append(source[position:])
+
+        get_fields: Callable[[logging.LogRecord], Tuple[Any, ...]]
+        if not l_fields:
+            get_fields = _get_no_fields
+        elif len(l_fields) == 1:
+            get_field = operator.attrgetter(l_fields[0])
+            get_fields = lambda record: (get_field(record),)  # noqa: E731
+        else:
+            get_fields = operator.attrgetter(*l_fields)
+        return source, pid, "".join(l_parts), get_fields
+
+
+def _get_no_fields(record: logging.LogRecord) -> Tuple[Any, ...]:
+    return ()
+
+
+class ColorFormatter(MultiLineFormatter):
+    """
+    colors the fields and the message with ANSI escape sequences, like coloredlogs.ColoredFormatter, but without coloredlogs :
+    the field styles are compiled into the format once, the level styles into one format per level name (on first use of the level),
+    where the message directive is wrapped in the escape sequences of the level - no style lookup and no copy of the record per record.
+
+    >>> formatter = ColorFormatter('[%(levelname)s] %(message)s', field_styles={'levelname': {'color': 'yellow'}}, level_styles={'error': {'color': 'red'}})
+    >>> formatter.format(logging.makeLogRecord(dict(msg='test', levelname='ERROR')))
+    '\\x1b[33m[ERROR]\\x1b[0m \\x1b[31mtest\\x1b[0m'
+    >>> formatter.format(logging.makeLogRecord(dict(msg='test', levelname='INFO')))
+    '\\x1b[33m[INFO]\\x1b[0m test'
+
+    """
+
+    def __init__(
+        self,
+        fmt: Optional[str] = None,
+        datefmt: Optional[str] = None,
+        field_styles: Optional[FieldAndLevelStyles] = None,
+        level_styles: Optional[FieldAndLevelStyles] = None,
+    ) -> None:
+        super().__init__(log_ansi.colorize_fmt(fmt or "%(message)s", field_styles), datefmt)
+        self.level_styles: FieldAndLevelStyles = dict(level_styles or dict())
+        # (source format, the PercentStyle per level name) - replaced as a whole if the format was changed (see set_log_handler_formatter_prefix)
+        self._level_formats: Tuple[Optional[str], Dict[str, logging.PercentStyle]] = (None, dict())
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        # like coloredlogs : '%f' in the date format are the milliseconds
+        if datefmt and "%f" in datefmt:
+            datefmt = datefmt.replace("%f", "%03d" % record.msecs)
+        return super().formatTime(record, datefmt)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        source, level_formats = self._level_formats
+        if source is not self._style._fmt:
+            source, level_formats = self._level_formats = (self._style._fmt, dict())
+        level_format = level_formats.get(record.levelname)
+        if level_format is None:
+            level_format = level_formats[record.levelname] = logging.PercentStyle(self._get_level_fmt(source, record.levelname))
+        return level_format.format(record)
+
+    def _get_level_fmt(self, fmt: str, level_name: str) -> str:
+        start = log_ansi.ansi_style(log_ansi.get_style(self.level_styles, level_name))
+        if not start:
+            return fmt
+
+        def wrap_message(match: "re.Match[str]") -> str:
+            if match.group(1) == "message":
+                return start + match.group(0) + log_ansi.ANSI_RESET
+            return match.group(0)
+
+        return compile_directive_pattern.sub(wrap_message, fmt)
+
+
+class StandardErrorHandler(logging.StreamHandler):  # type: ignore
+    """a StreamHandler which writes to the current sys.stderr, like coloredlogs.StandardErrorHandler - so sys.stderr can be replaced later"""
+
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        logging.Handler.__init__(self, level)
+
+    @property
+    def stream(self) -> TextIO:  # type: ignore
+        return sys.stderr
+
+
+class IdentityFilter(logging.Filter):
+    """
+    adds the fields programname and username of coloredlogs to the records,
+    the program name like coloredlogs.find_program_name (the base name of sys.argv[0])
+
+    >>> record = logging.makeLogRecord(dict())
+    >>> discard = IdentityFilter().filter(record)
+    >>> assert record.username == log_identity.get_identity()['username']  # noqa
+    >>> assert record.programname  # noqa
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.programname = (
+            (os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] != "-c" else "")
+            or (os.path.basename(sys.executable) if sys.executable else "")
+            or "python"
+        )
+
+    def filter(self, record: Any) -> bool:
+        record.programname = self.programname
+        record.username = log_identity.get_identity()["username"]
+        return True
+
+
+def get_formatter(fmt: str, datefmt: Optional[str] = None) -> logging.Formatter:
+    """
+    returns the formatter for the handlers of _add_handler : a CompiledFormatter, if the format has fields which are constant within the process,
+    otherwise a MultiLineFormatter
+
+    >>> assert isinstance(get_formatter(default_fmt), CompiledFormatter)
+    >>> assert not isinstance(get_formatter('%(message)s'), CompiledFormatter)
+
+    """
+    field_names = {match.group(1) for match in log_ansi.format_directive_pattern.finditer(fmt)}
+    if field_names.intersection(CompiledFormatter.static_fields):
+        return CompiledFormatter(fmt, datefmt)
+    return MultiLineFormatter(fmt, datefmt)
+
+
+_multiline_formatter_classes: Dict[type, type] = dict()
+
+
+def make_multiline_formatter(formatter: logging.Formatter) -> logging.Formatter:
+    """
+    turns a formatter created elsewhere (like the coloredlogs formatter) into a multiline formatter,
+    by switching its class to a subclass with the MultiLineFormatterMixin (and the CachedTimeFormatterMixin)
+
+    >>> formatter = make_multiline_formatter(logging.Formatter('[%(levelname)s] %(message)s'))
+    >>> assert isinstance(formatter, MultiLineFormatterMixin)
+    >>> assert make_multiline_formatter(formatter) is formatter
+
+    """
+    formatter_class = type(formatter)
+    if issubclass(formatter_class, MultiLineFormatterMixin):
+        return formatter
+    if formatter_class not in _multiline_formatter_classes:
+        _multiline_formatter_classes[formatter_class] = type(
+            "MultiLine" + formatter_class.__name__, (MultiLineFormatterMixin, CachedTimeFormatterMixin, formatter_class), dict()
+        )
+    formatter.__class__ = _multiline_formatter_classes[formatter_class]
+    return formatter
+
+
+# the date format of the JsonFormatter, ISO 8601 with milliseconds and the utc offset
+json_date_fmt = "%Y-%m-%dT%H:%M:%S.%f%z"
+# the placeholder for the milliseconds in the cached timestamp of the JsonFormatter
+msecs_marker = "{msecs}"
+
+
+def get_json_string_encoder() -> Callable[[str], str]:
+    """
+    returns a function which encodes a string as JSON string (without escaping non-ASCII characters) -
+    with orjson if it is installed, otherwise with the C encoder of the json module
+
+    >>> encode_string = get_json_string_encoder()
+    >>> encode_string('say "ham"\\nand spam')
+    '"say \\\\"ham\\\\"\\\\nand spam"'
+    >>> assert json.loads(encode_string('\\ud800')) == '\\ud800'
+
+    """
+    try:
+        import orjson  # type: ignore
+    except ImportError:  # pragma: no cover
+        return json.encoder.encode_basestring  # type: ignore
+
+    orjson_dumps = orjson.dumps
+    encode_basestring_ascii = json.encoder.encode_basestring_ascii
+
+    def encode_string(text: str) -> str:
+        try:
+            return orjson_dumps(text).decode("utf-8")  # type: ignore
+        except TypeError:
+            # lone surrogates - escaped by the json module
+            return encode_basestring_ascii(text)  # type: ignore
+
+    return encode_string
+
+
+class JsonFormatter(CachedTimeFormatterMixin, logging.Formatter):
+    """
+    formats the records as JSON lines, with the keys time, level, user, hostname, program, pid and message
+    (and exception, if the record has a traceback or stack info). user, hostname, program and pid are serialized once
+    (and again after a fork), level names once per level, the timestamp once per second - per record only the message is escaped.
+    multi-line messages of lib_log_utils.log_level go out as one JSON object, because log_level logs them as one record
+    if a handler of the logger has a JsonFormatter (see single_record_required).
+
+    >>> formatter = JsonFormatter()
+    >>> record = logging.makeLogRecord(dict(msg='this is\\n"ham"', levelname='INFO', created=1700000000.25, msecs=250.0, process=4711))
+    >>> json_record = json.loads(formatter.format(record))
+    >>> json_record['level'], json_record['message'], json_record['pid']
+    ('INFO', 'this is\\n"ham"', 4711)
+    >>> assert json_record['time'].startswith(time.strftime('%Y-%m-%dT%H:%M:%S.250', time.localtime(1700000000.25)))
+    >>> assert list(json_record) == ['time', 'level', 'user', 'hostname', 'program', 'pid', 'message']
+
+    """
+
+    def __init__(self, datefmt: Optional[str] = json_date_fmt) -> None:
+        super().__init__(fmt="%(message)s", datefmt=datefmt)
+        self.encode_string = get_json_string_encoder()
+        # the date format for the cached timestamp, the milliseconds are filled in per record
+        self._cache_datefmt = datefmt.replace("%f", msecs_marker) if datefmt else datefmt
+        # (pid, the serialized static fields)
+        self._static: Tuple[Optional[int], str] = (None, "")
+        # (second, serialized timestamp before and after the milliseconds)
+        self._json_time: Tuple[Optional[int], str, str] = (None, "", "")
+        # level name : serialized level name
+        self._json_levels: Dict[str, str] = dict()
+
+    def format(self, record: logging.LogRecord) -> str:
+        pid, json_static = self._static
+        if pid != record.process or not json_static:
+            json_static = self._get_json_static(record.process)
+            self._static = (record.process, json_static)
+        json_level = self._json_levels.get(record.levelname)
+        if json_level is None:
+            json_level = self._json_levels[record.levelname] = self.encode_string(str(record.levelname))
+        json_line = (
+            '{"time":' + self._get_json_time(record) + ',"level":' + json_level + "," + json_static + '"message":' + self.encode_string(record.getMessage())
+        )
+        if record.exc_info or record.exc_text or record.stack_info:
+            json_line += ',"exception":' + self.encode_string(self._format_exception(record))
+        return json_line + "}"
+
+    def _get_json_time(self, record: logging.LogRecord) -> str:
+        if not self._cache_datefmt:
+            return self.encode_string(self.formatTime(record))
+        second = int(record.created)
+        cached_second, json_head, json_tail = self._json_time
+        if second != cached_second:
+            # without milliseconds in the date format, json_tail is empty
+            json_head, _, json_tail = self.encode_string(self.formatTime(record, self._cache_datefmt)).partition(msecs_marker)
+            self._json_time = (second, json_head, json_tail)
+        if json_tail:
+            return json_head + "%03d" % record.msecs + json_tail
+        return json_head
+
+    def _get_json_static(self, pid: Optional[int]) -> str:
+        identity = log_identity.get_identity()
+        static_fields = dict(user=identity["username"], hostname=identity["hostname_short"], program=identity["program_name"], pid=pid)
+        # the serialized fields without the braces, followed by a comma
+        return json.dumps(static_fields, ensure_ascii=False)[1:-1] + ","
+
+    def _format_exception(self, record: logging.LogRecord) -> str:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        text = record.exc_text or ""
+        if record.stack_info:
+            text = (text + "\n" if text else "") + self.formatStack(record.stack_info)
+        return text
+
+
+def single_record_required(logger: logging.Logger) -> bool:
+    """
+    returns True if a handler of the logger, or of the loggers it propagates to, has a JsonFormatter - then lib_log_utils.log_level
+    logs multi-line messages as one record, so they go out as one JSON object (the multi-line formatters print one record like many records)
+
+    >>> logger = logging.getLogger('test_single_record_required')
+    >>> child_logger = logging.getLogger('test_single_record_required.child')
+    >>> handler = logging.NullHandler()
+    >>> handler.setFormatter(JsonFormatter())
+    >>> logger.addHandler(handler)
+    >>> single_record_required(child_logger), single_record_required(logging.getLogger('test_single_record_required_other'))
+    (True, False)
+    >>> child_logger.propagate = False
+    >>> single_record_required(child_logger)
+    False
+    >>> logger.removeHandler(handler)
+
+    """
+    current_logger: Optional[logging.Logger] = logger
+    while current_logger is not None:
+        for handler in _get_logger_handlers(current_logger):
+            if isinstance(handler.formatter, JsonFormatter):
+                return True
+        if not current_logger.propagate:
+            break
+        current_logger = current_logger.parent
+    return False
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    a FileHandler which collects the formatted records in a userspace buffer and writes them with one write call :
+    when the buffer has buffer_size characters, when a record with level >= flush_level arrives, every flush_interval seconds
+    (background thread, started with the first buffered record) and when the handler is flushed or closed (logging.shutdown at exit).
+    at most buffer_size characters, or the records of flush_interval seconds, can get lost if the process is killed.
+    flush_on_sigterm: installs a process wide SIGTERM handler, which flushes all BufferedFileHandlers before the previous signal handler
+    is called (see install_sigterm_flush) - opt in, it changes the signal handling of the application, and it has to be set up in the main thread.
+
+    >>> import tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> log_file = os.path.join(log_dir.name, 'test.log')
+    >>> handler = BufferedFileHandler(log_file, buffer_size=1024, flush_interval=60)
+    >>> handler.emit(logging.makeLogRecord(dict(msg='buffered', levelno=logging.INFO)))
+    >>> os.path.exists(log_file)
+    False
+    >>> handler.emit(logging.makeLogRecord(dict(msg='flushed with the error', levelno=logging.ERROR)))
+    >>> print(open(log_file).read())
+    buffered
+    flushed with the error
+    <BLANKLINE>
+    >>> handler.emit(logging.makeLogRecord(dict(msg='written by close', levelno=logging.INFO)))
+    >>> handler.close()
+    >>> print(open(log_file).read().splitlines()[-1])
+    written by close
+    >>> log_dir.cleanup()
+
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        mode: str = "a",
+        encoding: Optional[str] = "utf-8",
+        delay: bool = True,
+        buffer_size: int = 1024 * 1024,
+        flush_interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+        flush_on_sigterm: bool = False,
+    ) -> None:
+        super().__init__(filename, mode=mode, encoding=encoding, delay=delay)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self._buffer: List[Any] = list()
+        self._buffer_length = 0
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid = 0
+        self._flusher_stop = threading.Event()
+        # the thread which is in the middle of emit or flush - the SIGTERM handler must not flush then, see install_sigterm_flush
+        self._writer_ident: Optional[int] = None
+        _buffered_file_handlers.add(self)
+        if flush_on_sigterm:
+            install_sigterm_flush()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # called by Handler.handle with the handler lock held
+        self._writer_ident = threading.get_ident()
+        try:
+            self._buffer_record(record)
+        except Exception:
+            self.handleError(record)
+        finally:
+            self._writer_ident = None
+        _run_deferred_sigterm()
+
+    def _buffer_record(self, record: logging.LogRecord) -> None:
+        msg = self.format(record) + self.terminator
+        self._buffer.append(msg)
+        self._buffer_length += len(msg)
+        if self._buffer_length >= self.buffer_size or record.levelno >= self.flush_level:
+            self._write_buffer()
+        elif self.flush_interval > 0 and self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def flush(self) -> None:
+        self.acquire()
+        self._writer_ident = threading.get_ident()
+        try:
+            self._write_buffer()
+        finally:
+            self._writer_ident = None
+            self.release()
+        _run_deferred_sigterm()
+
+    def close(self) -> None:
+        self._flusher_stop.set()
+        self.flush()
+        _buffered_file_handlers.discard(self)
+        super().close()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+        self._buffer = list()
+        self._buffer_length = 0
+        self._write(data)
+
+    def _write(self, data: str) -> None:
+        if self.stream is None:
+            if self.mode == "w" and getattr(self, "_closed", False):
+                return
+            self.stream = self._open()
+        self.stream.write(data)
+        self.stream.flush()
+
+    def _start_flusher(self) -> None:
+        # one thread per handler and process - the thread is gone in the child after a fork
+        self._flusher_pid = os.getpid()
+        self._flusher_stop = threading.Event()
+        self._flusher = threading.Thread(target=self._run_flusher, args=(self._flusher_stop,), name=f"lib_log_utils_buffer_flusher_{self.name}", daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def _clear_buffer_after_fork(self) -> None:
+        # the buffered records belong to the parent, which writes them - the child would write them a second time
+        self._buffer = list()
+        self._buffer_length = 0
+
+
+# the open BufferedFileHandlers, flushed on SIGTERM
+_buffered_file_handlers: "weakref.WeakSet[BufferedFileHandler]" = weakref.WeakSet()
+_sigterm_flush_installed = False
+
+# (flush_on_sigterm, signum, frame) of a SIGTERM which interrupted an emit or flush of the main thread
+_deferred_sigterm: Optional[Tuple[Callable[[int, Any], None], int, Any]] = None
+
+
+def _clear_buffers_after_fork() -> None:
+    for handler in list(_buffered_file_handlers):
+        handler._clear_buffer_after_fork()
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_clear_buffers_after_fork)
+
+
+def _is_writing_in_current_thread() -> bool:
+    ident = threading.get_ident()
+    return any(handler._writer_ident == ident for handler in list(_buffered_file_handlers))
+
+
+def _run_deferred_sigterm() -> None:
+    """handles a SIGTERM which arrived in the middle of an emit or flush, when the main thread is done with it"""
+    global _deferred_sigterm
+    if _deferred_sigterm is None or threading.current_thread() is not threading.main_thread() or _is_writing_in_current_thread():
+        return
+    flush_on_sigterm, signum, frame = _deferred_sigterm
+    _deferred_sigterm = None
+    flush_on_sigterm(signum, frame)
+
+
+def install_sigterm_flush() -> bool:
+    """
+    installs a SIGTERM handler which flushes all BufferedFileHandlers and then calls the previous handler
+    (or terminates the process like the default action). returns False if that is not possible (not in the main thread, no SIGTERM).
+    it is not installed by the handlers themselves - call it, or set flush_on_sigterm=True for the handler.
+    the signal handler runs in the main thread - if it interrupts an emit or flush of the main thread, the handler lock is held
+    and the buffer is in the middle of a change, so the flush is deferred until that emit or flush is done.
+
+    >>> assert install_sigterm_flush() in (True, False)
+
+    """
+    global _sigterm_flush_installed
+    if _sigterm_flush_installed:
+        return True
+    import signal
+
+    if not hasattr(signal, "SIGTERM") or threading.current_thread() is not threading.main_thread():
+        return False
+    previous_handler = signal.getsignal(signal.SIGTERM)
+
+    def flush_on_sigterm(signum: int, frame: Any) -> None:
+        global _deferred_sigterm
+        if _is_writing_in_current_thread():
+            _deferred_sigterm = (flush_on_sigterm, signum, frame)
+            return
+        for handler in list(_buffered_file_handlers):
+            try:
+                handler.flush()
+            except Exception:  # noqa  # pragma: no cover
+                pass
+        if callable(previous_handler):
+            previous_handler(signum, frame)
+        elif previous_handler != signal.SIG_IGN:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    try:
+        signal.signal(signal.SIGTERM, flush_on_sigterm)
+    except (ValueError, OSError):  # pragma: no cover
+        return False
+    _sigterm_flush_installed = True
+    return True
+
+
+class RotatingFileHandler(BufferedFileHandler):
+    """
+    a BufferedFileHandler which rotates the log file by size (max_bytes) and/or by time (rotate_interval seconds after the file was opened).
+    the rotated segments are named <filename>.<YYYYmmdd-HHMMSS>[.<n>], compressed with 'gzip' (.gz) or 'lzma' (.xz) if compression is set,
+    and the oldest segments are deleted if there are more than backup_count segments, or if all segments together are bigger than max_total_bytes.
+    the rotation in emit is only a close and a rename - compression and retention are done by a background worker thread,
+    which never holds the handler lock, so emits are never blocked by them. close() waits for the worker.
+    with buffer_size=0 every record is written immediately.
+
+    >>> import glob, tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> log_file = os.path.join(log_dir.name, 'test.log')
+    >>> handler = RotatingFileHandler(log_file, max_bytes=100, backup_count=2, compression='gzip')
+    >>> for number in range(30):
+    ...     handler.emit(logging.makeLogRecord(dict(msg=f'record {number:02d}', levelno=logging.INFO)))
+    >>> handler.close()
+    >>> segments = sorted(glob.glob(log_file + '.*'))
+    >>> assert len(segments) == 2 and all(segment.endswith('.gz') for segment in segments)
+    >>> print(open(log_file).read().splitlines()[-1])
+    record 29
+    >>> log_dir.cleanup()
+
+    """
+
+    compression_suffixes = {"gzip": ".gz", "lzma": ".xz"}
+
+    def __init__(
+        self,
+        filename: str,
+        mode: str = "a",
+        encoding: Optional[str] = "utf-8",
+        delay: bool = True,
+        buffer_size: int = 0,
+        flush_interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+        max_bytes: int = 0,
+        rotate_interval: float = 0,
+        backup_count: int = 0,
+        max_total_bytes: int = 0,
+        compression: Optional[str] = None,
+        flush_on_sigterm: bool = False,
+    ) -> None:
+        if compression is not None and compression not in self.compression_suffixes:
+            raise ValueError(f'invalid compression "{compression}", must be one of {sorted(self.compression_suffixes)} or None')
+        super().__init__(
+            filename,
+            mode=mode,
+            encoding=encoding,
+            delay=delay,
+            buffer_size=buffer_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            flush_on_sigterm=flush_on_sigterm,
+        )
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.max_total_bytes = max_total_bytes
+        self.compression = compression
+        self._file_size: Optional[int] = None
+        self._rotate_at = 0.0
+        self._segment_pattern = re.compile(re.escape(os.path.basename(self.baseFilename)) + r"\.(\d{8}-\d{6})(?:\.(\d+))?(\.gz|\.xz)?$")
+        self._jobs: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid = 0
+
+    def _write(self, data: str) -> None:
+        if self.stream is None:
+            if self.mode == "w" and getattr(self, "_closed", False):
+                return
+            self.stream = self._open()
+        if self._file_size is None:
+            self._file_size = self.stream.tell()
+            self._rotate_at = time.time() + self.rotate_interval
+        data_size = len(data) if data.isascii() else len(data.encode(self.encoding or "utf-8", "replace"))
+        if self._file_size and (
+            (self.max_bytes > 0 and self._file_size + data_size > self.max_bytes) or (self.rotate_interval > 0 and time.time() >= self._rotate_at)
+        ):
+            self.rotate()
+            self.stream = self._open()
+            self._file_size = 0
+            self._rotate_at = time.time() + self.rotate_interval
+        self.stream.write(data)
+        self.stream.flush()
+        self._file_size += data_size
+
+    def rotate(self) -> None:
+        """closes the log file and renames it to the next segment, the compression and retention is passed to the worker thread"""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None  # type: ignore
+        self._file_size = None
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        segment = f"{self.baseFilename}.{timestamp}"
+        number = 0
+        while any(os.path.exists(segment + suffix) for suffix in ("", ".gz", ".xz")):
+            number += 1
+            segment = f"{self.baseFilename}.{timestamp}.{number}"
+        try:
+            os.rename(self.baseFilename, segment)
+        except FileNotFoundError:
+            return
+        if self._worker_pid != os.getpid():
+            self._start_worker()
+        self._jobs.put(segment)
+
+    def close(self) -> None:
+        super().close()
+        worker = self._worker
+        if worker is not None and worker.is_alive() and self._worker_pid == os.getpid():
+            self._jobs.put(None)
+            worker.join()
+        self._worker = None
+        self._worker_pid = 0
+
+    def _start_worker(self) -> None:
+        # one worker per handler and process - the thread is gone in the child after a fork
+        self._worker_pid = os.getpid()
+        self._jobs = queue.Queue()
+        self._worker = threading.Thread(target=self._run_worker, args=(self._jobs,), name=f"lib_log_utils_rotation_{self.name}", daemon=True)
+        self._worker.start()
+
+    def _run_worker(self, jobs: "queue.Queue[Optional[str]]") -> None:
+        while True:
+            segment = jobs.get()
+            if segment is None:
+                return
+            try:
+                if self.compression is not None:
+                    self._compress(segment)
+                self._apply_retention()
+            except Exception:  # noqa  # pragma: no cover
+                if logging.raiseExceptions:
+                    import traceback
+
+                    sys.stderr.write(f"--- Logging error in the rotation of {segment} ---\n")
+                    traceback.print_exc(file=sys.stderr)
+
+    def _compress(self, segment: str) -> None:
+        compressed_segment = segment + self.compression_suffixes[str(self.compression)]
+        tmp_segment = compressed_segment + ".tmp"
+        if self.compression == "lzma":
+            import lzma
+
+            open_compressed: Callable[..., Any] = lzma.open
+        else:
+            import gzip
+
+            open_compressed = gzip.open
+        import shutil
+
+        with open(segment, "rb") as source, open_compressed(tmp_segment, "wb") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(tmp_segment, compressed_segment)
+        os.unlink(segment)
+
+    def get_segments(self) -> List[str]:
+        """returns the paths of the rotated segments, the oldest first"""
+        directory = os.path.dirname(self.baseFilename)
+        l_segments: List[Tuple[str, int, str]] = list()
+        for file_name in os.listdir(directory):
+            match = self._segment_pattern.match(file_name)
+            if match:
+                l_segments.append((match.group(1), int(match.group(2) or 0), os.path.join(directory, file_name)))
+        return [path for _, _, path in sorted(l_segments)]
+
+    def _apply_retention(self) -> None:
+        segments = self.get_segments()
+        sizes = {segment: os.path.getsize(segment) for segment in segments}
+        total_bytes = sum(sizes.values())
+        while segments and (
+            (self.backup_count > 0 and len(segments) > self.backup_count) or (self.max_total_bytes > 0 and total_bytes > self.max_total_bytes)
+        ):
+            segment = segments.pop(0)
+            total_bytes -= sizes[segment]
+            try:
+                os.unlink(segment)
+            except FileNotFoundError:  # pragma: no cover
+                pass
+
+
 def set_file_handler(
     filename: str,
     logger: logging.Logger = logging.getLogger(),
@@ -57,6 +881,17 @@ def set_file_handler(
     mode: str = "a",
     encoding: str = "utf-8",
     delay: bool = True,
+    buffer_size: int = 0,
+    flush_interval: float = 1.0,
+    flush_level: int = logging.ERROR,
+    max_bytes: int = 0,
+    rotate_interval: float = 0,
+    backup_count: int = 0,
+    max_total_bytes: int = 0,
+    compression: Optional[str] = None,
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None,
+    formatter: Optional[logging.Formatter] = None,
+    flush_on_sigterm: bool = False,
 ) -> logging.Handler:
     """
     name: the name of the file handler. if name = '', name = filename
@@ -66,16 +901,669 @@ def set_file_handler(
           'w': Opens in write-only mode. The pointer is placed at the beginning of the file and this will overwrite
                any existing file with the same name. It will create a new file if one with the same name doesn't exist.
     delay: If delay is true, then file opening is deferred until the first call to emit(). By default, the file grows indefinitely.
+    buffer_size: if > 0, a BufferedFileHandler collects up to buffer_size characters, and writes them at once -
+                 also every flush_interval seconds, for records with level >= flush_level and at exit
+    flush_on_sigterm: with buffer_size, max_bytes or rotate_interval - the buffered records are also written on SIGTERM.
+                 installs a process wide SIGTERM handler (see install_sigterm_flush), call it from the main thread
+    max_bytes, rotate_interval: if one of them is > 0, a RotatingFileHandler rotates the file at that size or after that many seconds,
+                 keeps backup_count segments and max_total_bytes bytes of segments (0 = unlimited),
+                 and compresses the segments with compression 'gzip' or 'lzma' in a background thread
+    rate_limiter: if set, the handler suppresses records above the budget of the rate limiter (see log_rate_limit.RateLimitFilter)
+    formatter: if set, the formatter is used instead of fmt and datefmt
+
+    >>> import tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> handler = set_file_handler(os.path.join(log_dir.name, 'test.log'), logger=logging.getLogger('test_set_file_handler'), max_bytes=1024 * 1024)
+    >>> assert isinstance(handler, RotatingFileHandler)
+    >>> logging.getLogger('test_set_file_handler').removeHandler(handler)
+    >>> handler.close()
+    >>> log_dir.cleanup()
+
     """
 
     if remove_existing_file_handlers:
         remove_handler_by_type(logger, logging.FileHandler)
 
-    file_handler = logging.FileHandler(filename=filename, mode=mode, encoding=encoding, delay=delay)  # type: logging.Handler
-    file_handler = _add_handler(file_handler, logger=logger, name=name, level=level, fmt=fmt, datefmt=datefmt)
+    file_handler: logging.Handler
+    if max_bytes > 0 or rotate_interval > 0:
+        file_handler = RotatingFileHandler(
+            filename=filename,
+            mode=mode,
+            encoding=encoding,
+            delay=delay,
+            buffer_size=buffer_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            max_bytes=max_bytes,
+            rotate_interval=rotate_interval,
+            backup_count=backup_count,
+            max_total_bytes=max_total_bytes,
+            compression=compression,
+            flush_on_sigterm=flush_on_sigterm,
+        )
+    elif buffer_size > 0:
+        file_handler = BufferedFileHandler(
+            filename=filename,
+            mode=mode,
+            encoding=encoding,
+            delay=delay,
+            buffer_size=buffer_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            flush_on_sigterm=flush_on_sigterm,
+        )
+    else:
+        file_handler = logging.FileHandler(filename=filename, mode=mode, encoding=encoding, delay=delay)
+    file_handler = _add_handler(
+        file_handler, logger=logger, name=name, level=level, fmt=fmt, datefmt=datefmt, rate_limiter=rate_limiter, formatter=formatter
+    )
     return file_handler
 
 
+def set_json_file_handler(
+    filename: str,
+    logger: logging.Logger = logging.getLogger(),
+    name: str = "json_file_handler",
+    level: int = logging.INFO,
+    datefmt: str = json_date_fmt,
+    remove_existing_file_handlers: bool = False,
+    mode: str = "a",
+    encoding: str = "utf-8",
+    delay: bool = True,
+    buffer_size: int = 0,
+    flush_interval: float = 1.0,
+    flush_level: int = logging.ERROR,
+    max_bytes: int = 0,
+    rotate_interval: float = 0,
+    backup_count: int = 0,
+    max_total_bytes: int = 0,
+    compression: Optional[str] = None,
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None,
+) -> logging.Handler:
+    """
+    Sets a File Handler which writes JSON lines, see JsonFormatter - the parameters are the parameters of set_file_handler
+
+    >>> import tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> log_file = os.path.join(log_dir.name, 'test.jsonl')
+    >>> logger = logging.getLogger('test_set_json_file_handler')
+    >>> logger.propagate = False
+    >>> handler = set_json_file_handler(log_file, logger=logger, buffer_size=4096)
+    >>> logger.error('error')
+    >>> logger.removeHandler(handler)
+    >>> handler.close()
+    >>> with open(log_file, encoding='utf-8') as json_file:
+    ...     json.loads(json_file.read())['level']
+    'ERROR'
+    >>> log_dir.cleanup()
+
+    """
+    return set_file_handler(
+        filename=filename,
+        logger=logger,
+        name=name,
+        level=level,
+        remove_existing_file_handlers=remove_existing_file_handlers,
+        mode=mode,
+        encoding=encoding,
+        delay=delay,
+        buffer_size=buffer_size,
+        flush_interval=flush_interval,
+        flush_level=flush_level,
+        max_bytes=max_bytes,
+        rotate_interval=rotate_interval,
+        backup_count=backup_count,
+        max_total_bytes=max_total_bytes,
+        compression=compression,
+        rate_limiter=rate_limiter,
+        formatter=JsonFormatter(datefmt),
+    )
+
+
+class BinaryFileHandler(BufferedFileHandler):
+    """
+    writes the records in the compact binary log format of log_binary, in large blocks like the BufferedFileHandler :
+    no formatting and no text encoding per record - time and level are varints, logger names, message templates and short messages
+    are written once into the string dictionary of the file. use decode_binary_log or "log_util decode <file>" to read the file.
+    a forked child writes to <filename>.<pid>, not to the file of the parent.
+
+    >>> import io, tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> log_file = os.path.join(log_dir.name, 'test.llb')
+    >>> handler = BinaryFileHandler(log_file)
+    >>> handler.emit(logging.makeLogRecord(dict(name='app', msg='connected to %s', args=('db', ), levelno=logging.INFO, levelname='INFO')))
+    >>> handler.close()
+    >>> stream = io.StringIO()
+    >>> decode_binary_log(log_file, stream=stream, fmt='[%(name)s][%(levelname)s] %(message)s')
+    1
+    >>> print(stream.getvalue())
+    [app][INFO] connected to db
+    <BLANKLINE>
+    >>> log_dir.cleanup()
+
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        mode: str = "ab",
+        delay: bool = True,
+        buffer_size: int = 1024 * 1024,
+        flush_interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+        max_strings: int = 65536,
+        flush_on_sigterm: bool = False,
+    ) -> None:
+        super().__init__(
+            filename,
+            mode=mode,
+            encoding=None,
+            delay=delay,
+            buffer_size=buffer_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            flush_on_sigterm=flush_on_sigterm,
+        )
+        self.encoder = log_binary.BinaryLogEncoder(max_strings=max_strings)
+        self._filename = self.baseFilename
+        self._session_pid = 0
+
+    def _buffer_record(self, record: logging.LogRecord) -> None:
+        if self._session_pid != os.getpid():
+            self._start_session(record)
+        data = self.encoder.encode(record)
+        self._buffer.append(data)
+        self._buffer_length += len(data)
+        if self._buffer_length >= self.buffer_size or record.levelno >= self.flush_level:
+            self._write_buffer()
+        elif self.flush_interval > 0 and self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_session(self, record: logging.LogRecord) -> None:
+        if self._session_pid:
+            # a forked child - the buffered records belong to the parent
+            self._buffer = list()
+            self._buffer_length = 0
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None  # type: ignore
+            self.baseFilename = f"{self._filename}.{os.getpid()}"
+        self._session_pid = os.getpid()
+        data = self.encoder.session_frame(record.created)
+        self._buffer.append(data)
+        self._buffer_length += len(data)
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer = list()
+        self._buffer_length = 0
+        self._write(data)  # type: ignore
+
+    def _open(self) -> Any:
+        stream = super()._open()
+        if stream.tell() == 0:
+            stream.write(log_binary.magic)  # type: ignore
+        return stream
+
+
+def set_binary_file_handler(
+    filename: str,
+    logger: logging.Logger = logging.getLogger(),
+    name: str = "binary_file_handler",
+    level: int = logging.INFO,
+    buffer_size: int = 1024 * 1024,
+    flush_interval: float = 1.0,
+    flush_level: int = logging.ERROR,
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None,
+    flush_on_sigterm: bool = False,
+) -> logging.Handler:
+    """
+    Sets a BinaryFileHandler, which writes the records in the binary log format of log_binary
+    flush_on_sigterm: the buffered records are also written on SIGTERM, installs a process wide SIGTERM handler (see install_sigterm_flush)
+
+    >>> import tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> handler = set_binary_file_handler(os.path.join(log_dir.name, 'test.llb'), logger=logging.getLogger('test_set_binary_file_handler'))
+    >>> logging.getLogger('test_set_binary_file_handler').removeHandler(handler)
+    >>> handler.close()
+    >>> log_dir.cleanup()
+
+    """
+    binary_file_handler = BinaryFileHandler(
+        filename=filename, buffer_size=buffer_size, flush_interval=flush_interval, flush_level=flush_level, flush_on_sigterm=flush_on_sigterm
+    )
+    return _add_handler(binary_file_handler, logger=logger, name=name, level=level, rate_limiter=rate_limiter)
+
+
+def decode_binary_log(
+    filename: str,
+    stream: TextIO = sys.stdout,
+    fmt: str = default_fmt,
+    datefmt: str = default_date_fmt,
+    colored: bool = False,
+    field_styles: Optional[FieldAndLevelStyles] = None,
+    level_styles: Optional[FieldAndLevelStyles] = None,
+) -> int:
+    """
+    writes the records of a binary log file (see BinaryFileHandler) as text to the stream, formatted with fmt and datefmt,
+    colored with the ColorFormatter if colored is set. the identity fields of the format ({username}, {hostname_short}, {hostname}
+    and {program_name}, see format_fmt) are filled with the identity of the process which wrote the records. returns the number of records
+    """
+    formatters: Dict[Tuple[str, ...], logging.Formatter] = dict()
+    n_records = 0
+    for record in log_binary.read_binary_log(filename):
+        identity = (record.username, record.hostname_short, record.hostname, record.program_name)  # type: ignore
+        formatter = formatters.get(identity)
+        if formatter is None:
+            session_fmt = fmt
+            if "{" in fmt:
+                session_fmt = fmt.format(username=identity[0], hostname_short=identity[1], hostname=identity[2], program_name=identity[3])
+            if colored:
+                formatter = ColorFormatter(session_fmt, datefmt, field_styles=field_styles, level_styles=level_styles)
+            else:
+                formatter = get_formatter(session_fmt, datefmt)
+            formatters[identity] = formatter
+        stream.write(formatter.format(record) + "\n")
+        n_records += 1
+    return n_records
+
+
+class MmapRingBufferHandler(logging.Handler):
+    """
+    writes the formatted records into a memory mapped file of a fixed size, used as ring buffer - a flight recorder for DEBUG records.
+    the file has a header with the magic, the capacity, and the head (oldest frame) and tail (write position) offsets,
+    followed by the frames (u32 length, utf-8 payload). the offsets grow forever, the position in the ring is offset % capacity.
+    before frames are overwritten the head is moved past them, the tail is moved after the new frame is complete -
+    so the header always describes complete frames, and the records survive a SIGKILL or an OOM kill of the process
+    (the pages belong to the page cache). use read_ring_buffer or "log_util --read-ring-buffer <file>" to read the records.
+    an existing ring buffer with the same size is continued. a forked child writes to <filename>.<pid>, not to the file of the parent.
+
+    >>> import tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> ring_file = os.path.join(log_dir.name, 'flight.ring')
+    >>> handler = MmapRingBufferHandler(ring_file, size=200)
+    >>> for number in range(20):
+    ...     handler.emit(logging.makeLogRecord(dict(msg=f'record {number}')))
+    >>> read_ring_buffer(ring_file)
+    ['record 7', 'record 8', 'record 9', 'record 10', 'record 11', 'record 12',
+     'record 13', 'record 14', 'record 15', 'record 16', 'record 17', 'record 18', 'record 19']
+    >>> handler.close()
+    >>> log_dir.cleanup()
+
+    """
+
+    magic = b"LLURING1"
+    # magic, capacity, head, tail
+    header_struct = struct.Struct("<8sQQQ")
+    # the position of head and tail in the header
+    offset_struct = struct.Struct("<Q")
+    head_offset = 16
+    tail_offset = 24
+    frame_length_struct = struct.Struct("<I")
+
+    def __init__(self, filename: str, size: int = 16 * 1024 * 1024, encoding: str = "utf-8") -> None:
+        super().__init__()
+        if size < self.header_struct.size + self.frame_length_struct.size + 1:
+            raise ValueError(f"the size of the ring buffer must be at least {self.header_struct.size + self.frame_length_struct.size + 1} bytes")
+        self.baseFilename = os.path.abspath(filename)
+        self.size = size
+        self.encoding = encoding
+        self.capacity = size - self.header_struct.size
+        self._pid = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._head = 0
+        self._tail = 0
+        self._open(self.baseFilename)
+
+    def _open(self, filename: str) -> None:
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+            self._mmap = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self._pid = os.getpid()
+        magic, capacity, head, tail = self.header_struct.unpack_from(self._mmap, 0)
+        if magic != self.magic or capacity != self.capacity or not head <= tail <= head + capacity:
+            head = tail = 0
+            self.header_struct.pack_into(self._mmap, 0, self.magic, self.capacity, head, tail)
+        self._head, self._tail = head, tail
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # called by Handler.handle with the handler lock held
+        try:
+            if self._pid != os.getpid():
+                self._open(f"{self.baseFilename}.{os.getpid()}")
+            payload = self.format(record).encode(self.encoding, "replace")[: self.capacity - self.frame_length_struct.size]
+            self._append(payload)
+        except Exception:
+            self.handleError(record)
+
+    def _append(self, payload: bytes) -> None:
+        mmap_file, capacity, header_size = self._mmap, self.capacity, self.header_struct.size
+        frame = self.frame_length_struct.pack(len(payload)) + payload
+        frame_size = len(frame)
+        head, tail = self._head, self._tail
+        if tail + frame_size - head > capacity:
+            # drop the oldest frames, and move the head before they are overwritten
+            frame_length_struct = self.frame_length_struct
+            while tail + frame_size - head > capacity:
+                position = head % capacity
+                if position + frame_length_struct.size <= capacity:
+                    (frame_length,) = frame_length_struct.unpack_from(mmap_file, header_size + position)  # type: ignore
+                else:
+                    (frame_length,) = frame_length_struct.unpack(_read_ring(mmap_file, header_size, capacity, head, frame_length_struct.size))
+                head += frame_length_struct.size + frame_length
+            self._head = head
+            self.offset_struct.pack_into(mmap_file, self.head_offset, head)
+        start = header_size + tail % capacity
+        if start + frame_size <= header_size + capacity:
+            mmap_file[start : start + frame_size] = frame  # type: ignore
+        else:
+            _write_ring(mmap_file, header_size, capacity, tail, frame)
+        self._tail = tail = tail + frame_size
+        self.offset_struct.pack_into(mmap_file, self.tail_offset, tail)
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self._mmap is not None:
+                self._mmap.flush()
+                self._mmap.close()
+                self._mmap = None
+        finally:
+            self.release()
+        super().close()
+
+
+def _write_ring(buffer: Any, offset: int, capacity: int, position: int, data: bytes) -> None:
+    """writes the data at the position of the ring, which starts at offset in the buffer - the data may wrap around"""
+    start = position % capacity
+    first_length = min(len(data), capacity - start)
+    buffer[offset + start : offset + start + first_length] = data[:first_length]
+    if first_length < len(data):
+        buffer[offset : offset + len(data) - first_length] = data[first_length:]
+
+
+def _read_ring(buffer: Any, offset: int, capacity: int, position: int, length: int) -> bytes:
+    """reads length bytes at the position of the ring, which starts at offset in the buffer"""
+    start = position % capacity
+    first_length = min(length, capacity - start)
+    data = bytes(buffer[offset + start : offset + start + first_length])
+    if first_length < length:
+        data += bytes(buffer[offset : offset + length - first_length])
+    return data
+
+
+def read_ring_buffer(filename: str, encoding: str = "utf-8") -> List[str]:
+    """
+    returns the records of a ring buffer file of the MmapRingBufferHandler, the oldest first -
+    also of a ring buffer of a killed process. frames which are not complete are not returned.
+
+    """
+    with open(filename, "rb") as ring_file:
+        data = ring_file.read()
+    header_struct = MmapRingBufferHandler.header_struct
+    frame_length_struct = MmapRingBufferHandler.frame_length_struct
+    if len(data) < header_struct.size:
+        raise ValueError(f'"{filename}" is not a ring buffer of lib_log_utils')
+    magic, capacity, head, tail = header_struct.unpack_from(data, 0)
+    if magic != MmapRingBufferHandler.magic or capacity != len(data) - header_struct.size or not head <= tail <= head + capacity:
+        raise ValueError(f'"{filename}" is not a ring buffer of lib_log_utils')
+    records: List[str] = list()
+    position = head
+    while position + frame_length_struct.size <= tail:
+        (frame_length,) = frame_length_struct.unpack(_read_ring(data, header_struct.size, capacity, position, frame_length_struct.size))
+        position += frame_length_struct.size
+        if position + frame_length > tail:
+            break
+        records.append(_read_ring(data, header_struct.size, capacity, position, frame_length).decode(encoding, "replace"))
+        position += frame_length
+    return records
+
+
+def set_ring_buffer_handler(
+    filename: str,
+    logger: logging.Logger = logging.getLogger(),
+    name: str = "ring_buffer_handler",
+    level: int = logging.DEBUG,
+    fmt: str = default_fmt,
+    datefmt: str = default_date_fmt,
+    size: int = 16 * 1024 * 1024,
+) -> logging.Handler:
+    """
+    sets a MmapRingBufferHandler, which keeps the last size bytes of records in the memory mapped file filename.
+    the level of the logger is not changed - set it to DEBUG to record the debug messages.
+
+    >>> import tempfile
+    >>> log_dir = tempfile.TemporaryDirectory()
+    >>> logger = logging.getLogger('test_set_ring_buffer_handler')
+    >>> logger.setLevel(logging.DEBUG)
+    >>> handler = set_ring_buffer_handler(os.path.join(log_dir.name, 'flight.ring'), logger=logger, fmt='[%(levelname)s] %(message)s')
+    >>> logger.debug('recorded')
+    >>> read_ring_buffer(os.path.join(log_dir.name, 'flight.ring'))
+    ['[DEBUG] recorded']
+    >>> logger.removeHandler(handler)
+    >>> handler.close()
+    >>> log_dir.cleanup()
+
+    """
+    ring_buffer_handler: logging.Handler = MmapRingBufferHandler(filename=filename, size=size)
+    ring_buffer_handler = _add_handler(ring_buffer_handler, logger=logger, name=name, level=level, fmt=fmt, datefmt=datefmt)
+    return ring_buffer_handler
+
+
+class DebugRingBufferHandler(logging.Handler):
+    """
+    keeps the last records below the threshold level in memory, as raw records - they are only formatted if they are dumped.
+    the buffer is limited to capacity records and (estimated) max_bytes bytes, the oldest records are dropped.
+    a record with level >= dump_level (or dump_debug_ring_buffers, called by log_traceback.log_exception_traceback)
+    dumps the buffered records to the other handlers of the logger and of the ancestors it propagates to, before the record itself is handled by them.
+    the buffer is emptied by the dump, so the context is dumped only once per incident.
+    note that the records keep references to their args, until they are dropped or dumped.
+
+    >>> logger = logging.getLogger('test_debug_ring_buffer_handler')
+    >>> logger.propagate = False
+    >>> logger.setLevel(logging.INFO)
+    >>> stream_handler = set_stream_handler(logger, stream=sys.stdout, level=logging.INFO, fmt='[%(levelname)s] %(message)s')
+    >>> handler = set_debug_ring_buffer_handler(logger, capacity=2)
+    >>> for number in range(3):
+    ...     logger.debug(f'debug {number}')
+    >>> logger.info('info')
+    [INFO] info
+    >>> logger.error('error')
+    [DEBUG] debug 1
+    [DEBUG] debug 2
+    [ERROR] error
+    >>> logger.error('second error, nothing to dump')
+    [ERROR] second error, nothing to dump
+    >>> logger.removeHandler(handler)
+    >>> logger.removeHandler(stream_handler)
+
+    """
+
+    # the estimated size of a LogRecord without its message
+    record_overhead = 500
+
+    def __init__(
+        self, capacity: int = 1000, max_bytes: int = 1024 * 1024, threshold: int = logging.INFO, dump_level: int = logging.ERROR, level: int = logging.NOTSET
+    ) -> None:
+        super().__init__(level=level)
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+        self.dump_level = dump_level
+        self.logger: Optional[logging.Logger] = None
+        self._records: "collections.deque[Tuple[int, logging.LogRecord]]" = collections.deque()
+        self._bytes = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # called by Handler.handle with the handler lock held
+        if record.levelno < self.threshold:
+            size = self.record_overhead + (len(record.msg) if isinstance(record.msg, str) else 0)
+            block_lines = getattr(record, "block_lines", None)
+            if block_lines:
+                size += sum(map(len, block_lines))
+            self._records.append((size, record))
+            self._bytes += size
+            while len(self._records) > self.capacity or (self._bytes > self.max_bytes and len(self._records) > 1):
+                dropped_size, _ = self._records.popleft()
+                self._bytes -= dropped_size
+        elif record.levelno >= self.dump_level:
+            self._dump()
+
+    def dump(self) -> None:
+        """passes the buffered records to the other handlers of the logger and of its ancestors, and empties the buffer"""
+        self.acquire()
+        try:
+            self._dump()
+        finally:
+            self.release()
+
+    def _dump(self) -> None:
+        records, self._records, self._bytes = self._records, collections.deque(), 0
+        if not records or self.logger is None:
+            return
+        handlers = [handler for handler in _get_logger_handlers(self.logger) if handler is not self and not isinstance(handler, AsyncQueueHandler)]
+        # the handlers of the ancestors, like Logger.callHandlers - their level is respected, it was not raised to the threshold
+        ancestor_handlers = [handler for ancestor in _get_propagation_ancestors(self.logger) for handler in ancestor.handlers]
+        _dumping.active = True
+        try:
+            for _, record in records:
+                for handler in handlers:
+                    # Handler.handle does not check the level of the handler
+                    handler.handle(record)
+                for handler in ancestor_handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+        finally:
+            _dumping.active = False
+
+
+# set while a DebugRingBufferHandler dumps its records in this thread, the DebugRingBufferFilters let them pass
+_dumping = threading.local()
+
+
+class DebugRingBufferFilter(logging.Filter):
+    """
+    set by set_debug_ring_buffer_handler on the handlers of the ancestors the logger propagates to :
+    drops the records captured by the DebugRingBufferHandler of the logger - the records with level < threshold of the loggers
+    which inherit the lowered level of the logger. the records of other loggers, and the dumped records, pass.
+
+    >>> logger = logging.getLogger('test_debug_ring_buffer_filter')
+    >>> logger.setLevel(1)
+    >>> record_filter = DebugRingBufferFilter(logger, threshold=logging.INFO)
+    >>> assert not record_filter.filter(logger.makeRecord(logger.name, logging.DEBUG, '', 0, 'captured', None, None))
+    >>> assert not record_filter.filter(logger.makeRecord(logger.name + '.child', logging.DEBUG, '', 0, 'captured', None, None))
+    >>> assert record_filter.filter(logger.makeRecord(logger.name, logging.INFO, '', 0, 'written', None, None))
+    >>> assert record_filter.filter(logger.makeRecord('other', logging.DEBUG, '', 0, 'other logger', None, None))
+
+    """
+
+    def __init__(self, logger: logging.Logger, threshold: int) -> None:
+        super().__init__()
+        self.logger = logger
+        self.threshold = threshold
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.threshold or getattr(_dumping, "active", False):
+            return True
+        if record.name != self.logger.name and not record.name.startswith(self.logger.name + "."):
+            return True
+        # the record is captured, if its logger inherits the level of the logger
+        record_logger = logging.getLogger(record.name)
+        while record_logger.level == logging.NOTSET and record_logger.parent is not None:
+            record_logger = record_logger.parent
+        return record_logger is not self.logger
+
+
+# the DebugRingBufferHandlers, dumped by dump_debug_ring_buffers
+_debug_ring_buffer_handlers: "weakref.WeakSet[DebugRingBufferHandler]" = weakref.WeakSet()
+
+
+def set_debug_ring_buffer_handler(
+    logger: logging.Logger = logging.getLogger(),
+    name: str = "debug_ring_buffer_handler",
+    capacity: int = 1000,
+    max_bytes: int = 1024 * 1024,
+    capture_level: int = 1,
+    threshold: Optional[int] = None,
+    dump_level: int = logging.ERROR,
+) -> DebugRingBufferHandler:
+    """
+    sets a DebugRingBufferHandler as first handler of the logger : records with capture_level <= level < threshold are kept in memory,
+    and dumped to the other handlers of the logger on an error. threshold defaults to the effective level of the logger,
+    the level of the logger is lowered to capture_level, and the level of the other handlers is raised to the threshold -
+    so they do not write the captured records themselves. the descendant loggers which inherit the level of the logger
+    are lowered as well - the level of their handlers is raised to the previous effective level of the descendant.
+    the handlers of the ancestors the logger propagates to are shared with other loggers, their level is kept :
+    they get a DebugRingBufferFilter, which drops the captured records. the records are dumped to them as well.
+    handlers added later, to the logger or its descendants, should have a level >= threshold -
+    handlers added later to the ancestors need a DebugRingBufferFilter.
+
+    >>> logger = logging.getLogger('test_set_debug_ring_buffer_handler')
+    >>> logger.setLevel(logging.WARNING)
+    >>> child_handler = logging.NullHandler()
+    >>> logging.getLogger('test_set_debug_ring_buffer_handler.child').addHandler(child_handler)
+    >>> handler = set_debug_ring_buffer_handler(logger)
+    >>> assert handler.threshold == logging.WARNING and logger.level == 1
+    >>> assert child_handler.level == logging.WARNING
+    >>> logger.removeHandler(handler)
+    >>> logging.getLogger('test_set_debug_ring_buffer_handler.child').removeHandler(child_handler)
+
+    """
+    threshold = int(lib_parameter.get_default_if_none(threshold, logger.getEffectiveLevel()))
+    if logger is not logging.getLogger():
+        # the handlers of the ancestors are shared with other loggers - their level is kept, the captured records are filtered
+        for ancestor in _get_propagation_ancestors(logger):
+            for ancestor_handler in ancestor.handlers:
+                for existing_filter in list(ancestor_handler.filters):
+                    if isinstance(existing_filter, DebugRingBufferFilter) and existing_filter.logger is logger:
+                        ancestor_handler.removeFilter(existing_filter)
+                ancestor_handler.addFilter(DebugRingBufferFilter(logger, threshold))
+    for existing_handler in _get_logger_handlers(logger):
+        if isinstance(existing_handler, DebugRingBufferHandler):
+            _remove_handler_from_logger(logger, existing_handler)
+        elif existing_handler.level < threshold and not isinstance(existing_handler, AsyncQueueHandler):
+            existing_handler.setLevel(threshold)
+
+    handler = DebugRingBufferHandler(capacity=capacity, max_bytes=max_bytes, threshold=threshold, dump_level=dump_level, level=capture_level)
+    handler.name = name
+    handler.logger = logger
+    descendants = _get_descendant_loggers(logger)
+    effective_levels = [descendant.getEffectiveLevel() for descendant in descendants]
+    logger.setLevel(capture_level)
+    for descendant, effective_level in zip(descendants, effective_levels):
+        if descendant.getEffectiveLevel() < effective_level:
+            # the descendant inherits capture_level now - its own handlers must not write the captured records
+            for descendant_handler in _get_logger_handlers(descendant):
+                if descendant_handler.level < effective_level and not isinstance(descendant_handler, (AsyncQueueHandler, DebugRingBufferHandler)):
+                    descendant_handler.setLevel(effective_level)
+    # the first handler, so the context is dumped before the error is written by the other handlers
+    async_queue_handler = get_async_queue_handler(logger)
+    if async_queue_handler is None:
+        logger.handlers.insert(0, handler)
+    else:
+        async_queue_handler.listener.add_handler(handler, first=True)
+    _debug_ring_buffer_handlers.add(handler)
+    return handler
+
+
+def dump_debug_ring_buffers() -> None:
+    """
+    dumps the records of all DebugRingBufferHandlers to the other handlers of their logger, see log_traceback.log_exception_traceback
+
+    >>> dump_debug_ring_buffers()
+
+    """
+    for handler in list(_debug_ring_buffer_handlers):
+        handler.dump()
+
+
 def set_stream_handler(
     logger: logging.Logger = logging.getLogger(),
     stream: TextIO = sys.stderr,
@@ -84,11 +1572,15 @@ def set_stream_handler(
     fmt: str = default_fmt,
     datefmt: str = default_date_fmt,
     remove_existing_stream_handlers: bool = False,
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None,
+    formatter: Optional[logging.Formatter] = None,
 ) -> logging.Handler:
 
     """
     Sets a Stream Handler. A Handler with the same name will be replaced (with a warning)
 
+    rate_limiter: if set, the handler suppresses records above the budget of the rate limiter (see log_rate_limit.RateLimitFilter)
+    formatter: if set, the formatter is used instead of fmt and datefmt
 
     >>> logger = logging.getLogger('test_add_streamhandler')
     >>> set_stream_handler(logger, remove_existing_stream_handlers=True)
@@ -107,10 +1599,46 @@ def set_stream_handler(
             pass  # pragma: no cover
 
     stream_handler: logging.Handler = logging.StreamHandler(stream=stream)
-    stream_handler = _add_handler(stream_handler, logger=logger, name=name, level=level, fmt=fmt, datefmt=datefmt)
+    stream_handler = _add_handler(
+        stream_handler, logger=logger, name=name, level=level, fmt=fmt, datefmt=datefmt, rate_limiter=rate_limiter, formatter=formatter
+    )
     return stream_handler
 
 
+def set_json_stream_handler(
+    logger: logging.Logger = logging.getLogger(),
+    stream: TextIO = sys.stderr,
+    name: str = "json_stream_handler",
+    level: int = logging.INFO,
+    datefmt: str = json_date_fmt,
+    remove_existing_stream_handlers: bool = False,
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None,
+) -> logging.Handler:
+    """
+    Sets a Stream Handler which writes JSON lines, see JsonFormatter
+
+    >>> import io
+    >>> logger = logging.getLogger('test_set_json_stream_handler')
+    >>> logger.propagate = False
+    >>> stream = io.StringIO()
+    >>> handler = set_json_stream_handler(logger, stream=stream)
+    >>> logger.error('this is\\nham')
+    >>> json.loads(stream.getvalue())['message']
+    'this is\\nham'
+    >>> logger.removeHandler(handler)
+
+    """
+    return set_stream_handler(
+        logger=logger,
+        stream=stream,
+        name=name,
+        level=level,
+        remove_existing_stream_handlers=remove_existing_stream_handlers,
+        rate_limiter=rate_limiter,
+        formatter=JsonFormatter(datefmt),
+    )
+
+
 def set_stream_handler_color(
     logger: logging.Logger = logging.getLogger(),
     stream: TextIO = sys.stderr,
@@ -121,11 +1649,16 @@ def set_stream_handler_color(
     field_styles: Optional[FieldAndLevelStyles] = None,
     level_styles: Optional[FieldAndLevelStyles] = None,
     remove_existing_stream_handlers: bool = False,
+    native: bool = False,
+    isatty: Optional[bool] = True,
 ) -> logging.Handler:
     """
     Sets a Colored Stream Handler. A Handler with the same name will be replaced (with a warning)
     if remove_existing_stream_handlers is set, otgerwise it will be reconfigured
 
+    native: use the ColorFormatter of lib_log_utils instead of coloredlogs.install - coloredlogs is not imported then
+    isatty: True = always colored, None = colored if the stream is a terminal and NO_COLOR is not set, False = never colored
+
     >>> logger=logging.getLogger()
     >>> handler = set_stream_handler_color(logger)
     >>> logger.debug("DEBUG")
@@ -135,9 +1668,8 @@ def set_stream_handler_color(
     >>> logger.critical("CRITICAL")
 
     """
-
-    field_styles = lib_parameter.get_default_if_none(field_styles, coloredlogs.DEFAULT_FIELD_STYLES)  # type: ignore
-    level_styles = lib_parameter.get_default_if_none(level_styles, coloredlogs.DEFAULT_LEVEL_STYLES)  # type: ignore
+    field_styles = lib_parameter.get_default_if_none(field_styles, log_ansi.DEFAULT_FIELD_STYLES)  # type: ignore
+    level_styles = lib_parameter.get_default_if_none(level_styles, log_ansi.DEFAULT_LEVEL_STYLES)  # type: ignore
 
     if remove_existing_stream_handlers:
         try:
@@ -153,12 +1685,82 @@ def set_stream_handler_color(
     field_styles = override_style_via_environment(field_styles, "COLOREDLOGS_FIELD_STYLES")
     level_styles = override_style_via_environment(level_styles, "COLOREDLOGS_LEVEL_STYLES")
 
+    if native:
+        return _set_stream_handler_color_native(
+            logger=logger, stream=stream, name=name, level=level, fmt=fmt, datefmt=datefmt, field_styles=field_styles, level_styles=level_styles, isatty=isatty
+        )
+
+    import coloredlogs  # type: ignore
+
     # https://coloredlogs.readthedocs.io/en/latest/api.html
     coloredlogs.install(
-        logger=logger, level=level, fmt=fmt, datefmt=datefmt, field_styles=field_styles, level_styles=level_styles, stream=stream, isatty=True
+        logger=logger, level=level, fmt=fmt, datefmt=datefmt, field_styles=field_styles, level_styles=level_styles, stream=stream, isatty=isatty
     )  # type: ignore
     logger.handlers[-1].name = name
     handler = logger.handlers[-1]
+    if handler.formatter is not None:
+        make_multiline_formatter(handler.formatter)
+    if get_async_queue_handler(logger) is not None:
+        logger.removeHandler(handler)
+        _add_handler_to_logger(logger, handler)
+    return handler
+
+
+def _set_stream_handler_color_native(
+    logger: logging.Logger,
+    stream: TextIO,
+    name: str,
+    level: int,
+    fmt: str,
+    datefmt: str,
+    field_styles: FieldAndLevelStyles,
+    level_styles: FieldAndLevelStyles,
+    isatty: Optional[bool],
+) -> logging.Handler:
+    """
+    sets the colored stream handler like coloredlogs.install : a stream handler of the logger which writes to the same stream is replaced
+    (its filters are kept), and the level of the logger is lowered to the level of the handler if needed.
+    without colors, the handler gets the plain formatter of get_formatter - the output to non-terminals costs nothing extra.
+
+    >>> logger = logging.getLogger('test_set_stream_handler_color_native')
+    >>> handler = set_stream_handler_color(logger, stream=sys.stdout, native=True, level_styles={'info': {'color': 'green'}}, fmt='%(message)s')
+    >>> assert isinstance(handler.formatter, ColorFormatter)
+    >>> handler = set_stream_handler_color(logger, stream=sys.stdout, native=True, isatty=False, fmt='%(message)s')
+    >>> assert not isinstance(handler.formatter, ColorFormatter)
+    >>> assert logger.handlers == [handler]
+    >>> logger.info('test')
+    test
+    >>> logger.removeHandler(handler)
+
+    """
+    streams = [sys.stdout, sys.stderr] if stream in (sys.stdout, sys.stderr, None) else [stream]
+    filters: List[Any] = list()
+    for existing_handler in _get_logger_handlers(logger):
+        if isinstance(existing_handler, logging.StreamHandler) and existing_handler.stream in streams:
+            filters = existing_handler.filters
+            _remove_handler_from_logger(logger, existing_handler)
+            break
+
+    handler: logging.Handler = StandardErrorHandler() if stream is sys.stderr else logging.StreamHandler(stream)
+    handler.filters = filters
+    if not any(isinstance(existing_filter, HostnameFilter) for existing_filter in filters):
+        handler.addFilter(HostnameFilter())
+    if ("%(programname)" in fmt or "%(username)" in fmt) and not any(isinstance(existing_filter, IdentityFilter) for existing_filter in filters):
+        handler.addFilter(IdentityFilter())
+
+    if isatty is None:
+        isatty = "NO_COLOR" not in os.environ and hasattr(stream, "isatty") and stream.isatty()
+    formatter: logging.Formatter
+    if isatty:
+        formatter = ColorFormatter(fmt, datefmt, field_styles=field_styles, level_styles=level_styles)
+    else:
+        formatter = get_formatter(fmt, datefmt)
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+    handler.name = name
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+    _add_handler_to_logger(logger, handler)
     return handler
 
 
@@ -172,7 +1774,7 @@ def override_fmt_via_environment(original_value: Any, environment_variable: str)
 
 def override_style_via_environment(original_value: Any, environment_variable: str) -> Any:
     if environment_variable in os.environ:
-        return_value = coloredlogs.parse_encoded_styles(os.environ[environment_variable])  # type: ignore
+        return_value = log_ansi.parse_encoded_styles(os.environ[environment_variable])
     else:
         return_value = original_value
     return return_value
@@ -185,32 +1787,126 @@ def _add_handler(
     level: int = logging.INFO,
     fmt: str = default_fmt,
     datefmt: str = default_date_fmt,
+    rate_limiter: Optional[log_rate_limit.RateLimiter] = None,
+    formatter: Optional[logging.Formatter] = None,
 ) -> logging.Handler:
 
     """
+    rate_limiter: if set, the handler suppresses records above the budget of the rate limiter (see log_rate_limit.RateLimitFilter)
+    formatter: if set, the formatter is used instead of fmt and datefmt (like the JsonFormatter of set_json_stream_handler)
+
     >>> result = set_stream_handler()
     >>> result2 = set_stream_handler()
 
     """
 
+    if rate_limiter is not None:
+        handler.addFilter(log_rate_limit.RateLimitFilter(rate_limiter, handler))
     handler.addFilter(HostnameFilter())
-    fmt = format_fmt(fmt)
-    formatter = logging.Formatter(fmt, datefmt)
+    if formatter is None:
+        fmt = format_fmt(fmt)
+        formatter = get_formatter(fmt, datefmt)
     handler.setFormatter(formatter)
     handler.setLevel(level)
     handler.name = name
-    logger.addHandler(handler)
+    _add_handler_to_logger(logger, handler)
     return handler
 
 
+def _add_handler_to_logger(logger: logging.Logger, handler: logging.Handler) -> None:
+    """adds the handler to the logger - or to the listener thread, if the logger uses asynchronous handlers"""
+    async_queue_handler = get_async_queue_handler(logger)
+    if async_queue_handler is None:
+        logger.addHandler(handler)
+    else:
+        async_queue_handler.listener.add_handler(handler)
+
+
+def _remove_handler_from_logger(logger: logging.Logger, handler: logging.Handler) -> None:
+    """removes the handler from the logger - or from the listener thread, if the logger uses asynchronous handlers"""
+    logger.removeHandler(handler)
+    async_queue_handler = get_async_queue_handler(logger)
+    if async_queue_handler is not None:
+        async_queue_handler.listener.remove_handler(handler)
+
+
+def _get_logger_handlers(logger: logging.Logger) -> List[logging.Handler]:
+    """returns the handlers of the logger, including the handlers owned by the listener thread if the logger uses asynchronous handlers"""
+    handlers = list(logger.handlers)
+    async_queue_handler = get_async_queue_handler(logger)
+    if async_queue_handler is not None:
+        handlers.extend(async_queue_handler.listener.handlers)
+    return handlers
+
+
+def _get_propagation_ancestors(logger: logging.Logger) -> List[logging.Logger]:
+    """
+    returns the ancestors the records of the logger propagate to, like Logger.callHandlers
+
+    >>> parent_logger = logging.getLogger('test_get_propagation_ancestors')
+    >>> logger = logging.getLogger('test_get_propagation_ancestors.child')
+    >>> assert _get_propagation_ancestors(logger) == [parent_logger, logging.getLogger()]
+    >>> logger.propagate = False
+    >>> assert _get_propagation_ancestors(logger) == []
+    >>> logger.propagate = True
+
+    """
+    ancestors: List[logging.Logger] = list()
+    current_logger = logger
+    while current_logger.propagate and current_logger.parent is not None:
+        current_logger = current_logger.parent
+        ancestors.append(current_logger)
+    return ancestors
+
+
+def _get_descendant_loggers(logger: logging.Logger) -> List[logging.Logger]:
+    """
+    returns the existing loggers below the logger - all loggers for the root logger
+
+    >>> descendant = logging.getLogger('test_get_descendant_loggers.child')
+    >>> assert _get_descendant_loggers(logging.getLogger('test_get_descendant_loggers')) == [descendant]
+    >>> assert descendant in _get_descendant_loggers(logging.getLogger())
+
+    """
+    prefix = "" if logger is logging.getLogger() else logger.name + "."
+    return [
+        descendant
+        for descendant_name, descendant in list(logging.Logger.manager.loggerDict.items())
+        if isinstance(descendant, logging.Logger) and descendant_name.startswith(prefix)
+    ]
+
+
+# the formatted fmt strings, cleared in the child process after a fork - see log_identity
+_formatted_fmts: Dict[str, str] = dict()
+
+
 def format_fmt(fmt: str) -> str:
-    fmt = fmt.format(
-        username=getpass.getuser(),
-        hostname_short=lib_platform.hostname_short,
-        hostname=lib_platform.hostname,
-        program_name=lib_programname.get_path_executed_script().stem,
-    )
-    return fmt
+    """
+    fills in the identity fields {username}, {hostname_short}, {hostname} and {program_name}
+
+    >>> assert format_fmt('{username}@{hostname_short}') == format_fmt('{username}@{hostname_short}')
+    >>> format_fmt('%(message)s')
+    '%(message)s'
+
+    """
+    if "{" not in fmt:
+        # no identity fields - spare the resolution of the identity
+        return fmt
+    formatted_fmt = _formatted_fmts.get(fmt)
+    if formatted_fmt is None:
+        identity = log_identity.get_identity()
+        formatted_fmt = fmt.format(
+            username=identity["username"],
+            hostname_short=identity["hostname_short"],
+            hostname=identity["hostname"],
+            program_name=identity["program_name"],
+        )
+        _formatted_fmts[fmt] = formatted_fmt
+    return formatted_fmt
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_formatted_fmts.clear)
 
 
 def get_handler_by_name(name: str) -> logging.Handler:
@@ -222,7 +1918,7 @@ def get_handler_by_name(name: str) -> logging.Handler:
 
     """
 
-    handlers = logging.getLogger().handlers
+    handlers = _get_logger_handlers(logging.getLogger())
     for handler in handlers:
         if hasattr(handler, "name"):
             if handler.name == name:
@@ -232,11 +1928,12 @@ def get_handler_by_name(name: str) -> logging.Handler:
 
 def remove_handler_by_name(name: str) -> None:
     handler = get_handler_by_name(name=name)
-    logging.getLogger().removeHandler(handler)
+    _remove_handler_from_logger(logging.getLogger(), handler)
 
 
 def remove_all_handlers(logger: logging.Logger = logging.getLogger()) -> None:
-    handlers = logger.handlers
+    remove_async_handlers(logger)
+    handlers = list(logger.handlers)
     for handler in handlers:
         logger.removeHandler(handler)
 
@@ -249,11 +1946,11 @@ def remove_handler_by_type(logger: logging.Logger, handler_type: LogHandler) ->
 
     """
 
-    handlers = logger.handlers
+    handlers = _get_logger_handlers(logger)
     for handler in handlers:
         # noinspection PyTypeChecker
         if isinstance(handler, handler_type):
-            logger.removeHandler(handler)
+            _remove_handler_from_logger(logger, handler)
 
 
 def exists_handler_with_name(name: str) -> bool:
@@ -265,7 +1962,7 @@ def exists_handler_with_name(name: str) -> bool:
     >>> assert not exists_handler_with_name('unknown_handler')
 
     """
-    handlers = logging.getLogger().handlers
+    handlers = _get_logger_handlers(logging.getLogger())
     for handler in handlers:
         if hasattr(handler, "name"):
             if handler.name == name:
@@ -287,6 +1984,338 @@ def logger_flush_all_handlers(logger: logging.Logger = logging.getLogger()) -> N
                 pass
 
 
+flush_policies = ("always", "message", "records", "level", "interval")
+
+# number of records logged since the last flush, per logger name - used by the flush policy "records".
+# this is not locked on purpose, a race only results in one flush too early or too late
+_unflushed_records: Dict[str, int] = dict()
+
+
+def logger_flush_by_policy(
+    logger: logging.Logger = logging.getLogger(),
+    level: int = logging.INFO,
+    n_records: int = 1,
+    flush_policy: str = "message",
+    flush_records: int = 100,
+    flush_level: int = logging.ERROR,
+    flush_interval: float = 1.0,
+) -> None:
+    """
+    flushes the handlers of the logger after n_records were logged with the given level, according to the flush policy:
+
+    always:   the caller flushes after every record, nothing to do here
+    message:  flush after every message
+    records:  flush after flush_records records
+    level:    flush only records with level >= flush_level
+    interval: flush every flush_interval seconds in a background thread
+
+    records with level >= flush_level are always flushed immediately (unless the policy is "always", then they are already flushed)
+
+    >>> logger_flush_by_policy(flush_policy='message')
+    >>> logger_flush_by_policy(flush_policy='records', flush_records=2)
+    >>> logger_flush_by_policy(flush_policy='level', level=logging.ERROR)
+    >>> logger_flush_by_policy(flush_policy='unknown')
+    Traceback (most recent call last):
+        ...
+    ValueError: unknown flush policy "unknown", must be one of ('always', 'message', 'records', 'level', 'interval')
+
+    """
+    if flush_policy == "always":
+        return
+
+    if level >= flush_level:
+        _unflushed_records[logger.name] = 0
+        logger_flush_all_handlers(logger)
+    elif flush_policy == "message":
+        logger_flush_all_handlers(logger)
+    elif flush_policy == "records":
+        unflushed_records = _unflushed_records.get(logger.name, 0) + n_records
+        if unflushed_records >= flush_records:
+            unflushed_records = 0
+            logger_flush_all_handlers(logger)
+        _unflushed_records[logger.name] = unflushed_records
+    elif flush_policy == "level":
+        pass
+    elif flush_policy == "interval":
+        start_periodic_flusher(logger, interval=flush_interval)
+    else:
+        raise ValueError(f'unknown flush policy "{flush_policy}", must be one of {flush_policies}')
+
+
+class PeriodicFlusher(threading.Thread):
+    """
+    background thread which flushes all handlers of a logger every interval seconds
+
+    >>> flusher = PeriodicFlusher(logging.getLogger(), interval=0.01)
+    >>> flusher.start()
+    >>> flusher.stop()
+
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 1.0):
+        super().__init__(name=f"lib_log_utils_flusher_{logger.name}", daemon=True)
+        self.logger = logger
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            logger_flush_all_handlers(self.logger)
+
+    def stop(self) -> None:
+        """stops the thread and flushes a last time"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        logger_flush_all_handlers(self.logger)
+
+
+_periodic_flushers: Dict[str, PeriodicFlusher] = dict()
+_periodic_flushers_lock = threading.Lock()
+
+
+def start_periodic_flusher(logger: logging.Logger = logging.getLogger(), interval: float = 1.0) -> PeriodicFlusher:
+    """
+    starts a PeriodicFlusher for the logger, if there is none running with the same interval
+
+    >>> flusher = start_periodic_flusher(interval=0.01)
+    >>> assert start_periodic_flusher(interval=0.01) is flusher
+    >>> stop_periodic_flusher()
+    >>> stop_periodic_flusher()
+
+    """
+    with _periodic_flushers_lock:
+        flusher = _periodic_flushers.get(logger.name)
+        if flusher is not None and flusher.is_alive() and flusher.interval == interval:
+            return flusher
+        if flusher is not None:
+            flusher.stop()
+        flusher = PeriodicFlusher(logger, interval=interval)
+        flusher.start()
+        _periodic_flushers[logger.name] = flusher
+        return flusher
+
+
+def stop_periodic_flusher(logger: logging.Logger = logging.getLogger()) -> None:
+    with _periodic_flushers_lock:
+        flusher = _periodic_flushers.pop(logger.name, None)
+    if flusher is not None:
+        flusher.stop()
+
+
+@atexit.register
+def _stop_all_periodic_flushers() -> None:
+    for logger_name in list(_periodic_flushers):
+        stop_periodic_flusher(logging.getLogger(logger_name))
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    puts the records into the queue without formatting them - formatting and writing is done by the BatchQueueListener thread
+    """
+
+    listener: "BatchQueueListener"
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue is never pickled, so the record can be passed as it is - the message is formatted in the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # a full queue blocks the caller until the listener has written a batch.
+        # not the listener thread itself (a handler which logs) - it would wait for itself, the record is dropped
+        if threading.current_thread() is self.listener._thread:  # type: ignore
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                pass
+        else:
+            self.queue.put(record)  # type: ignore
+
+    def flush(self) -> None:
+        # the listener flushes after every batch - use remove_async_handlers() to drain the queue
+        pass
+
+    def restart_after_fork(self) -> None:
+        """
+        called in a forked child : the listener thread is gone, and the queue may be locked by it -
+        a new queue and a new listener thread. the records which were in the queue are written by the parent.
+        """
+        self.queue = queue.Queue(self.queue.maxsize)  # type: ignore
+        self.listener.restart_after_fork(self.queue)  # type: ignore
+
+
+class BatchQueueListener(logging.handlers.QueueListener):
+    """
+    drains the queue in batches, and writes every batch with one writelines() to plain Stream- and FileHandlers.
+    all other handlers get the records one by one.
+    """
+
+    def __init__(self, queue: "queue.Queue[Any]", *handlers: logging.Handler, batch_size: int = 256):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def add_handler(self, handler: logging.Handler, first: bool = False) -> None:
+        if handler not in self.handlers:
+            self.handlers = (handler,) + self.handlers if first else self.handlers + (handler,)
+
+    def remove_handler(self, handler: logging.Handler) -> None:
+        self.handlers = tuple(own_handler for own_handler in self.handlers if own_handler is not handler)
+
+    def restart_after_fork(self, record_queue: "queue.Queue[Any]") -> None:
+        self.queue = record_queue
+        self._thread = None
+        self.start()
+
+    def enqueue_sentinel(self) -> None:
+        # the queue might be full - wait until the listener made room for the sentinel
+        self.queue.put(self._sentinel)  # type: ignore
+
+    def _monitor(self) -> None:
+        q: "queue.Queue[Any]" = self.queue  # type: ignore
+        sentinel = self._sentinel  # type: ignore
+        has_task_done = hasattr(q, "task_done")
+        while True:
+            records = [self.dequeue(True)]
+            while len(records) < self.batch_size:
+                try:
+                    records.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = sentinel in records
+            if stop:
+                records = records[: records.index(sentinel)]
+            if records:
+                self.handle_batch(records)
+            if has_task_done:
+                for _ in range(len(records) + int(stop)):
+                    q.task_done()
+            if stop:
+                break
+
+    def handle_batch(self, records: List[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            handler_records = [record for record in records if record.levelno >= handler.level]
+            if not handler_records:
+                continue
+            if type(handler).emit in (logging.StreamHandler.emit, logging.FileHandler.emit):
+                _write_batch(handler, handler_records)  # type: ignore
+            else:
+                for record in handler_records:
+                    handler.handle(record)
+
+
+def _write_batch(handler: logging.StreamHandler, records: List[logging.LogRecord]) -> None:  # type: ignore
+    """formats the records and writes them with a single writelines() to the stream of the handler"""
+    l_messages = list()
+    for record in records:
+        if handler.filter(record):
+            try:
+                l_messages.append(handler.format(record) + handler.terminator)
+            except Exception:  # noqa
+                handler.handleError(record)
+    if not l_messages:
+        return
+
+    handler.acquire()
+    try:
+        if isinstance(handler, logging.FileHandler) and handler.stream is None:
+            if handler.mode != "w" or not handler._closed:  # type: ignore
+                handler.stream = handler._open()
+        if handler.stream:
+            handler.stream.writelines(l_messages)
+            handler.flush()
+    except Exception:  # noqa
+        handler.handleError(records[-1])
+    finally:
+        handler.release()
+
+
+def get_async_queue_handler(logger: logging.Logger = logging.getLogger()) -> Optional[AsyncQueueHandler]:
+    for handler in logger.handlers:
+        if isinstance(handler, AsyncQueueHandler):
+            return handler
+    return None
+
+
+def set_async_handlers(
+    logger: logging.Logger = logging.getLogger(), name: str = "async_queue_handler", queue_size: int = 0, batch_size: int = 256
+) -> AsyncQueueHandler:
+    """
+    moves all handlers of the logger to a background listener thread, and puts an AsyncQueueHandler on the logger.
+    the caller thread only puts the records into the queue, formatting and writing is done in the listener thread.
+    handlers which are added later with the set_*_handler functions are also added to the listener thread.
+    the queue is drained and the handlers are flushed at interpreter exit, or with remove_async_handlers()
+
+    queue_size: the maximum number of records in the queue, 0 = unlimited. a full queue blocks the caller until the listener has written a batch
+    batch_size: the maximum number of records written with one writelines()
+
+    >>> logger = logging.getLogger('test_set_async_handlers')
+    >>> logger.propagate = False
+    >>> handler = set_stream_handler(logger, stream=sys.stdout, fmt='%(message)s')
+    >>> async_queue_handler = set_async_handlers(logger)
+    >>> assert logger.handlers == [async_queue_handler]
+    >>> assert async_queue_handler.listener.handlers == (handler, )
+    >>> logger.warning('test')
+    >>> remove_async_handlers(logger)
+    test
+    >>> assert logger.handlers == [handler]
+    >>> logger.removeHandler(handler)
+
+    """
+    remove_async_handlers(logger)
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    record_queue: "queue.Queue[Any]" = queue.Queue(queue_size)
+    async_queue_handler = AsyncQueueHandler(record_queue)
+    async_queue_handler.name = name
+    async_queue_handler.listener = BatchQueueListener(record_queue, *handlers, batch_size=batch_size)
+    async_queue_handler.listener.start()
+    logger.addHandler(async_queue_handler)
+    _async_loggers.add(logger.name)
+    return async_queue_handler
+
+
+def remove_async_handlers(logger: logging.Logger = logging.getLogger()) -> None:
+    """
+    drains the queue, stops the listener thread and puts the handlers back on the logger
+
+    >>> remove_async_handlers(logging.getLogger('test_remove_async_handlers'))
+
+    """
+    async_queue_handler = get_async_queue_handler(logger)
+    if async_queue_handler is None:
+        return
+    logger.removeHandler(async_queue_handler)
+    async_queue_handler.listener.stop()
+    for handler in async_queue_handler.listener.handlers:
+        logger.addHandler(handler)
+        handler.flush()
+    _async_loggers.discard(logger.name)
+
+
+_async_loggers: Set[str] = set()
+
+
+@atexit.register
+def _remove_all_async_handlers() -> None:
+    for logger_name in list(_async_loggers):
+        remove_async_handlers(logging.getLogger(logger_name))
+
+
+def _restart_async_handlers_after_fork() -> None:
+    for logger_name in list(_async_loggers):
+        async_queue_handler = get_async_queue_handler(logging.getLogger(logger_name))
+        if async_queue_handler is not None:
+            async_queue_handler.restart_after_fork()
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_restart_async_handlers_after_fork)
+
+
 class SaveLogHandlerFormatter(object):
     """ """
 
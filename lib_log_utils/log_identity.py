@@ -0,0 +1,63 @@
+# STDLIB
+import getpass
+import os
+from typing import Dict, Optional
+
+# OWN
+# lib_platform and lib_programname are imported lazily, on first use of the identity
+
+# the identity of this process, resolved on first use and reset in the child after os.fork()
+_identity: Optional[Dict[str, str]] = None
+
+
+def get_identity() -> Dict[str, str]:
+    """
+    returns the identity fields of the process : username, hostname_short, hostname, program_name and pid.
+    they are resolved once per process, and again in the child process after a fork.
+
+    >>> identity = get_identity()
+    >>> assert identity['pid'] == str(os.getpid())
+    >>> assert get_identity() is identity
+    >>> clear_identity_cache()
+    >>> assert get_identity() is not identity
+    >>> assert get_identity() == identity
+
+    >>> # the child process resolves the identity again after a fork
+    >>> if hasattr(os, 'fork'):
+    ...     read_fd, write_fd = os.pipe()
+    ...     pid = os.fork()
+    ...     if pid == 0:
+    ...         try:
+    ...             os.write(write_fd, get_identity()['pid'].encode())
+    ...         finally:
+    ...             os._exit(0)
+    ...     discard = os.waitpid(pid, 0)
+    ...     assert os.read(read_fd, 100).decode() == str(pid)
+    ...     os.close(read_fd)
+    ...     os.close(write_fd)
+
+    """
+    global _identity
+    identity = _identity
+    if identity is None:
+        import lib_platform
+        import lib_programname
+
+        identity = dict(
+            username=getpass.getuser(),
+            hostname_short=lib_platform.hostname_short,
+            hostname=lib_platform.hostname,
+            program_name=lib_programname.get_path_executed_script().stem,
+            pid=str(os.getpid()),
+        )
+        _identity = identity
+    return identity
+
+
+def clear_identity_cache() -> None:
+    global _identity
+    _identity = None
+
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=clear_identity_cache)
@@ -0,0 +1,173 @@
+# STDLIB
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import os
+from typing import Any, List, Optional, Set, Tuple
+
+# PROJ
+try:
+    from . import log_handlers
+except ImportError:  # pragma: no cover
+    import log_handlers  # type: ignore # pragma: no cover
+
+# a record travels from the worker to the writer as a tuple : (created, logger name, level, message, pid, exception text or None)
+CompactRecord = Tuple[float, str, int, str, int, Optional[str]]
+
+# the attributes of the records which are not sent by the workers, see make_record
+_record_defaults = dict(
+    logging.makeLogRecord(dict()).__dict__,
+    args=(),
+    exc_info=None,
+    stack_info=None,
+    thread=None,
+    threadName=None,
+    processName=None,
+)
+
+
+class ForwardingHandler(logging.handlers.QueueHandler):
+    """
+    the handler of a worker process : puts a compact tuple into the queue of the ProcessLogWriter of the parent process,
+    instead of pickling the whole LogRecord. the message is formatted and the exception is rendered in the worker,
+    so the args and exc_info of the record do not need to be pickled.
+    """
+
+    def __init__(self, queue: Any) -> None:
+        super().__init__(queue)
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> CompactRecord:  # type: ignore
+        exc_text = None
+        if record.exc_info or record.exc_text or record.stack_info:
+            if record.exc_info and not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            exc_text = record.exc_text or ""
+            if record.stack_info:
+                exc_text = (exc_text + "\n" if exc_text else "") + self._exception_formatter.formatStack(record.stack_info)
+        return record.created, record.name, record.levelno, record.getMessage(), record.process, exc_text  # type: ignore
+
+
+def make_record(compact_record: CompactRecord) -> logging.LogRecord:
+    """
+    builds the LogRecord of a compact record, without the cost of LogRecord.__init__.
+    fields which are not sent by the workers (pathname, lineno, funcName, thread, ...) have their default values
+
+    >>> record = make_record((1700000000.25, 'app', logging.WARNING, 'spam', 4711, None))
+    >>> record.name, record.levelname, record.getMessage(), record.process, record.msecs
+    ('app', 'WARNING', 'spam', 4711, 250.0)
+
+    """
+    created, name, levelno, message, process, exc_text = compact_record
+    record = logging.LogRecord.__new__(logging.LogRecord)
+    record.__dict__.update(_record_defaults)
+    record.__dict__.update(
+        name=name,
+        msg=message,
+        levelno=levelno,
+        levelname=logging.getLevelName(levelno),
+        created=created,
+        msecs=(created - int(created)) * 1000,
+        relativeCreated=(created - logging._startTime) * 1000,  # type: ignore
+        process=process,
+        exc_text=exc_text,
+    )
+    return record
+
+
+class ProcessLogListener(log_handlers.BatchQueueListener):
+    """
+    the writer thread of the parent process : drains the queue in batches and passes the records to the handlers of the logger -
+    the handlers which the logger has when the batch is written, so handlers set later (for instance with setup_handler) are used too
+    """
+
+    def __init__(self, queue: Any, logger: logging.Logger, batch_size: int = 256):
+        super().__init__(queue, batch_size=batch_size)
+        self.logger = logger
+
+    def handle_batch(self, records: List[Any]) -> None:
+        self.handlers = tuple(self.logger.handlers)
+        super().handle_batch([make_record(compact_record) for compact_record in records])
+
+
+class ProcessLogWriter(object):
+    """
+    the single writer of a process pool : the workers log through a ForwardingHandler into a multiprocessing queue,
+    the writer thread in the parent owns the real handlers of the logger. pass init_worker and initargs to the pool,
+    that works with the start methods fork, forkserver and spawn :
+
+    >>> from concurrent.futures import ProcessPoolExecutor
+    >>> writer = start_process_log_writer()
+    >>> with ProcessPoolExecutor(4, initializer=init_worker, initargs=writer.initargs) as pool:
+    ...     discard = list(pool.map(logging.getLogger().info, ['spam', 'ham']))
+    >>> writer.stop()
+
+    context: the multiprocessing context or start method of the queue, None = the default context
+    """
+
+    def __init__(self, logger: logging.Logger = logging.getLogger(), context: Any = None, batch_size: int = 256) -> None:
+        if context is None or isinstance(context, str):
+            context = multiprocessing.get_context(context)
+        self.logger = logger
+        self._pid = os.getpid()
+        self.queue = context.Queue()
+        self.listener = ProcessLogListener(self.queue, logger, batch_size=batch_size)
+        self.listener.start()
+
+    @property
+    def initargs(self) -> Tuple[Any, int, str]:
+        """the args of init_worker : the queue, the level and the name of the logger"""
+        return self.queue, self.logger.getEffectiveLevel(), self.logger.name
+
+    def stop(self) -> None:
+        """
+        writes the records which are in the queue and stops the writer thread - stop the pool first, the records which
+        the workers have logged are in the queue when the pool is shut down. multiprocessing.Pool must be closed and joined,
+        terminate() kills the workers before their records are sent.
+        """
+        # a forked child must not stop the writer of the parent
+        if self.listener._thread is None or self._pid != os.getpid():  # type: ignore
+            return
+        self.listener.stop()
+        self.queue.close()
+        self.queue.join_thread()
+        for handler in self.logger.handlers:
+            handler.flush()
+        _process_log_writers.discard(self)
+
+
+def start_process_log_writer(logger: logging.Logger = logging.getLogger(), context: Any = None, batch_size: int = 256) -> ProcessLogWriter:
+    """starts a ProcessLogWriter for the logger - it is stopped at interpreter exit, or with ProcessLogWriter.stop()"""
+    process_log_writer = ProcessLogWriter(logger=logger, context=context, batch_size=batch_size)
+    _process_log_writers.add(process_log_writer)
+    return process_log_writer
+
+
+def init_worker(queue: Any, level: int = logging.NOTSET, logger_name: str = "root") -> None:
+    """
+    the initializer of the pool workers : replaces the handlers of the logger (the logger of the ProcessLogWriter) with a ForwardingHandler.
+    after a fork the worker has the handlers of the parent - they are removed, not closed, the parent still uses them.
+
+    >>> import queue
+    >>> record_queue = queue.Queue()
+    >>> init_worker(record_queue, logging.INFO, 'test_init_worker')
+    >>> logging.getLogger('test_init_worker.child').warning('spam %s', 'ham')
+    >>> record_queue.get()[1:]
+    ('test_init_worker.child', 30, 'spam ham', ..., None)
+
+    """
+    logger = logging.getLogger(None if logger_name == "root" else logger_name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(ForwardingHandler(queue))
+    logger.setLevel(level)
+
+
+_process_log_writers: Set[ProcessLogWriter] = set()
+
+
+@atexit.register
+def _stop_all_process_log_writers() -> None:
+    for process_log_writer in list(_process_log_writers):
+        process_log_writer.stop()
@@ -0,0 +1,332 @@
+# STDLIB
+import atexit
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+# the budget of a level : (rate in records per second, burst), None = unlimited
+Budget = Optional[Tuple[float, float]]
+
+# the files of the log_* helpers, skipped when the call site is looked up
+helper_filenames = {os.path.join(os.path.dirname(os.path.abspath(__file__)), filename) for filename in ("lib_log_utils.py", "log_rate_limit.py")}
+
+
+class RateLimiter(object):
+    """
+    rate limiting and repeat suppression for log records, with a token bucket per key. the key is the call site (file and line,
+    key_by='call_site') or the message template (the message before the args are applied, key_by='template').
+
+    every key gets a bucket per level with burst tokens, which is refilled with rate tokens per second - the budget of the level,
+    see budgets. a record which finds no token is suppressed and counted, the next record which passes reports the number
+    of suppressed records - while a flood lasts, that happens periodically, once per 1/rate seconds.
+    when the flood is over, no record passes to report the last count : a timer thread checks every report_interval seconds
+    for keys which would pass a record again, and reports their count with the reporter of the key (see set_reporter).
+    the counts which are still pending are reported at exit, or with report_all_suppressed().
+
+    the check does not take a lock - the buckets are small lists, updated in place. with many threads logging the same key
+    at the same time, a few records more or less may pass, and the counts of suppressed records may be slightly too low.
+
+    the number of buckets per level is limited by max_keys : buckets without suppressed records are dropped first.
+
+    >>> rate_limiter = RateLimiter(budgets={logging.ERROR: (1.0, 3)})
+    >>> [rate_limiter.check(logging.ERROR, 'key') for _ in range(5)]
+    [0, 0, 0, None, None]
+    >>> rate_limiter.suppressed()
+    {'key': 2}
+    >>> # unlimited budget
+    >>> rate_limiter = RateLimiter(budgets={logging.CRITICAL: None})
+    >>> assert all(rate_limiter.check(logging.CRITICAL, 'key') == 0 for _ in range(100))
+
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: float = 10,
+        budgets: Optional[Mapping[int, Budget]] = None,
+        key_by: str = "call_site",
+        max_keys: int = 10000,
+        report_interval: float = 1.0,
+    ) -> None:
+        """
+        rate, burst: the default budget - the number of records per second, and the number of records which may pass at once
+        budgets: the budget per level, a budget applies to its level and the levels above, up to the next level in budgets.
+                 None is an unlimited budget, levels below all budgets get the default budget
+        key_by: 'call_site' or 'template'
+        report_interval: the interval of the timer thread, which reports the last count of a flood. 0 = no timer, only at exit
+        """
+        if key_by not in ("call_site", "template"):
+            raise ValueError(f'key_by must be "call_site" or "template", not {key_by!r}')
+        self.rate = rate
+        self.burst = burst
+        self.budgets: Dict[int, Budget] = dict(budgets or dict())
+        self.key_by = key_by
+        self.max_keys = max_keys
+        self.report_interval = report_interval
+        # level : (budget, buckets) - the buckets are key : [tokens, time of the last check, suppressed records, reporter]
+        self._levels: Dict[int, Tuple[Budget, Dict[Hashable, List[Any]]]] = dict()
+        # the timer thread is gone in the child after a fork
+        self._report_timer_pid = 0
+
+    def get_budget(self, level: int) -> Budget:
+        """
+        >>> rate_limiter = RateLimiter(rate=5, burst=20, budgets={logging.WARNING: (1, 2), logging.CRITICAL: None})
+        >>> rate_limiter.get_budget(logging.INFO), rate_limiter.get_budget(logging.ERROR), rate_limiter.get_budget(logging.CRITICAL)
+        ((5, 20), (1, 2), None)
+
+        """
+        budget: Budget = (self.rate, self.burst)
+        budget_levels = [budget_level for budget_level in self.budgets if budget_level <= level]
+        if budget_levels:
+            budget = self.budgets[max(budget_levels)]
+        return budget
+
+    def check(self, level: int, key: Hashable) -> Optional[int]:
+        """
+        takes a token for the key - returns None if the record should be suppressed,
+        otherwise the number of records of that key which were suppressed since the last record which passed
+        """
+        try:
+            budget, buckets = self._levels[level]
+        except KeyError:
+            budget, buckets = self._levels.setdefault(level, (self.get_budget(level), dict()))
+        if budget is None:
+            return 0
+        rate, burst = budget
+        now = time.monotonic()
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= self.max_keys:
+                self._prune(level)
+                budget, buckets = self._levels[level]
+            bucket = buckets.setdefault(key, [burst, now, 0, None])
+        tokens = bucket[0] + (now - bucket[1]) * rate
+        if tokens > burst:
+            tokens = burst
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            n_suppressed: int = bucket[2]
+            if n_suppressed:
+                bucket[2] = 0
+            return n_suppressed
+        bucket[0] = tokens
+        bucket[2] += 1
+        return None
+
+    def set_reporter(self, level: int, key: Hashable, reporter: Any) -> None:
+        """
+        sets the reporter of the suppressed records of the key, after check returned None : a logging.Logger, which logs the summary
+        with the level of the records, or a callable(n_suppressed, key). starts the timer thread, see report_suppressed
+        """
+        try:
+            self._levels[level][1][key][3] = reporter
+        except KeyError:
+            return
+        if self._report_timer_pid != os.getpid():
+            self._start_report_timer()
+
+    def report_suppressed(self, all_keys: bool = True) -> None:
+        """
+        reports the suppressed records, which were not reported by a passing record yet, with the reporters of their keys.
+        all_keys=False : only the keys whose flood is over - which would pass a record now
+
+        >>> rate_limiter = RateLimiter(rate=1, burst=1, report_interval=0)
+        >>> [rate_limiter.check(logging.ERROR, 'key') for _ in range(3)]
+        [0, None, None]
+        >>> rate_limiter.set_reporter(logging.ERROR, 'key', lambda n_suppressed, key: print(format_summary(n_suppressed, key)))
+        >>> rate_limiter.report_suppressed(all_keys=False)
+        >>> rate_limiter.report_suppressed()
+        suppressed 2 similar messages ('key')
+        >>> rate_limiter.suppressed()
+        {}
+
+        """
+        now = time.monotonic()
+        for level, (budget, buckets) in list(self._levels.items()):
+            if budget is None:
+                continue
+            rate, _ = budget
+            for key, bucket in list(buckets.items()):
+                n_suppressed, reporter = bucket[2], bucket[3]
+                if not n_suppressed or reporter is None:
+                    continue
+                if not all_keys and bucket[0] + (now - bucket[1]) * rate < 1:
+                    continue
+                bucket[2] = 0
+                try:
+                    if isinstance(reporter, logging.Logger):
+                        reporter.log(level, format_summary(n_suppressed, key))
+                    else:
+                        reporter(n_suppressed, key)
+                except Exception:  # noqa  # pragma: no cover
+                    pass
+
+    def _start_report_timer(self) -> None:
+        self._report_timer_pid = os.getpid()
+        _rate_limiters.add(self)
+        if self.report_interval <= 0:
+            return
+        # the thread keeps only a weak reference, it ends when the RateLimiter is gone
+        thread = threading.Thread(
+            target=_run_report_timer, args=(weakref.ref(self), self.report_interval), name="lib_log_utils_rate_limit_reporter", daemon=True
+        )
+        thread.start()
+
+    def get_record_key(self, record: logging.LogRecord) -> Hashable:
+        """the key of a LogRecord : the call site of the record, or its msg (the template, before the args are applied)"""
+        if self.key_by == "template":
+            msg = record.msg
+            return msg if isinstance(msg, str) else (record.pathname, record.lineno)
+        return record.pathname, record.lineno
+
+    def suppressed(self) -> Dict[Hashable, int]:
+        """returns the number of suppressed records per key, which were not reported yet"""
+        n_suppressed: Dict[Hashable, int] = dict()
+        for _, buckets in list(self._levels.values()):
+            for key, bucket in list(buckets.items()):
+                if bucket[2]:
+                    n_suppressed[key] = n_suppressed.get(key, 0) + bucket[2]
+        return n_suppressed
+
+    def reset(self) -> None:
+        self._levels = dict()
+
+    def _prune(self, level: int) -> None:
+        budget, buckets = self._levels[level]
+        buckets = {key: bucket for key, bucket in list(buckets.items()) if bucket[2]}
+        if len(buckets) >= self.max_keys:
+            buckets = dict()
+        self._levels[level] = (budget, buckets)
+
+
+# the RateLimiters with reporters, their pending counts are reported at exit
+_rate_limiters: "weakref.WeakSet[RateLimiter]" = weakref.WeakSet()
+
+
+def _run_report_timer(rate_limiter_ref: "weakref.ref[RateLimiter]", report_interval: float) -> None:
+    while True:
+        time.sleep(report_interval)
+        rate_limiter = rate_limiter_ref()
+        if rate_limiter is None:
+            return
+        rate_limiter.report_suppressed(all_keys=False)
+        del rate_limiter
+
+
+@atexit.register
+def report_all_suppressed() -> None:
+    """
+    reports the pending counts of suppressed records of all RateLimiters with reporters - called at exit
+
+    >>> report_all_suppressed()
+
+    """
+    for rate_limiter in list(_rate_limiters):
+        rate_limiter.report_suppressed()
+
+
+def get_call_site(depth: int = 1) -> Tuple[str, int]:
+    """
+    returns the file and line of the caller, outside of the log_* helpers of lib_log_utils
+
+    >>> get_call_site()
+    ('<doctest ...>', 1)
+
+    """
+    frame = sys._getframe(depth)
+    while frame.f_back is not None and frame.f_code.co_filename in helper_filenames:
+        frame = frame.f_back
+    return frame.f_code.co_filename, frame.f_lineno
+
+
+def get_message_key(rate_limiter: RateLimiter, message: Any) -> Hashable:
+    """returns the key of a message of lib_log_utils.log_level - the call site, or the message template"""
+    if rate_limiter.key_by == "template":
+        if isinstance(message, str):
+            return message
+        # a callable : the same code is the same template
+        return getattr(message, "__code__", message)
+    return get_call_site(2)
+
+
+def format_summary(n_suppressed: int, key: Hashable) -> str:
+    """
+    >>> format_summary(3, ('test.py', 12))
+    'suppressed 3 similar messages (test.py:12)'
+    >>> format_summary(1, 'connection to %s failed')
+    "suppressed 1 similar messages ('connection to %s failed')"
+
+    """
+    if isinstance(key, tuple) and len(key) == 2:
+        where = f"{key[0]}:{key[1]}"
+    else:
+        where = repr(key)
+    return f"suppressed {n_suppressed} similar messages ({where})"
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    a logging.Filter which suppresses records with a RateLimiter. before the next record of a key passes,
+    a summary record 'suppressed N similar messages' with the same level is passed to the handler
+    (or to the logger of the record, if the filter is not attached to a handler).
+    use it with log_handlers.set_stream_handler(rate_limiter=...), set_file_handler(rate_limiter=...) or handler.addFilter.
+
+    the records of lib_log_utils.log_level all have the same call site - for the log_* helpers use key_by='template',
+    or log_settings.rate_limiter, which is checked by log_level with the real call site.
+
+    >>> import io
+    >>> stream = io.StringIO()
+    >>> handler = logging.StreamHandler(stream)
+    >>> rate_limiter = RateLimiter(rate=0.001, burst=2, key_by='template', report_interval=0)
+    >>> handler.addFilter(RateLimitFilter(rate_limiter, handler))
+    >>> for number in range(5):
+    ...     discard = handler.handle(logging.makeLogRecord(dict(msg='failed %s', args=(number,), levelno=logging.ERROR, levelname='ERROR')))
+    >>> # the last count of a flood is reported by the timer thread, or at exit
+    >>> rate_limiter.report_suppressed()
+    >>> print(stream.getvalue())
+    failed 0
+    failed 1
+    suppressed 3 similar messages ('failed %s')
+    <BLANKLINE>
+
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, handler: Optional[logging.Handler] = None) -> None:
+        super().__init__()
+        self.rate_limiter = rate_limiter
+        self.handler = handler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "rate_limit_summary", False):
+            return True
+        key = self.rate_limiter.get_record_key(record)
+        n_suppressed = self.rate_limiter.check(record.levelno, key)
+        if n_suppressed is None:
+            self.rate_limiter.set_reporter(record.levelno, key, functools.partial(self._emit_summary, record))
+            return False
+        if n_suppressed:
+            self._emit_summary(record, n_suppressed, key)
+        return True
+
+    def _emit_summary(self, record: logging.LogRecord, n_suppressed: int, key: Hashable) -> None:
+        summary_record = logging.makeLogRecord(
+            dict(
+                name=record.name,
+                levelno=record.levelno,
+                levelname=record.levelname,
+                pathname=record.pathname,
+                lineno=record.lineno,
+                msg=format_summary(n_suppressed, key),
+                rate_limit_summary=True,
+            )
+        )
+        if self.handler is not None:
+            self.handler.handle(summary_record)
+        else:
+            logging.getLogger(record.name).handle(summary_record)
@@ -0,0 +1,410 @@
+# STDLIB
+import logging
+import os
+import platform
+import shlex
+from typing import Any, List, Optional, Tuple
+
+# PROJ
+try:
+    from . import __init__conf__
+    from . import log_ansi
+    from . import log_config
+    from . import log_handlers
+    from . import log_identity
+    from . import log_levels
+    from .log_config import log_settings, FieldAndLevelStyles
+except ImportError:  # pragma: no cover
+    import __init__conf__  # type: ignore # pragma: no cover
+    import log_ansi  # type: ignore # pragma: no cover
+    import log_config  # type: ignore # pragma: no cover
+    import log_handlers  # type: ignore # pragma: no cover
+    import log_identity  # type: ignore # pragma: no cover
+    import log_levels  # type: ignore # pragma: no cover
+    from log_config import log_settings, FieldAndLevelStyles  # type: ignore # pragma: no cover
+
+# the levels which get a log_<name> and banner_<name> function in the shell library
+shell_levels: List[Tuple[str, int]] = [
+    ("spam", log_levels.SPAM),
+    ("debug", logging.DEBUG),
+    ("verbose", log_levels.VERBOSE),
+    ("info", logging.INFO),
+    ("notice", log_levels.NOTICE),
+    ("warning", logging.WARNING),
+    ("success", log_levels.SUCCESS),
+    ("error", logging.ERROR),
+    ("critical", logging.CRITICAL),
+]
+
+# the fields of the log format which are resolved in the shell at runtime
+dynamic_fields = ("message", "asctime", "process")
+
+# the bash functions which wrap and frame the lines like lib_log_utils.render_lines (textwrap.wrap with tabsize=4)
+shell_render_functions = r"""
+# expands the tabs of $1 to a tab size of 4 into _llu_expanded, like str.expandtabs(4)
+_llu_expand_tabs() {
+    local text=$1 char column=0 index
+    _llu_expanded=""
+    for (( index = 0; index < ${#text}; index++ )); do
+        char=${text:index:1}
+        if [[ $char == $'\t' ]]; then
+            printf -v char '%*s' $(( 4 - column % 4 )) ''
+        elif [[ $char == $'\r' ]]; then
+            column=-1
+        fi
+        _llu_expanded+=$char
+        (( column += ${#char} ))
+    done
+}
+
+# wraps $1 to the width $2 like textwrap.wrap, with the indent $3 for all lines - appends the lines to _LLU_LINES
+_llu_wrap() {
+    local text=$1 width=$2 indent=$3 chunk last_chunk="" current chunk_pattern='^([ ]+|[^ ]+)(.*)$'
+    local -a chunks=()
+    local -i index=0 n_chunks n_current current_length available space_left n_lines=0
+    if [[ $text == *$'\t'* ]]; then
+        _llu_expand_tabs "$text"
+        text=$_llu_expanded
+    fi
+    while [[ -n $text ]]; do
+        [[ $text =~ $chunk_pattern ]]
+        chunks+=("${BASH_REMATCH[1]}")
+        text=${BASH_REMATCH[2]}
+    done
+    n_chunks=${#chunks[@]}
+    available=$(( width - ${#indent} ))
+    while (( index < n_chunks )); do
+        # drop the whitespace at the beginning of every line except the first one
+        if (( n_lines )) && [[ ${chunks[index]} == " "* ]]; then
+            index+=1
+            continue
+        fi
+        current=""
+        current_length=0
+        n_current=0
+        while (( index < n_chunks && current_length + ${#chunks[index]} <= available )); do
+            last_chunk=${chunks[index]}
+            current+=$last_chunk
+            current_length+=${#last_chunk}
+            n_current+=1
+            index+=1
+        done
+        # break words which are longer than the line
+        if (( index < n_chunks && ${#chunks[index]} > available )); then
+            if (( available < 1 )); then
+                space_left=1
+            else
+                space_left=$(( available - current_length ))
+            fi
+            chunk=${chunks[index]}
+            last_chunk=${chunk:0:space_left}
+            current+=$last_chunk
+            current_length+=${#last_chunk}
+            n_current+=1
+            chunks[index]=${chunk:space_left}
+        fi
+        # drop the whitespace at the end of the line
+        if (( n_current )) && [[ $last_chunk == " "* ]]; then
+            current=${current:0:current_length - ${#last_chunk}}
+            n_current=n_current-1
+        fi
+        if (( n_current )); then
+            _LLU_LINES+=("$indent$current")
+            n_lines+=1
+        fi
+    done
+}
+
+# fills _LLU_LINES with the lines of the message $1, as a banner if $2 is 1 - like lib_log_utils.render_lines
+_llu_render_lines() {
+    local message=$1 banner=$2 line padding
+    local -i index
+    _LLU_LINES=()
+    if (( banner )); then
+        _LLU_LINES+=("$_LLU_SEPARATOR")
+    fi
+    while :; do
+        line=${message%%$'\n'*}
+        if (( banner && _LLU_WRAP )); then
+            index=${#_LLU_LINES[@]}
+            _llu_wrap "$line" $(( _LLU_WIDTH - 2 )) "* "
+            for (( ; index < ${#_LLU_LINES[@]}; index++ )); do
+                printf -v padding '%*s' $(( _LLU_WIDTH - ${#_LLU_LINES[index]} - 1 )) ''
+                _LLU_LINES[index]+="$padding*"
+            done
+        elif (( banner )); then
+            line="* ${line%"${line##*[![:space:]]}"}"
+            if (( ${#line} < _LLU_WIDTH - 1 )); then
+                printf -v padding '%*s' $(( _LLU_WIDTH - ${#line} - 1 )) ''
+                line+="$padding*"
+            fi
+            _LLU_LINES+=("$line")
+        elif (( _LLU_WRAP )); then
+            _llu_wrap "$line" "$_LLU_WIDTH" ""
+        else
+            _LLU_LINES+=("${line%"${line##*[![:space:]]}"}")
+        fi
+        [[ $message == *$'\n'* ]] || break
+        message=${message#*$'\n'}
+    done
+    if (( banner )); then
+        _LLU_LINES+=("$_LLU_SEPARATOR")
+    fi
+}
+"""
+
+
+def generate_shell_lib(
+    fmt: Optional[str] = None,
+    datefmt: Optional[str] = None,
+    width: Optional[int] = None,
+    wrap: Optional[bool] = None,
+    quiet: Optional[bool] = None,
+    level: Optional[int] = None,
+    colored: Optional[bool] = None,
+    field_styles: Optional[FieldAndLevelStyles] = None,
+    level_styles: Optional[FieldAndLevelStyles] = None,
+) -> str:
+    """
+    returns the source of a bash library with the functions log_spam ... log_critical, banner_spam ... banner_critical
+    and log_level <level> <message>. The log_settings (or the given parameters) are baked in, the functions do not spawn any process.
+    The COLOREDLOGS_LOG_FORMAT, COLOREDLOGS_DATE_FORMAT, COLOREDLOGS_FIELD_STYLES and COLOREDLOGS_LEVEL_STYLES environment settings are honoured.
+
+    >>> shell_lib = generate_shell_lib(fmt='[%(levelname)s] %(message)s', colored=False)
+    >>> assert 'log_info() {' in shell_lib and 'banner_error() {' in shell_lib
+    >>> assert "'[INFO] '" in shell_lib
+
+    >>> generate_shell_lib(fmt='%(thread)d %(message)s')
+    Traceback (most recent call last):
+        ...
+    ValueError: the log format field "thread" is not supported in the shell library
+
+    """
+    colored = bool(log_settings.use_colored_stream_handler if colored is None else colored)
+    fmt = log_settings.fmt if fmt is None else fmt
+    datefmt = log_settings.datefmt if datefmt is None else datefmt
+    width = int(log_settings.width if width is None else width)
+    wrap = bool(log_settings.wrap if wrap is None else wrap)
+    quiet = bool(log_settings.quiet if quiet is None else quiet)
+    level = get_effective_level(colored) if level is None else int(level)
+
+    if colored:
+        log_config.autodetect_level_styles()
+        fmt = log_handlers.override_fmt_via_environment(fmt, "COLOREDLOGS_LOG_FORMAT")
+        datefmt = log_handlers.override_fmt_via_environment(datefmt, "COLOREDLOGS_DATE_FORMAT")
+        field_styles = log_handlers.override_style_via_environment(field_styles or log_settings.field_styles, "COLOREDLOGS_FIELD_STYLES")
+        level_styles = log_handlers.override_style_via_environment(level_styles or log_settings.level_styles, "COLOREDLOGS_LEVEL_STYLES")
+        fmt = log_ansi.colorize_fmt(log_handlers.format_fmt(fmt), field_styles)
+    else:
+        fmt = log_handlers.format_fmt(fmt)
+        field_styles = level_styles = {}
+
+    tokens = get_fmt_tokens(fmt)
+    names = {name for name, _ in tokens if name}
+    unsupported = names - set(dynamic_fields) - set(get_static_fields(logging.INFO))
+    if unsupported:
+        raise ValueError(f'the log format field "{sorted(unsupported)[0]}" is not supported in the shell library')
+
+    l_source = [
+        "# shellcheck shell=bash",
+        f"# generated by lib_log_utils {__init__conf__.version} - source this file from bash >= 4.2 : . <this file>",
+        "# the log_settings are baked in, the functions log to stderr and do not spawn any process",
+        "",
+        'if [ -z "${BASH_VERSION:-}" ]; then',
+        '    echo "this log library needs bash >= 4.2" >&2',
+        "    return 1 2>/dev/null || exit 1",
+        "fi",
+        "",
+        f"_LLU_WIDTH={width}",
+        f"_LLU_WRAP={int(wrap)}",
+        f"_LLU_QUIET={int(quiet)}",
+        f"_LLU_LEVEL={level}",
+        f"_LLU_SEPARATOR={shell_quote('*' * width)}",
+    ]
+    if "process" in names:
+        l_source.append(f'printf -v _LLU_PID {shell_quote(get_directive_spec(tokens, "process"))} "$$"')
+    l_source.append(shell_render_functions)
+
+    l_source.append("# logs the message $3 with the level $1, as a banner if $2 is 1")
+    l_source.append("_llu_log() {")
+    l_source.append("    (( _LLU_QUIET || $1 < _LLU_LEVEL )) && return 0")
+    l_source.append("    local _llu_asctime _llu_line")
+    l_source.append('    _llu_render_lines "$3" "$2"')
+    l_source.append("    (( ${#_LLU_LINES[@]} )) || return 0")
+    if "asctime" in names:
+        l_source.append(f"    printf -v _llu_asctime {shell_quote('%(' + datefmt + ')T')} -1")
+        asctime_spec = get_directive_spec(tokens, "asctime")
+        if asctime_spec != "%s":
+            l_source.append(f'    printf -v _llu_asctime {shell_quote(asctime_spec)} "$_llu_asctime"')
+    l_source.append('    "_llu_emit_$1"')
+    l_source.append("}")
+    l_source.append("")
+
+    for level_name, level_number in shell_levels:
+        level_style = log_ansi.ansi_style(log_ansi.get_style(level_styles, level_name))
+        line_expression = get_line_expression(tokens, level_number, level_style)
+        l_source.append(f"_llu_emit_{level_number}() {{")
+        l_source.append('    for _llu_line in "${_LLU_LINES[@]}"; do')
+        l_source.append(f"        printf '%s\\n' {line_expression}")
+        l_source.append("    done >&2")
+        l_source.append("}")
+        l_source.append(f'log_{level_name}() {{ _llu_log {level_number} 0 "$*"; }}')
+        l_source.append(f'banner_{level_name}() {{ _llu_log {level_number} 1 "$*"; }}')
+        l_source.append("")
+
+    l_source.append("# log_level <level> <message> [banner] - the level is one of the level names above")
+    l_source.append("log_level() {")
+    l_source.append("    local level=${1,,}")
+    l_source.append("    shift")
+    l_source.append('    case "$level" in')
+    for level_name, level_number in shell_levels:
+        l_source.append(f'        {level_name}) _llu_log {level_number} "${{2:-0}}" "$1" ;;')
+    l_source.append('        *) echo "log_level: unknown level \\"$level\\"" >&2; return 1 ;;')
+    l_source.append("    esac")
+    l_source.append("}")
+    l_source.append("")
+    return "\n".join(l_source)
+
+
+def write_shell_lib(path: str, **kwargs: Any) -> None:
+    """
+    writes the shell library (see generate_shell_lib) to path, "-" writes to stdout
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     path = os.path.join(tmp_dir, 'log_lib.sh')
+    ...     write_shell_lib(path, colored=False)
+    ...     assert 'log_info()' in open(path).read()
+
+    """
+    source = generate_shell_lib(**kwargs)
+    if path == "-":
+        print(source, end="")
+    else:
+        with open(path, "w", encoding="utf-8") as shell_lib_file:
+            shell_lib_file.write(source)
+
+
+def get_effective_level(colored: bool) -> int:
+    """
+    returns the level from which messages are shown by the stream handler of lib_log_utils.setup_handler -
+    coloredlogs lowers the logger level to the level of the handler
+
+    >>> assert get_effective_level(colored=True) == log_settings.stream_handler_log_level
+    >>> assert get_effective_level(colored=False) == max(log_settings.new_logger_level, log_settings.stream_handler_log_level)
+
+    """
+    logger_level = log_settings.new_logger_level
+    if colored:
+        logger_level = min(logger_level, log_settings.stream_handler_log_level)
+    return max(logger_level, log_settings.stream_handler_log_level)
+
+
+def get_static_fields(level: int) -> Any:
+    """
+    returns the log format fields which are constant for a level within the shell library
+
+    >>> get_static_fields(logging.INFO)['levelname']
+    'INFO'
+
+    """
+    identity = log_identity.get_identity()
+    return {
+        "levelname": logging.getLevelName(level),
+        "levelno": level,
+        "name": "root",
+        "hostname": platform.node(),
+        "programname": identity["program_name"],
+        "username": identity["username"],
+    }
+
+
+def get_fmt_tokens(fmt: str) -> List[Tuple[Optional[str], str]]:
+    """
+    splits a %-style log format into (field_name, text) tokens, field_name is None for literal text
+
+    >>> get_fmt_tokens('[%(levelname)-8s] %% %(message)s')
+    [(None, '['), ('levelname', '%(levelname)-8s'), (None, '] % '), ('message', '%(message)s')]
+
+    """
+    tokens: List[Tuple[Optional[str], str]] = []
+    position = 0
+    for match in log_ansi.format_directive_pattern.finditer(fmt):
+        if match.start() > position:
+            tokens.append((None, fmt[position : match.start()].replace("%%", "%")))
+        tokens.append((match.group(1), match.group(0)))
+        position = match.end()
+    if position < len(fmt):
+        tokens.append((None, fmt[position:].replace("%%", "%")))
+    return tokens
+
+
+def get_directive_spec(tokens: List[Tuple[Optional[str], str]], field_name: str) -> str:
+    """
+    returns the printf format of the first directive of a field
+
+    >>> get_directive_spec([('process', '%(process)5d')], 'process')
+    '%5d'
+
+    """
+    directive = next(text for name, text in tokens if name == field_name)
+    return directive.replace(f"({field_name})", "", 1)
+
+
+def get_line_expression(tokens: List[Tuple[Optional[str], str]], level: int, level_style: str) -> str:
+    """
+    returns the shell words which form one log line for a level, the message line is in $_llu_line
+
+    >>> get_line_expression(get_fmt_tokens('[%(levelname)s][%(process)d] %(message)s'), logging.ERROR, '\\x1b[31m')
+    '\\'[ERROR][\\'"${_LLU_PID}"\\'] \\'$\\'\\\\e[31m\\'"${_llu_line}"$\\'\\\\e[0m\\''
+
+    """
+    static_fields = get_static_fields(level)
+    l_words: List[str] = []
+    literal = ""
+    for name, text in tokens:
+        if name is None:
+            literal += text
+        elif name in static_fields:
+            literal += text % static_fields
+        else:
+            if literal:
+                l_words.append(shell_quote(literal))
+                literal = ""
+            if name == "message":
+                if level_style:
+                    l_words.extend((shell_quote(level_style), '"${_llu_line}"', shell_quote(log_ansi.ANSI_RESET)))
+                else:
+                    l_words.append('"${_llu_line}"')
+            elif name == "asctime":
+                l_words.append('"${_llu_asctime}"')
+            else:
+                l_words.append('"${_LLU_PID}"')
+    if literal:
+        l_words.append(shell_quote(literal))
+    return "".join(l_words) or "''"
+
+
+def shell_quote(text: str) -> str:
+    """
+    quotes a string for bash - strings with control characters are quoted as ANSI-C string
+
+    >>> print(shell_quote("it's"))
+    'it'"'"'s'
+    >>> print(shell_quote('\\x1b[0m'))
+    $'\\e[0m'
+
+    """
+    if text.isprintable():
+        return shlex.quote(text) if text else "''"
+    l_chars = []
+    for char in text:
+        if char == "\x1b":
+            l_chars.append("\\e")
+        elif char in "\\'":
+            l_chars.append("\\" + char)
+        elif not char.isprintable():
+            l_chars.append(f"\\x{ord(char):02x}" if ord(char) < 256 else char)
+        else:
+            l_chars.append(char)
+    return "$'" + "".join(l_chars) + "'"
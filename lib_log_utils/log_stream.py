@@ -0,0 +1,112 @@
+# STDLIB
+import logging
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+# PROJ
+try:
+    from . import lib_log_utils
+    from . import log_levels
+except ImportError:  # pragma: no cover
+    import lib_log_utils  # type: ignore # pragma: no cover
+    import log_levels  # type: ignore # pragma: no cover
+
+# the size of the chunks read from the stream
+read_size = 65536
+
+
+def iter_records(stream: BinaryIO, delimiter: bytes = b"\n", max_record_length: int = 65536) -> Iterator[bytes]:
+    """
+    yields the records of a binary stream, separated by the delimiter (the delimiter is removed).
+    records longer than max_record_length bytes are split, so the buffer is bounded.
+
+    >>> import io
+    >>> list(iter_records(io.BytesIO(b'line1\\nline2\\n\\nline3')))
+    [b'line1', b'line2', b'', b'line3']
+    >>> list(iter_records(io.BytesIO(b'record1\\x00record2\\x00'), delimiter=b'\\x00'))
+    [b'record1', b'record2']
+    >>> list(iter_records(io.BytesIO(b'1234567890\\n12'), max_record_length=4))
+    [b'1234', b'5678', b'90', b'12']
+
+    """
+    read = getattr(stream, "read1", stream.read)
+    buffer = b""
+    while True:
+        chunk = read(read_size)
+        if not chunk:
+            break
+        buffer += chunk
+        l_records = buffer.split(delimiter)
+        buffer = l_records.pop()
+        for record in l_records:
+            yield from _split_record(record, max_record_length)
+        while len(buffer) > max_record_length:
+            yield buffer[:max_record_length]
+            buffer = buffer[max_record_length:]
+    if buffer:
+        yield from _split_record(buffer, max_record_length)
+
+
+def _split_record(record: bytes, max_record_length: int) -> Iterator[bytes]:
+    if len(record) <= max_record_length:
+        yield record
+    else:
+        for start in range(0, len(record), max_record_length):
+            yield record[start : start + max_record_length]
+
+
+def parse_record(record: str, level: int, level_prefix: bool = False, banner_marker: Optional[str] = None) -> Tuple[str, int, bool]:
+    """
+    returns message, level and banner of a record.
+    level_prefix: a record like "ERROR: some message" is logged with that level, if the prefix is a known level name
+    banner_marker: a record which starts with the banner_marker is logged as banner, without the marker
+
+    >>> parse_record('ERROR: some message', logging.INFO, level_prefix=True)
+    ('some message', 40, False)
+    >>> parse_record('Note: some message', logging.INFO, level_prefix=True)
+    ('Note: some message', 20, False)
+    >>> parse_record('ERROR: some message', logging.INFO, level_prefix=False)
+    ('ERROR: some message', 20, False)
+    >>> parse_record('warning: ### build failed', logging.INFO, level_prefix=True, banner_marker='###')
+    ('build failed', 30, True)
+
+    """
+    banner = False
+    if level_prefix:
+        prefix, separator, message = record.partition(":")
+        if separator and prefix.upper() in logging._nameToLevel:  # noqa
+            level = log_levels.get_log_level_from_str(prefix)
+            record = message[1:] if message.startswith(" ") else message
+    if banner_marker and record.startswith(banner_marker):
+        banner = True
+        record = record[len(banner_marker) :].lstrip(" ")
+    return record, level, banner
+
+
+def log_stream(
+    stream: BinaryIO,
+    level: int = logging.INFO,
+    level_prefix: bool = False,
+    banner_marker: Optional[str] = None,
+    delimiter: bytes = b"\n",
+    max_record_length: int = 65536,
+    encoding: str = "utf-8",
+    logger: Optional[logging.Logger] = None,
+) -> int:
+    """
+    logs every record of the stream with lib_log_utils.log_level through the handlers which are already set up,
+    returns the number of records
+
+    >>> import io
+    >>> log_stream(io.BytesIO(b'ERROR: line1\\n### line2\\n'), level_prefix=True, banner_marker='###')
+    2
+
+    """
+    n_records = 0
+    for raw_record in iter_records(stream, delimiter=delimiter, max_record_length=max_record_length):
+        record = raw_record.decode(encoding, errors="replace")
+        if delimiter == b"\n" and record.endswith("\r"):
+            record = record[:-1]
+        message, record_level, banner = parse_record(record, level, level_prefix=level_prefix, banner_marker=banner_marker)
+        lib_log_utils.log_level(message=message, level=record_level, banner=banner, logger=logger)
+        n_records += 1
+    return n_records
@@ -44,6 +44,9 @@ def log_exception_traceback(
     log_level_exec_info = int(lib_parameter.get_default_if_none(log_level_exec_info, log_level))
     log_level_traceback = int(lib_parameter.get_default_if_none(log_level_traceback, log_level_exec_info))
 
+    # the debug context of the incident first, see log_handlers.DebugRingBufferHandler
+    log_handlers.dump_debug_ring_buffers()
+
     if s_error and log_level != logging.NOTSET:
         lib_log_utils.log_level(message=s_error, level=log_level)
 
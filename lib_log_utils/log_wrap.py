@@ -0,0 +1,131 @@
+# STDLIB
+import re
+import textwrap
+from typing import List
+
+# the whitespace of textwrap.TextWrapper
+whitespace = "\t\n\x0b\x0c\r "
+# characters which need the regular expressions of textwrap (hyphenated words and the whitespace which is not a space)
+complex_chars = "-\n\x0b\x0c\r"
+# the ASCII characters which textwrap keeps in the words, but drops as whitespace chunk with str.strip
+strip_chars = "\x1c\x1d\x1e\x1f"
+# without those characters, the chunks of textwrap.TextWrapper.wordsep_re are runs of spaces and words
+space_run_pattern = re.compile(r" *")
+
+
+def wrap(text: str, width: int, initial_indent: str = "", subsequent_indent: str = "") -> List[str]:
+    """
+    wraps the text like textwrap.wrap(text, width, tabsize=4, replace_whitespace=False, initial_indent=..., subsequent_indent=...),
+    with identical results. A text which fits into the width is returned as it is, ASCII texts are wrapped
+    by a simple greedy algorithm, only texts with hyphens, special whitespace or non-ASCII characters are passed to textwrap.
+    The whitespace of a text which fits is dropped like textwrap does it, so a non-ASCII text is passed to textwrap even if it fits.
+
+    >>> wrap('this is one nice piece of ham', 10)
+    ['this is', 'one nice', 'piece of', 'ham']
+    >>> wrap('  fits   ', 10)
+    ['  fits']
+    >>> wrap('   ', 10)
+    []
+    >>> wrap('averyveryverylongword', 10, initial_indent='* ', subsequent_indent='* ')
+    ['* averyver', '* yverylon', '* gword']
+    >>> wrap('a\\tb', 10)
+    ['a   b']
+    >>> wrap('wörds with-hyphens are wrapped by textwrap', 10)
+    ['wörds', 'with-', 'hyphens', 'are', 'wrapped by', 'textwrap']
+    >>> wrap('a \xa0', 10)
+    ['a ']
+
+    """
+    if width <= 0:
+        # let textwrap raise the error
+        return _textwrap(text, width, initial_indent, subsequent_indent)
+
+    if "\t" in text:
+        text = text.expandtabs(4)
+
+    # fast path - the ASCII text fits, only the whitespace at the end is dropped (textwrap drops unicode whitespace as well)
+    if len(text) + len(initial_indent) <= width and text.isascii() and not _has_strip_chars(text):
+        text = text.rstrip(whitespace)
+        return [initial_indent + text] if text else []
+
+    # textwrap needs its regular expressions for hyphens and special whitespace, and gets stuck if the indent does not leave room for text
+    if not text.isascii() or _has_complex_chars(text) or _has_strip_chars(text) or width <= max(len(initial_indent), len(subsequent_indent)):
+        return _textwrap(text, width, initial_indent, subsequent_indent)
+
+    return _wrap_spaces(text, width, initial_indent, subsequent_indent)
+
+
+def _has_complex_chars(text: str) -> bool:
+    # one substring search per character is much faster than a regular expression or a set
+    return any(char in text for char in complex_chars)
+
+
+def _has_strip_chars(text: str) -> bool:
+    # the ASCII characters which str.strip removes, but which are no whitespace for textwrap
+    return any(char in text for char in strip_chars)
+
+
+def _textwrap(text: str, width: int, initial_indent: str, subsequent_indent: str) -> List[str]:
+    return textwrap.wrap(text, width=width, tabsize=4, replace_whitespace=False, initial_indent=initial_indent, subsequent_indent=subsequent_indent)
+
+
+def _wrap_spaces(text: str, width: int, initial_indent: str, subsequent_indent: str) -> List[str]:
+    """
+    the greedy algorithm of textwrap.TextWrapper._wrap_chunks and _handle_long_word, for texts where the chunks
+    are runs of spaces or words without hyphens. Works on positions in the text, instead of a list of chunks.
+
+    >>> _wrap_spaces('this is  ham', 7, '', '')
+    ['this is', 'ham']
+
+    """
+    lines: List[str] = []
+    n_text = len(text)
+    pos = 0
+    while pos < n_text:
+        if lines:
+            indent = subsequent_indent
+            # drop the whitespace at the beginning of every line except the first one
+            if text[pos] == " ":
+                pos = space_run_pattern.match(text, pos).end()
+                if pos == n_text:
+                    break
+        else:
+            indent = initial_indent
+        available = width - len(indent)
+        limit = pos + available
+
+        if limit >= n_text:
+            lines_rest = text[pos:].rstrip(" ")
+            if lines_rest:
+                lines.append(indent + lines_rest)
+            break
+
+        # end of the last chunk which fits completely
+        if (text[limit] == " ") != (text[limit - 1] == " "):
+            end = limit
+        elif text[limit] == " ":
+            end = pos + len(text[pos:limit].rstrip(" "))
+        else:
+            end = text.rfind(" ", pos, limit) + 1 or pos
+
+        # break words which are longer than a line - only the first available + 1 characters of the next chunk are looked at
+        drop_trailing_whitespace = True
+        search_end = min(end + available + 1, n_text)
+        if text[end] == " ":
+            chunk_end = space_run_pattern.match(text, end, search_end).end()
+        else:
+            chunk_end = text.find(" ", end, search_end)
+            chunk_end = search_end if chunk_end < 0 else chunk_end
+        if chunk_end - end > available:
+            space_left = available - (end - pos)
+            # textwrap appends an empty piece of the word, and drops that instead of the whitespace
+            drop_trailing_whitespace = space_left > 0
+            end += space_left
+
+        line = text[pos:end]
+        if drop_trailing_whitespace:
+            line = line.rstrip(" ")
+        if line:
+            lines.append(indent + line)
+        pos = end
+    return lines
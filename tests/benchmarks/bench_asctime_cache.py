@@ -0,0 +1,39 @@
+# STDLIB
+import logging
+import pathlib
+import sys
+import time
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+
+
+def bench_format(formatter: logging.Formatter, only_time: bool = False, n_calls: int = 200000, records_per_second: int = 10000) -> float:
+    """returns the time of one format (or formatTime) call in microseconds, for records_per_second records within every second"""
+    records = [logging.makeLogRecord(dict(msg="a message", levelname="INFO", created=1700000000 + index / records_per_second)) for index in range(n_calls)]
+    format_method = formatter.format
+    if only_time:
+        format_method = lambda record: formatter.formatTime(record, log_handlers.default_date_fmt)  # noqa: E731
+    start = time.perf_counter()
+    for record in records:
+        format_method(record)
+    duration = time.perf_counter() - start
+    return duration / n_calls * 1e6
+
+
+def main() -> None:
+    """
+    compares logging.Formatter with the per-second asctime cache of the lib_log_utils formatters
+
+    python tests/benchmarks/bench_asctime_cache.py
+    """
+    fmt = "[%(asctime)s][%(levelname)-8s]: %(message)s"
+    for name, only_time in (("formatTime", True), ("format", False)):
+        uncached = bench_format(logging.Formatter(fmt, log_handlers.default_date_fmt), only_time=only_time)
+        cached = bench_format(log_handlers.MultiLineFormatter(fmt, log_handlers.default_date_fmt), only_time=only_time)
+        print(f"{name:<10}   logging.Formatter: {uncached:>6.3f} us   MultiLineFormatter: {cached:>6.3f} us   speedup: {uncached / cached:>4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
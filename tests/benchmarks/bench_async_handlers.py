@@ -0,0 +1,65 @@
+# STDLIB
+import io
+import logging
+import pathlib
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+from lib_log_utils import log_handlers  # noqa: E402
+
+
+class SlowStream(io.StringIO):
+    """a stream which simulates a slow pipe or a congested disk - every write and every flush takes write_delay seconds"""
+
+    write_delay = 0.0005
+
+    def write(self, s: str) -> int:
+        time.sleep(self.write_delay)
+        return super().write(s)
+
+    def writelines(self, lines: List[str]) -> None:  # type: ignore
+        time.sleep(self.write_delay)
+        super().writelines(lines)
+
+    def flush(self) -> None:
+        time.sleep(self.write_delay)
+
+
+def bench_latency(use_async_handlers: bool, n_messages: int = 2000) -> Dict[str, float]:
+    logger = logging.getLogger(f"bench_async_handlers_{use_async_handlers}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = log_handlers.set_stream_handler(logger, stream=SlowStream(), fmt=log_handlers.default_fmt)
+    if use_async_handlers:
+        log_handlers.set_async_handlers(logger)
+
+    l_latencies = list()
+    for n in range(n_messages):
+        start = time.perf_counter()
+        lib_log_utils.log_info(f"message {n}", logger=logger)
+        l_latencies.append(time.perf_counter() - start)
+
+    log_handlers.remove_async_handlers(logger)
+    logger.removeHandler(handler)
+    l_latencies.sort()
+    return dict(median_us=statistics.median(l_latencies) * 1e6, p99_us=l_latencies[int(len(l_latencies) * 0.99)] * 1e6)
+
+
+def main() -> None:
+    """
+    compares the latency of log_info with synchronous and asynchronous handlers, writing to a slow stream
+
+    python tests/benchmarks/bench_async_handlers.py
+    """
+    for use_async_handlers in (False, True):
+        result = bench_latency(use_async_handlers)
+        print(f"async={str(use_async_handlers):<6} median: {result['median_us']:>10.1f} us   p99: {result['p99_us']:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
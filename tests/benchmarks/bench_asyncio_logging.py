@@ -0,0 +1,105 @@
+# STDLIB
+import asyncio
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+from lib_log_utils import log_asyncio  # noqa: E402
+from lib_log_utils import log_handlers  # noqa: E402
+
+n_producers = 10
+n_records = 500
+tick_interval = 0.001
+
+
+class SlowStream(object):
+    """a stream which takes 200 us per write - like a slow terminal, a full pipe or a busy disk"""
+
+    def write(self, text: str) -> int:
+        time.sleep(0.0002)
+        return len(text)
+
+    def writelines(self, lines: List[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        pass
+
+
+async def ticker(lags: List[float], stop: asyncio.Event) -> None:
+    """measures how late the event loop wakes up a coroutine which sleeps tick_interval"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick_interval)
+        lags.append(time.perf_counter() - start - tick_interval)
+
+
+async def producer(logger: logging.Logger, number: int, use_asyncio: bool) -> None:
+    for record_number in range(n_records):
+        if use_asyncio:
+            await log_asyncio.alog_info(f"producer {number} record {record_number}", logger=logger)
+        else:
+            lib_log_utils.log_info(f"producer {number} record {record_number}", logger=logger)
+        await asyncio.sleep(0)
+
+
+async def run(logger: logging.Logger, use_asyncio: bool) -> Tuple[List[float], float]:
+    lags: List[float] = list()
+    stop = asyncio.Event()
+    ticker_task = asyncio.ensure_future(ticker(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(producer(logger, number, use_asyncio) for number in range(n_producers)))
+    duration = time.perf_counter() - start
+    if use_asyncio:
+        await log_asyncio.flush(logger)
+    stop.set()
+    await ticker_task
+    return lags, duration
+
+
+def bench(name: str, handler: logging.Handler, use_asyncio: bool) -> None:
+    logger = logging.getLogger(f"bench_asyncio_logging_{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    if use_asyncio:
+        log_asyncio.set_asyncio_handlers(logger)
+    try:
+        lags, duration = asyncio.run(run(logger, use_asyncio))
+    finally:
+        log_asyncio.remove_asyncio_handlers(logger)
+        logger.removeHandler(handler)
+        handler.close()
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] * 1000
+    print(f"{name:<28} loop lag p99 {p99:>7.2f} ms   max {lags[-1] * 1000:>7.2f} ms   logging {n_producers * n_records / duration:>7.0f} records per second")
+
+
+def main() -> None:
+    """
+    measures the latency of the event loop while n_producers coroutines log heavily, with log_info called directly
+    from the coroutines, and with alog_info and the asyncio handlers - into a file, and into a slow stream
+
+    python tests/benchmarks/bench_asyncio_logging.py
+    """
+    with tempfile.TemporaryDirectory() as log_dir:
+        for use_asyncio in (False, True):
+            suffix = "asyncio" if use_asyncio else "direct"
+            handler = logging.StreamHandler(SlowStream())  # type: ignore
+            handler.setFormatter(log_handlers.get_formatter(log_handlers.format_fmt(log_handlers.default_fmt)))
+            bench(f"slow stream, {suffix}", handler, use_asyncio)
+            file_handler = logging.FileHandler(os.path.join(log_dir, f"{suffix}.log"))
+            file_handler.setFormatter(log_handlers.get_formatter(log_handlers.format_fmt(log_handlers.default_fmt)))
+            bench(f"file, {suffix}", file_handler, use_asyncio)
+
+
+if __name__ == "__main__":
+    main()
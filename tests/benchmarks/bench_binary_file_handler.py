@@ -0,0 +1,52 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+
+
+def bench_handler(log_file: str, binary: bool, buffer_size: int, n_records: int) -> float:
+    """returns the time of one log call in microseconds"""
+    logger = logging.getLogger(f"bench_binary_file_handler_{binary}_{buffer_size}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    if binary:
+        handler = log_handlers.set_binary_file_handler(log_file, logger=logger, level=logging.DEBUG)
+    else:
+        handler = log_handlers.set_file_handler(log_file, logger=logger, level=logging.DEBUG, buffer_size=buffer_size)
+    try:
+        start = time.perf_counter()
+        for number in range(n_records):
+            logger.debug("processing item %d of %d: %s", number, n_records, "ok")
+        handler.flush()
+        duration = time.perf_counter() - start
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    return duration / n_records * 1e6
+
+
+def main() -> None:
+    """
+    compares the text logs of set_file_handler (default_fmt, unbuffered and buffered) with the binary log of set_binary_file_handler -
+    the time per log call and the size of the files
+
+    python tests/benchmarks/bench_binary_file_handler.py
+    """
+    n_records = 100000
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, binary, buffer_size in (("text", False, 0), ("text buffered", False, 1024 * 1024), ("binary", True, 0)):
+            log_file = os.path.join(log_dir, name.replace(" ", "_") + ".log")
+            duration = bench_handler(log_file, binary, buffer_size, n_records)
+            size = os.path.getsize(log_file)
+            print(f"{name:<14} {duration:>6.2f} us per record   {size / n_records:>6.1f} bytes per record")
+
+
+if __name__ == "__main__":
+    main()
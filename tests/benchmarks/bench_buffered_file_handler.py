@@ -0,0 +1,66 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Any, Tuple
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+
+
+class CountingStream(object):
+    """counts the flushes of the file object - every flush of a non empty buffer is one write system call"""
+
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+        self.flushes = 0
+
+    def write(self, data: str) -> int:
+        return int(self.stream.write(data))
+
+    def flush(self) -> None:
+        self.flushes += 1
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+def bench_file_handler(buffer_size: int, n_records: int = 200000) -> Tuple[float, int]:
+    """returns the time of one logger.info call in microseconds and the number of flushes to the OS"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        logger = logging.getLogger(f"bench_buffered_file_handler_{buffer_size}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = log_handlers.set_file_handler(os.path.join(tmp_dir, "bench.log"), logger=logger, buffer_size=buffer_size, flush_interval=60)
+        counting_stream = CountingStream(handler._open())  # type: ignore
+        handler.stream = counting_stream  # type: ignore
+        try:
+            start = time.perf_counter()
+            for record_number in range(n_records):
+                logger.info("processing item %d of the batch", record_number)
+            handler.flush()
+            duration = time.perf_counter() - start
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+    return duration / n_records * 1e6, counting_stream.flushes
+
+
+def main() -> None:
+    """
+    compares the plain FileHandler with the BufferedFileHandler of set_file_handler(buffer_size=...)
+
+    python tests/benchmarks/bench_buffered_file_handler.py
+    """
+    for buffer_size in (0, 64 * 1024, 1024 * 1024):
+        duration, flushes = bench_file_handler(buffer_size)
+        print(f"buffer_size {buffer_size:>8}: {duration:>6.2f} us per record   {flushes:>7} writes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# STDLIB
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent.parent
+path_cli_command = path_repository / "lib_log_utils" / "lib_log_utils_cli.py"
+
+
+def messages_per_second(n_messages: int, env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    for n in range(n_messages):
+        subprocess.run([sys.executable, str(path_cli_command), "-l", "info", f"message {n}"], check=True, env=env, stderr=subprocess.DEVNULL)
+    return n_messages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """
+    compares the messages per second of plain log_util calls with calls forwarded to a running log daemon (log_util --serve)
+
+    python tests/benchmarks/bench_cli_daemon.py
+    """
+    n_messages = 50
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = os.environ.copy()
+        env["LOG_UTIL_SOCKET"] = str(pathlib.Path(tmp_dir) / "log_util.sock")
+
+        print(f"plain cli calls     : {messages_per_second(n_messages, env):8.1f} messages/s")
+
+        daemon = subprocess.Popen([sys.executable, str(path_cli_command), "--serve"], env=env, stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(env["LOG_UTIL_SOCKET"]):
+                time.sleep(0.05)
+            print(f"forwarded to daemon : {messages_per_second(n_messages, env):8.1f} messages/s")
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# STDLIB
+import io
+import logging
+import pathlib
+import sys
+import time
+from typing import Optional
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+from lib_log_utils.log_config import log_settings  # noqa: E402
+
+
+def bench_colored_handler(native: bool, isatty: Optional[bool] = True, only_format: bool = False, n_calls: int = 50000) -> float:
+    """returns the time of one logger.warning call (or of one format call of the handler) in microseconds, through the colored stream handler"""
+    logger = logging.getLogger(f"bench_color_formatter_{native}_{isatty}")
+    logger.propagate = False
+    stream = io.StringIO()
+    handler = log_handlers.set_stream_handler_color(
+        logger,
+        stream=stream,
+        fmt=log_settings.fmt_extended,
+        field_styles=log_settings.field_styles,
+        level_styles=log_settings.level_styles,
+        native=native,
+        isatty=isatty,
+    )
+    record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, "a colored message", None, None)
+    try:
+        start = time.perf_counter()
+        if only_format:
+            for _ in range(n_calls):
+                handler.format(record)
+        else:
+            for _ in range(n_calls):
+                logger.warning("a colored message")
+        duration = time.perf_counter() - start
+    finally:
+        logger.removeHandler(handler)
+    return duration / n_calls * 1e6
+
+
+def main() -> None:
+    """
+    compares the ColorFormatter of lib_log_utils with coloredlogs, and the ColorFormatter with its plain variant for non-terminals
+
+    python tests/benchmarks/bench_color_formatter.py
+    """
+    start = time.perf_counter()
+    import coloredlogs  # type: ignore # noqa: F401
+
+    import_time = (time.perf_counter() - start) * 1e3
+    print(f"import coloredlogs: {import_time:>6.1f} ms")
+    for name, only_format in (("format", True), ("logger.warning", False)):
+        coloredlogs_time = bench_colored_handler(native=False, only_format=only_format)
+        native_time = bench_colored_handler(native=True, only_format=only_format)
+        plain_time = bench_colored_handler(native=True, isatty=False, only_format=only_format)
+        print(
+            f"{name:<15} coloredlogs: {coloredlogs_time:>6.2f} us   ColorFormatter: {native_time:>6.2f} us   "
+            f"speedup: {coloredlogs_time / native_time:>4.1f}x   not a terminal: {plain_time:>6.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
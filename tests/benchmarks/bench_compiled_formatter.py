@@ -0,0 +1,43 @@
+# STDLIB
+import logging
+import pathlib
+import sys
+import time
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+from lib_log_utils import log_handlers  # noqa: E402
+
+
+def bench_format_message(formatter: logging.Formatter, record: logging.LogRecord, n_calls: int = 200000) -> float:
+    """returns the time of one formatMessage call in microseconds"""
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        formatter.formatMessage(record)
+    duration = time.perf_counter() - start
+    return duration / n_calls * 1e6
+
+
+def main() -> None:
+    """
+    compares the CompiledFormatter with the MultiLineFormatter, for the extended log format of lib_log_utils
+
+    python tests/benchmarks/bench_compiled_formatter.py
+    """
+    fmt = log_handlers.format_fmt(log_handlers.default_fmt)
+    record = logging.makeLogRecord(dict(msg="a message", levelname="INFO", levelno=logging.INFO))
+    multiline_formatter = log_handlers.MultiLineFormatter(fmt, log_handlers.default_date_fmt)
+    compiled_formatter = log_handlers.CompiledFormatter(fmt, log_handlers.default_date_fmt)
+    # formatMessage expects the attributes which logging.Formatter.format sets
+    record.message = record.getMessage()
+    record.asctime = multiline_formatter.formatTime(record, log_handlers.default_date_fmt)
+    assert compiled_formatter.formatMessage(record) == multiline_formatter.formatMessage(record)
+    multiline = bench_format_message(multiline_formatter, record)
+    compiled = bench_format_message(compiled_formatter, record)
+    print(f"lib_log_utils {lib_log_utils.__version__}, format: {fmt!r}")
+    print(f"MultiLineFormatter: {multiline:>6.3f} us   CompiledFormatter: {compiled:>6.3f} us   speedup: {multiline / compiled:>4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# STDLIB
+import logging
+import pathlib
+import sys
+import timeit
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+
+
+def main() -> None:
+    """
+    measures the cost of log calls which are not logged, because the level of the logger is higher, or because of quiet=True.
+    those calls return before any string processing - the message is neither split nor wrapped.
+
+    python tests/benchmarks/bench_disabled_calls.py
+    """
+    logger = logging.getLogger("bench_disabled_calls")
+    logger.setLevel(logging.INFO)
+    message = "a long multi-line message, which would need to be wrapped\n" * 20
+    n_calls = 200000
+
+    calls = {
+        "log_debug (level)": lambda: lib_log_utils.log_debug(message, logger=logger),
+        "banner_debug (level)": lambda: lib_log_utils.banner_debug(message, logger=logger),
+        "log_level (level)": lambda: lib_log_utils.log_level(message, logging.DEBUG, logger=logger),
+        "log_info (quiet)": lambda: lib_log_utils.log_info(message, logger=logger, quiet=True),
+        "empty function call": lambda: None,
+    }
+    for name, call in calls.items():
+        duration = timeit.timeit(call, number=n_calls) / n_calls * 1e9
+        print(f"{name:<22} {duration:>8.0f} ns per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# STDLIB
+import io
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+from lib_log_utils import log_handlers  # noqa: E402
+from lib_log_utils.log_config import log_settings  # noqa: E402
+
+
+class FlushCountingStream(io.TextIOWrapper):
+    """a text file which counts the calls to flush - every flush with pending data is a write syscall"""
+
+    n_flush = 0
+
+    def flush(self) -> None:
+        self.n_flush += 1
+        super().flush()
+
+
+def bench_flush_policy(flush_policy: str, n_messages: int = 2000, lines_per_message: int = 10) -> Dict[str, Any]:
+    message = "\n".join(f"line {line_number} of a multi-line message" for line_number in range(lines_per_message))
+    logger = logging.getLogger(f"bench_flush_policy_{flush_policy}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stream = FlushCountingStream(open(pathlib.Path(tmp_dir) / "bench.log", "wb"), encoding="utf-8")
+        handler = log_handlers.set_stream_handler(logger, stream=stream, fmt=log_handlers.default_fmt)  # type: ignore
+        save_flush_policy = log_settings.flush_policy
+        log_settings.flush_policy = flush_policy
+        try:
+            start = time.perf_counter()
+            for _ in range(n_messages):
+                lib_log_utils.log_level(message, level=logging.INFO, wrap=False, logger=logger)
+            duration = time.perf_counter() - start
+        finally:
+            log_settings.flush_policy = save_flush_policy
+            log_handlers.stop_periodic_flusher(logger)
+            logger.removeHandler(handler)
+            stream.close()
+
+    return dict(policy=flush_policy, flushes=stream.n_flush, lines_per_second=int(n_messages * lines_per_message / duration))
+
+
+def main() -> None:
+    """
+    compares the number of flush calls (and therefore write syscalls) and the throughput of the flush policies.
+    note that logging.StreamHandler.emit flushes itself after every record, that is included in the numbers.
+
+    python tests/benchmarks/bench_flush_policy.py
+    """
+    for flush_policy in log_handlers.flush_policies:
+        result = bench_flush_policy(flush_policy)
+        print(f"{result['policy']:<10} flushes: {result['flushes']:>8}   lines/s: {result['lines_per_second']:>10}")
+
+
+if __name__ == "__main__":
+    main()
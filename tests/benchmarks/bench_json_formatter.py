@@ -0,0 +1,53 @@
+# STDLIB
+import json
+import logging
+import pathlib
+import sys
+import timeit
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+from lib_log_utils import log_identity  # noqa: E402
+
+
+class NaiveJsonFormatter(logging.Formatter):
+    """serializes all fields for every record with json.dumps"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        identity = log_identity.get_identity()
+        return json.dumps(
+            dict(
+                time=self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + ".%03d" % record.msecs,
+                level=record.levelname,
+                user=identity["username"],
+                hostname=identity["hostname_short"],
+                program=identity["program_name"],
+                pid=record.process,
+                message=record.getMessage(),
+            ),
+            ensure_ascii=False,
+        )
+
+
+def main() -> None:
+    """
+    compares the JsonFormatter with a formatter which serializes all fields with json.dumps for every record,
+    and with the text format default_fmt
+
+    python tests/benchmarks/bench_json_formatter.py
+    """
+    record = logging.makeLogRecord(dict(msg="connection to the database failed: timeout after %d seconds", args=(30,), levelname="ERROR"))
+    n_calls = 100000
+    formatters = {
+        "text default_fmt": log_handlers.get_formatter(log_handlers.format_fmt(log_handlers.default_fmt), log_handlers.default_date_fmt),
+        "json.dumps per record": NaiveJsonFormatter(),
+        "JsonFormatter": log_handlers.JsonFormatter(),
+    }
+    for name, formatter in formatters.items():
+        duration = timeit.timeit(lambda: formatter.format(record), number=n_calls) / n_calls * 1e9
+        print(f"{name:<24} {duration:>8.0f} ns per record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# STDLIB
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+from lib_log_utils import log_multiprocess  # noqa: E402
+
+n_workers = 32
+n_records = 2000
+
+
+def log_records(task: int) -> None:
+    logger = logging.getLogger("bench_multiprocess_logging.worker")
+    for number in range(n_records):
+        logger.info("task %d record %d: %s", task, number, "ok")
+
+
+def init_stdlib_worker(queue: Any, level: int, logger_name: str) -> None:
+    # the full LogRecord is pickled, like with logging.handlers.QueueHandler
+    logger = logging.getLogger(logger_name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(queue))
+    logger.setLevel(level)
+
+
+def bench_pool(log_file: str, mode: str) -> float:
+    """returns the records per second of n_workers workers, which log into one file"""
+    logger = logging.getLogger("bench_multiprocess_logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = log_handlers.set_file_handler(log_file, logger=logger, fmt=log_handlers.default_fmt)
+    context = multiprocessing.get_context("fork")
+    start = time.perf_counter()
+    try:
+        if mode == "inherited handlers":
+            with ProcessPoolExecutor(n_workers, mp_context=context) as pool:
+                list(pool.map(log_records, range(n_workers)))
+        elif mode == "QueueHandler":
+            queue = context.Queue()
+            listener = logging.handlers.QueueListener(queue, handler)
+            listener.start()
+            with ProcessPoolExecutor(n_workers, mp_context=context, initializer=init_stdlib_worker, initargs=(queue, logging.INFO, logger.name)) as pool:
+                list(pool.map(log_records, range(n_workers)))
+            listener.stop()
+        else:
+            writer = log_multiprocess.ProcessLogWriter(logger=logger, context=context)
+            with ProcessPoolExecutor(n_workers, mp_context=context, initializer=log_multiprocess.init_worker, initargs=writer.initargs) as pool:
+                list(pool.map(log_records, range(n_workers)))
+            writer.stop()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    return n_workers * n_records / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """
+    compares n_workers processes which log into one file : with the handlers inherited by fork (every worker writes the file),
+    with the ProcessLogWriter (compact tuples), and with the QueueHandler of the standard library (pickled LogRecords).
+    also compares the size and the time to serialize one record
+
+    python tests/benchmarks/bench_multiprocess_logging.py
+    """
+    record = logging.makeLogRecord(dict(name="app.worker", msg="task %d record %d: %s", args=(1, 2, "ok"), levelno=logging.INFO, levelname="INFO"))
+    queue_handler = logging.handlers.QueueHandler(None)  # type: ignore
+    forwarding_handler = log_multiprocess.ForwardingHandler(None)
+    n_calls = 100000
+    for name, prepare in (("QueueHandler", queue_handler.prepare), ("ForwardingHandler", forwarding_handler.prepare)):
+        size = len(pickle.dumps(prepare(record)))
+        duration = timeit.timeit(lambda: pickle.dumps(prepare(record)), number=n_calls) / n_calls * 1e9
+        print(f"{name:<20} {duration:>8.0f} ns per record {size:>6} bytes pickled")
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        for mode in ("inherited handlers", "QueueHandler", "ProcessLogWriter"):
+            log_file = os.path.join(log_dir, mode.replace(" ", "_") + ".log")
+            records_per_second = bench_pool(log_file, mode)
+            print(f"{mode:<20} {records_per_second:>8.0f} records per second with {n_workers} workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# STDLIB
+import io
+import logging
+import pathlib
+import sys
+import timeit
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+from lib_log_utils import log_handlers  # noqa: E402
+from lib_log_utils import log_rate_limit  # noqa: E402
+from lib_log_utils.log_config import log_settings  # noqa: E402
+
+
+def main() -> None:
+    """
+    measures a flood of the same log_error, without and with a rate limiter - and the cost of the check alone
+
+    python tests/benchmarks/bench_rate_limit.py
+    """
+    logger = logging.getLogger("bench_rate_limit")
+    logger.propagate = False
+    log_handlers.set_stream_handler(logger, stream=io.StringIO(), fmt=log_handlers.default_fmt)  # type: ignore
+    n_calls = 100000
+    rate_limiter = log_rate_limit.RateLimiter(rate=10, burst=10)
+
+    def flood() -> None:
+        lib_log_utils.log_error("connection to the database failed", logger=logger)
+
+    for name, limiter in (("log_error flood", None), ("log_error flood (rate limited)", rate_limiter)):
+        log_settings.rate_limiter = limiter
+        duration = timeit.timeit(flood, number=n_calls) / n_calls * 1e9
+        print(f"{name:<32} {duration:>8.0f} ns per call")
+    log_settings.rate_limiter = None
+
+    duration = timeit.timeit(lambda: rate_limiter.check(logging.ERROR, "key"), number=n_calls) / n_calls * 1e9
+    print(f"{'RateLimiter.check':<32} {duration:>8.0f} ns per call")
+    duration = timeit.timeit(lambda: log_rate_limit.get_call_site(), number=n_calls) / n_calls * 1e9
+    print(f"{'get_call_site':<32} {duration:>8.0f} ns per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# STDLIB
+import pathlib
+import sys
+import time
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+import lib_log_utils  # noqa: E402
+from lib_log_utils.log_config import log_settings  # noqa: E402
+
+
+def bench_render_lines(message: str, banner: bool, cache_size: int, n_calls: int = 20000) -> float:
+    """returns the time of one render_lines call in microseconds"""
+    save_render_cache_size = log_settings.render_cache_size
+    log_settings.render_cache_size = cache_size
+    lib_log_utils.clear_render_cache()
+    try:
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            lib_log_utils.render_lines(message, width=140, wrap=True, banner=banner)
+        duration = time.perf_counter() - start
+    finally:
+        log_settings.render_cache_size = save_render_cache_size
+    return duration / n_calls * 1e6
+
+
+def main() -> None:
+    """
+    compares render_lines with and without the LRU cache, for repeated banners and repeated wrapped messages
+
+    python tests/benchmarks/bench_render_cache.py
+    """
+    messages = {
+        "phase banner": ("phase 3 of 7: compiling the extensions", True),
+        "status box": ("\n".join(f"status line {line_number}: everything is fine" for line_number in range(10)), True),
+        "wrapped message": ("a long message, which is wrapped to the banner width " * 20, False),
+    }
+    for name, (message, banner) in messages.items():
+        uncached = bench_render_lines(message, banner, cache_size=0)
+        cached = bench_render_lines(message, banner, cache_size=log_settings.render_cache_size or 256)
+        print(f"{name:<16} uncached: {uncached:>8.2f} us   cached: {cached:>8.2f} us   speedup: {uncached / cached:>6.1f}x")
+    print(lib_log_utils.render_cache_info())
+
+
+if __name__ == "__main__":
+    main()
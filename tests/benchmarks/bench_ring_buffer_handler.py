@@ -0,0 +1,44 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_handlers  # noqa: E402
+
+
+def bench_handler(handler: logging.Handler, n_records: int = 200000) -> float:
+    """returns the time of one handler.handle call in microseconds, the record is formatted with the default format of lib_log_utils"""
+    handler.setFormatter(log_handlers.get_formatter(log_handlers.format_fmt(log_handlers.default_fmt), log_handlers.default_date_fmt))
+    record = logging.makeLogRecord(dict(msg="debug record with some details", levelname="DEBUG", levelno=logging.DEBUG))
+    try:
+        start = time.perf_counter()
+        for _ in range(n_records):
+            handler.handle(record)
+        duration = time.perf_counter() - start
+    finally:
+        handler.close()
+    return duration / n_records * 1e6
+
+
+def main() -> None:
+    """
+    compares the MmapRingBufferHandler with a FileHandler and the BufferedFileHandler
+
+    python tests/benchmarks/bench_ring_buffer_handler.py
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_handler = bench_handler(logging.FileHandler(os.path.join(tmp_dir, "debug.log")))
+        buffered_handler = bench_handler(log_handlers.BufferedFileHandler(os.path.join(tmp_dir, "buffered.log"), flush_interval=0))
+        ring_buffer_handler = bench_handler(log_handlers.MmapRingBufferHandler(os.path.join(tmp_dir, "flight.ring"), size=16 * 1024 * 1024))
+    print(f"FileHandler:           {file_handler:>6.2f} us per record")
+    print(f"BufferedFileHandler:   {buffered_handler:>6.2f} us per record")
+    print(f"MmapRingBufferHandler: {ring_buffer_handler:>6.2f} us per record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# STDLIB
+import pathlib
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent.parent
+
+
+def measure(command: List[str], n_runs: int = 20) -> float:
+    """returns the median wall time of the command in milliseconds"""
+    l_durations = list()
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=str(path_repository))
+        l_durations.append(time.perf_counter() - start)
+    return statistics.median(l_durations) * 1000
+
+
+def main() -> None:
+    """
+    measures the startup time of "import lib_log_utils", and the cost of the "tput colors" subprocess
+    which was started on every import before the color detection became lazy and in-process.
+
+    python tests/benchmarks/bench_startup.py
+    """
+    python_baseline = measure([sys.executable, "-c", "pass"])
+    import_lib_log_utils = measure([sys.executable, "-c", "import lib_log_utils"])
+    print(f"python startup                  : {python_baseline:8.1f} ms")
+    print(f"python startup + import         : {import_lib_log_utils:8.1f} ms")
+    print(f"import lib_log_utils            : {import_lib_log_utils - python_baseline:8.1f} ms")
+    tput = shutil.which("tput")
+    if tput:
+        print(f"tput colors (saved per import)  : {measure([tput, 'colors']):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# STDLIB
+import pathlib
+import sys
+import textwrap
+import timeit
+
+# PROJ
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+from lib_log_utils import log_wrap  # noqa: E402
+
+
+def main() -> None:
+    """
+    compares log_wrap.wrap with textwrap.wrap for short, long and pathological lines
+
+    python tests/benchmarks/bench_wrap.py
+    """
+    lines = {
+        "short line": "compiling module foo",
+        "long line": "a long log message, which needs to be wrapped to the width of the banner " * 20,
+        "long word": "x" * 10000,
+        "many spaces": "a" + " " * 5000 + "b",
+        "tiny words": "a " * 5000,
+        "tabs": "key\tvalue\t" * 200,
+        "hyphens": "well-known self-contained log-message " * 50,
+    }
+    for name, line in lines.items():
+        n_calls = 20 if len(line) > 1000 else 2000
+        time_textwrap = timeit.timeit(lambda: textwrap.wrap(line, width=138, tabsize=4, replace_whitespace=False), number=n_calls) / n_calls * 1e6
+        time_log_wrap = timeit.timeit(lambda: log_wrap.wrap(line, width=138), number=n_calls) / n_calls * 1e6
+        print(f"{name:<12} textwrap: {time_textwrap:>10.1f} us   log_wrap: {time_log_wrap:>10.1f} us   speedup: {time_textwrap / time_log_wrap:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
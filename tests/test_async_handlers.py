@@ -0,0 +1,67 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import time
+from typing import List
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_handlers
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_async_handlers_fork(tmp_path: pathlib.Path) -> None:
+    # the listener thread is not copied by fork - the child gets its own listener
+    log_file = tmp_path / "fork.log"
+    logger = logging.getLogger("test_async_handlers_fork")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = log_handlers.set_file_handler(str(log_file), logger=logger, fmt="%(process)d %(message)s")
+    log_handlers.set_async_handlers(logger)
+    try:
+        logger.info("parent")
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            logger.info("child")
+            log_handlers.remove_async_handlers(logger)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        logger.info("parent again")
+    finally:
+        log_handlers.remove_async_handlers(logger)
+        logger.removeHandler(handler)
+        handler.close()
+    assert sorted(log_file.read_text().splitlines()) == sorted([f"{os.getpid()} parent", f"{pid} child", f"{os.getpid()} parent again"])
+
+
+class SlowHandler(logging.Handler):
+    """a handler which is slower than the caller"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: List[str] = list()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(0.001)
+        self.messages.append(record.getMessage())
+
+
+def test_async_handlers_bounded_queue(capsys: pytest.CaptureFixture[str]) -> None:
+    # a full queue blocks the caller - no record is lost, and the sentinel waits for room as well
+    logger = logging.getLogger("test_async_handlers_bounded_queue")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = SlowHandler()
+    logger.addHandler(handler)
+    log_handlers.set_async_handlers(logger, queue_size=2, batch_size=1)
+    try:
+        for number in range(50):
+            logger.info(f"record {number}")
+    finally:
+        log_handlers.remove_async_handlers(logger)
+        logger.removeHandler(handler)
+    assert handler.messages == [f"record {number}" for number in range(50)]
+    assert "Logging error" not in capsys.readouterr().err
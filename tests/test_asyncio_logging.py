@@ -0,0 +1,192 @@
+# STDLIB
+import asyncio
+import io
+import logging
+import os
+import pathlib
+import threading
+import time
+from typing import Iterator, List, Tuple
+
+# EXT
+import pytest
+
+# OWN
+import lib_log_utils
+from lib_log_utils import log_asyncio
+from lib_log_utils import log_handlers
+
+
+class BlockingHandler(logging.Handler):
+    """a slow sink : emit waits until the test releases it"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entered = threading.Event()
+        self.released = threading.Event()
+        self.messages: List[str] = list()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.entered.set()
+        self.released.wait(10)
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def logger_and_stream() -> Iterator[Tuple[logging.Logger, io.StringIO]]:
+    logger = logging.getLogger("test_asyncio_logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    stream = io.StringIO()
+    handler = log_handlers.set_stream_handler(logger, stream=stream, fmt="[%(levelname)s] %(message)s")  # type: ignore
+    log_asyncio.set_asyncio_handlers(logger)
+    yield logger, stream
+    log_asyncio.remove_asyncio_handlers(logger)
+    logger.removeHandler(handler)
+
+
+def test_alog_and_flush(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+
+    async def main() -> None:
+        await log_asyncio.alog_info("info", logger=logger)
+        await log_asyncio.alog_debug("not logged", logger=logger)
+        await log_asyncio.abanner_error("ham\nspam", width=10, logger=logger)
+        lib_log_utils.log_warning("sync %s", logger=logger, args=("call",))
+        await log_asyncio.flush(logger)
+        assert stream.getvalue().splitlines(keepends=True) == [
+            "[INFO] info\n",
+            "[ERROR] **********\n",
+            "[ERROR] * ham    *\n",
+            "[ERROR] * spam   *\n",
+            "[ERROR] **********\n",
+            "[WARNING] sync call\n",
+        ]
+
+    asyncio.run(main())
+
+
+def test_flush_buffered_file_handler(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "asyncio.log"
+    logger = logging.getLogger("test_asyncio_logging_file")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    log_asyncio.set_asyncio_handlers(logger)
+    # handlers which are set later are moved to the writer thread
+    handler = log_handlers.set_file_handler(str(log_file), logger=logger, fmt="%(message)s", buffer_size=1024 * 1024, flush_interval=0)
+    assert logger.handlers == [log_asyncio.get_asyncio_queue_handler(logger)]
+
+    async def main() -> None:
+        for number in range(100):
+            await log_asyncio.alog_info(f"record {number}", logger=logger)
+        await log_asyncio.flush(logger)
+        assert log_file.read_text().splitlines() == [f"record {number}" for number in range(100)]
+
+    try:
+        asyncio.run(main())
+    finally:
+        log_asyncio.remove_asyncio_handlers(logger)
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_full_queue() -> None:
+    # the sync API drops records when the queue is full, the coroutines wait for space
+    logger = logging.getLogger("test_asyncio_logging_full_queue")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    blocking_handler = BlockingHandler()
+    logger.addHandler(blocking_handler)
+    log_asyncio.set_asyncio_handlers(logger, queue_size=2, batch_size=1)
+
+    async def main() -> None:
+        lib_log_utils.log_info("first", logger=logger)
+        assert blocking_handler.entered.wait(10)
+        start = time.perf_counter()
+        for number in range(10):
+            lib_log_utils.log_info(f"sync {number}", logger=logger)
+        assert time.perf_counter() - start < 1
+
+        alog_task = asyncio.ensure_future(log_asyncio.alog_info("waits for space", logger=logger))
+        flush_task = asyncio.ensure_future(log_asyncio.flush(logger))
+        await asyncio.sleep(0.1)
+        assert not alog_task.done()
+        assert not flush_task.done()
+        blocking_handler.released.set()
+        await asyncio.wait_for(asyncio.gather(alog_task, flush_task), 10)
+
+    try:
+        asyncio.run(main())
+    finally:
+        log_asyncio.remove_asyncio_handlers(logger)
+        logger.removeHandler(blocking_handler)
+    # the writer blocks in the first record, two records wait in the queue - the others are dropped and reported
+    assert blocking_handler.messages == ["first", "dropped 8 log records, the log queue was full", "sync 0", "sync 1", "waits for space"]
+
+
+def test_event_loop_is_not_blocked() -> None:
+    logger = logging.getLogger("test_asyncio_logging_latency")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    class SlowHandler(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            time.sleep(0.02)
+
+    slow_handler = SlowHandler()
+    logger.addHandler(slow_handler)
+    log_asyncio.set_asyncio_handlers(logger)
+
+    async def main() -> float:
+        start = time.perf_counter()
+        for number in range(20):
+            await log_asyncio.alog_info(f"record {number}", logger=logger)
+        duration = time.perf_counter() - start
+        await log_asyncio.flush(logger)
+        return duration
+
+    try:
+        # 20 records with 20 ms each would block the loop for 400 ms
+        assert asyncio.run(main()) < 0.2
+    finally:
+        log_asyncio.remove_asyncio_handlers(logger)
+        logger.removeHandler(slow_handler)
+
+
+def test_without_asyncio_handlers() -> None:
+    logger = logging.getLogger("test_asyncio_logging_without_handlers")
+    logger.propagate = False
+    stream = io.StringIO()
+    handler = log_handlers.set_stream_handler(logger, stream=stream, fmt="%(message)s")  # type: ignore
+
+    async def main() -> None:
+        await log_asyncio.alog_warning("logged directly", logger=logger)
+        await log_asyncio.flush(logger)
+
+    asyncio.run(main())
+    logger.removeHandler(handler)
+    assert stream.getvalue() == "logged directly\n"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_fork(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "fork.log"
+    logger = logging.getLogger("test_asyncio_logging_fork")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = log_handlers.set_file_handler(str(log_file), logger=logger, fmt="%(message)s")
+    log_asyncio.set_asyncio_handlers(logger)
+    try:
+        lib_log_utils.log_info("parent", logger=logger)
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            asyncio.run(log_asyncio.alog_info("child", logger=logger))
+            asyncio.run(log_asyncio.flush(logger))
+            os._exit(0 if "child" in log_file.read_text() else 1)
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+    finally:
+        log_asyncio.remove_asyncio_handlers(logger)
+        logger.removeHandler(handler)
+        handler.close()
+    assert sorted(log_file.read_text().splitlines()) == ["child", "parent"]
@@ -0,0 +1,180 @@
+# STDLIB
+import enum
+import io
+import logging
+import os
+import pathlib
+import subprocess
+import sys
+from typing import Any, List
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_binary
+from lib_log_utils import log_handlers
+from lib_log_utils import log_identity
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent
+path_cli_command = path_repository / "lib_log_utils" / "lib_log_utils_cli.py"
+
+
+def make_record(**kwargs: Any) -> logging.LogRecord:
+    return logging.makeLogRecord(dict(dict(name="test_binary_log", levelno=logging.INFO, levelname="INFO"), **kwargs))
+
+
+def write_binary_log(log_file: pathlib.Path, records: List[logging.LogRecord], **kwargs: Any) -> None:
+    handler = log_handlers.BinaryFileHandler(str(log_file), **kwargs)
+    for record in records:
+        handler.handle(record)
+    handler.close()
+
+
+def test_roundtrip(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "roundtrip.llb"
+    logger = logging.getLogger("test_binary_log_roundtrip")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = log_handlers.set_binary_file_handler(str(log_file), logger=logger, level=logging.DEBUG)
+    for number in range(1000):
+        logger.debug("item %d of %s", number, "spam")
+    logger.warning("späm \udcff")
+    logger.error("x" * 1000)
+    logger.removeHandler(handler)
+    handler.close()
+
+    records = list(log_binary.read_binary_log(str(log_file)))
+    assert [record.getMessage() for record in records] == [f"item {number} of spam" for number in range(1000)] + ["späm \udcff", "x" * 1000]
+    assert {record.name for record in records} == {"test_binary_log_roundtrip"}
+    assert [record.levelname for record in records[-3:]] == ["DEBUG", "WARNING", "ERROR"]
+    identity = log_identity.get_identity()
+    assert records[0].process == os.getpid()
+    assert records[0].username == identity["username"]  # type: ignore
+    assert records[0].programname == identity["program_name"]  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "msg, args",
+    [
+        ("%s %r %d %.3f %s %s", (None, True, -(2**70), 0.1, "späm", b"ham")),
+        ("%(spam)s %(ham)d", {"spam": [1, 2], "ham": 3}),
+        ("100%", ()),
+    ],
+)
+def test_args(tmp_path: pathlib.Path, msg: str, args: Any) -> None:
+    log_file = tmp_path / "args.llb"
+    record = make_record(msg=msg, args=args)
+    write_binary_log(log_file, [record])
+    (decoded,) = log_binary.read_binary_log(str(log_file))
+    assert decoded.msg == msg
+    assert decoded.getMessage() == record.getMessage()
+
+
+def test_unsupported_args_are_formatted(tmp_path: pathlib.Path) -> None:
+    class Spam(object):
+        def __str__(self) -> str:
+            return "spam"
+
+    class Color(enum.IntEnum):
+        RED = 1
+
+    # subclasses of the builtin types may be formatted differently, they are not marshalled
+    log_file = tmp_path / "unsupported.llb"
+    records = [
+        make_record(msg="object %s", args=(Spam(),)),
+        make_record(msg="subclass %s %d", args=(Color.RED, 2)),
+        make_record(msg="nested %s", args=([1, Spam()],)),
+        make_record(msg=Spam()),
+    ]
+    write_binary_log(log_file, records)
+    assert [record.getMessage() for record in log_binary.read_binary_log(str(log_file))] == [record.getMessage() for record in records]
+
+
+def test_exception(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "exception.llb"
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        record = make_record(msg="failed", exc_info=sys.exc_info())
+    write_binary_log(log_file, [record])
+    stream = io.StringIO()
+    assert log_handlers.decode_binary_log(str(log_file), stream=stream, fmt="%(message)s") == 1
+    assert stream.getvalue().startswith("failed\nTraceback (most recent call last):")
+    assert stream.getvalue().endswith("ZeroDivisionError: division by zero\n")
+
+
+def test_truncated_file(tmp_path: pathlib.Path) -> None:
+    # the last frame of a killed process may be cut off
+    log_file = tmp_path / "truncated.llb"
+    write_binary_log(log_file, [make_record(msg=f"record {number}") for number in range(3)])
+    data = log_file.read_bytes()
+    log_file.write_bytes(data[:-1])
+    assert [record.getMessage() for record in log_binary.read_binary_log(str(log_file))] == ["record 0", "record 1"]
+
+
+def test_not_a_binary_log(tmp_path: pathlib.Path) -> None:
+    for data in (b"", b"some text log\n"):
+        other_file = tmp_path / "other.log"
+        other_file.write_bytes(data)
+        with pytest.raises(ValueError, match="not a binary log file"):
+            list(log_binary.read_binary_log(str(other_file)))
+
+
+def test_sessions_are_appended(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "sessions.llb"
+    write_binary_log(log_file, [make_record(name="first", msg="first run")])
+    write_binary_log(log_file, [make_record(name="second", msg="second run")])
+    assert [(record.name, record.getMessage()) for record in log_binary.read_binary_log(str(log_file))] == [("first", "first run"), ("second", "second run")]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_fork(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "fork.llb"
+    handler = log_handlers.BinaryFileHandler(str(log_file))
+    handler.handle(make_record(msg="parent"))
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        handler.handle(make_record(msg="child"))
+        handler.close()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    handler.handle(make_record(msg="parent again"))
+    handler.close()
+    assert [record.getMessage() for record in log_binary.read_binary_log(str(log_file))] == ["parent", "parent again"]
+    assert [record.getMessage() for record in log_binary.read_binary_log(f"{log_file}.{pid}")] == ["child"]
+
+
+def test_smaller_than_text_log(tmp_path: pathlib.Path) -> None:
+    text_file = tmp_path / "text.log"
+    binary_file = tmp_path / "binary.llb"
+    logger = logging.getLogger("test_binary_log_size")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handlers = [
+        log_handlers.set_file_handler(str(text_file), logger=logger, level=logging.DEBUG),
+        log_handlers.set_binary_file_handler(str(binary_file), logger=logger, level=logging.DEBUG),
+    ]
+    for number in range(1000):
+        logger.debug("processing item %d of %d: %s", number, 1000, "ok")
+    for handler in handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    assert binary_file.stat().st_size * 3 < text_file.stat().st_size
+
+
+def test_cli_decode(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "cli.llb"
+    write_binary_log(log_file, [make_record(msg="decoded %s", args=("spam",), levelno=logging.WARNING, levelname="WARNING")])
+    env = dict(os.environ)
+    env.pop("LOG_UTIL_FMT", None)
+    result = subprocess.run([sys.executable, str(path_cli_command), "decode", "--no-color", str(log_file)], capture_output=True, text=True, env=env, check=True)
+    assert result.stdout == "decoded spam\n"
+    result = subprocess.run([sys.executable, str(path_cli_command), "decode", "-e", str(log_file)], capture_output=True, text=True, env=env, check=True)
+    identity = log_identity.get_identity()
+    assert result.stdout.startswith(f"[{identity['username']}@{identity['hostname_short']}][{identity['program_name']}@{os.getpid()}][")
+    assert result.stdout.endswith("][WARNING ]: decoded spam\n")
+    # without a path, "decode" is the message
+    result = subprocess.run([sys.executable, str(path_cli_command), "decode", "-l", "error"], capture_output=True, text=True, env=env, check=True)
+    assert result.stdout == ""
+    assert "decode" in result.stderr
@@ -0,0 +1,131 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import time
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_handlers
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent
+
+
+def test_buffered_file_handler_flush_interval(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "interval.log"
+    logger = logging.getLogger("test_buffered_file_handler_flush_interval")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = log_handlers.set_file_handler(str(log_file), logger=logger, fmt="%(message)s", buffer_size=1024 * 1024, flush_interval=0.05)
+    try:
+        assert isinstance(handler, log_handlers.BufferedFileHandler)
+        logger.info("flushed by the interval")
+        deadline = time.monotonic() + 5
+        while not (log_file.exists() and log_file.read_text()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert log_file.read_text() == "flushed by the interval\n"
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_buffered_file_handler_buffer_size(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "size.log"
+    handler = log_handlers.BufferedFileHandler(str(log_file), buffer_size=100, flush_interval=0)
+    try:
+        for _ in range(9):
+            handler.emit(logging.makeLogRecord(dict(msg="x" * 9, levelno=logging.INFO)))
+        assert not log_file.exists()
+        handler.emit(logging.makeLogRecord(dict(msg="x" * 9, levelno=logging.INFO)))
+        assert log_file.read_text() == ("x" * 9 + "\n") * 10
+    finally:
+        handler.close()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_buffered_file_handler_sigterm(tmp_path: pathlib.Path) -> None:
+    log_file = tmp_path / "sigterm.log"
+    script = (
+        "import logging, os, signal, sys\n"
+        f"sys.path.insert(0, {str(path_repository)!r})\n"
+        "from lib_log_utils import log_handlers\n"
+        "logger = logging.getLogger()\n"
+        "logger.setLevel(logging.INFO)\n"
+        f"log_handlers.set_file_handler({str(log_file)!r}, logger=logger, fmt='%(message)s', buffer_size=1024 * 1024, flush_interval=3600,\n"
+        "    flush_on_sigterm=True)\n"
+        "for n in range(1000):\n"
+        "    logger.info('record %d', n)\n"
+        "os.kill(os.getpid(), signal.SIGTERM)\n"
+        "logger.info('not reached')\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, env=dict(os.environ))
+    assert result.returncode == -signal.SIGTERM, result.stderr
+    assert log_file.read_text().splitlines() == [f"record {n}" for n in range(1000)]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_buffered_file_handler_keeps_sigterm_handler(tmp_path: pathlib.Path) -> None:
+    # the SIGTERM handler of the application is only changed with flush_on_sigterm=True
+    script = (
+        "import logging, signal, sys\n"
+        f"sys.path.insert(0, {str(path_repository)!r})\n"
+        "from lib_log_utils import log_handlers\n"
+        f"log_handlers.set_file_handler({str(tmp_path / 'default.log')!r}, logger=logging.getLogger(), buffer_size=1024)\n"
+        f"log_handlers.set_file_handler({str(tmp_path / 'rotating.log')!r}, logger=logging.getLogger(), max_bytes=1024)\n"
+        f"log_handlers.set_binary_file_handler({str(tmp_path / 'binary.llb')!r}, logger=logging.getLogger())\n"
+        "assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, env=dict(os.environ))
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_buffered_file_handler_sigterm_in_emit(tmp_path: pathlib.Path) -> None:
+    # the signal arrives while the main thread formats a record, with the handler lock held - the flush is deferred until emit is done
+    log_file = tmp_path / "sigterm_in_emit.log"
+    script = (
+        "import logging, os, signal, sys\n"
+        f"sys.path.insert(0, {str(path_repository)!r})\n"
+        "from lib_log_utils import log_handlers\n"
+        "def previous_handler(signum, frame):\n"
+        "    sys.exit(3)\n"
+        "signal.signal(signal.SIGTERM, previous_handler)\n"
+        "class KillingFormatter(logging.Formatter):\n"
+        "    def format(self, record):\n"
+        "        if record.getMessage() == 'record 500':\n"
+        "            os.kill(os.getpid(), signal.SIGTERM)\n"
+        "        return super().format(record)\n"
+        "logger = logging.getLogger()\n"
+        "logger.setLevel(logging.INFO)\n"
+        f"handler = log_handlers.set_file_handler({str(log_file)!r}, logger=logger, fmt='%(message)s', buffer_size=1024 * 1024, flush_interval=3600,\n"
+        "    flush_on_sigterm=True)\n"
+        "handler.setFormatter(KillingFormatter('%(message)s'))\n"
+        "for n in range(1000):\n"
+        "    logger.info('record %d', n)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, env=dict(os.environ))
+    assert result.returncode == 3, result.stderr
+    assert log_file.read_text().splitlines() == [f"record {n}" for n in range(501)]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+@pytest.mark.parametrize("handler_class", [log_handlers.BufferedFileHandler, log_handlers.RotatingFileHandler])
+def test_buffered_file_handler_fork(tmp_path: pathlib.Path, handler_class: type) -> None:
+    # the child must not write the records which the parent buffered before the fork
+    log_file = tmp_path / "fork.log"
+    handler = handler_class(str(log_file), buffer_size=1024 * 1024, flush_interval=0)
+    handler.emit(logging.makeLogRecord(dict(msg="parent", levelno=logging.INFO)))
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        handler.emit(logging.makeLogRecord(dict(msg="child", levelno=logging.INFO)))
+        handler.close()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    handler.emit(logging.makeLogRecord(dict(msg="parent again", levelno=logging.INFO)))
+    handler.close()
+    assert sorted(log_file.read_text().splitlines()) == ["child", "parent", "parent again"]
@@ -33,3 +33,16 @@ def test_cli_commands() -> None:
     assert call_cli_command('"log default level"')
     assert call_cli_command('-l error "log default level"')
     assert call_cli_command('"log default level" -l error')
+
+
+def test_cli_main_is_a_click_command() -> None:
+    # cli_main is still the click command of log_util, built on first access - the entry point of log_util is main
+    import click
+    from click.testing import CliRunner
+
+    from lib_log_utils import lib_log_utils_cli
+
+    assert isinstance(lib_log_utils_cli.cli_main, click.Command)
+    result = CliRunner().invoke(lib_log_utils_cli.cli_main, ["--version"])
+    assert result.exit_code == 0
+    assert "version" in result.output.lower()
@@ -0,0 +1,44 @@
+# STDLIB
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+package_dir = "lib_log_utils"
+cli_filename = "lib_log_utils_cli.py"
+
+path_cli_command = pathlib.Path(__file__).resolve().parent.parent / package_dir / cli_filename
+
+
+def call_cli_stdin(commandline_args: str, stdin: bytes) -> str:
+    """calls log_util with the given stdin, returns stderr - stdout is not used by log_util"""
+    env = os.environ.copy()
+    env["LOG_UTIL_WIDTH"] = "140"
+    command = " ".join([sys.executable, str(path_cli_command), commandline_args])
+    result = subprocess.run(command, shell=True, check=True, input=stdin, capture_output=True, env=env)
+    return result.stderr.decode("utf-8")
+
+
+def test_cli_stdin() -> None:
+    output = call_cli_stdin("--stdin --plain --nowrap", b"line1\nline2\n")
+    assert output.splitlines() == ["line1", "line2"]
+
+
+def test_cli_stdin_null_level_prefix_banner_marker() -> None:
+    output = call_cli_stdin("--stdin --plain --nowrap -l warning -0 --level-prefix --banner-marker=###", b"ERROR: line1\x00### banner\x00Note: no level\x00")
+    assert "ERROR" not in output
+    assert "line1" in output
+    assert "* banner" in output
+    assert "Note: no level" in output
+
+
+def test_cli_stdin_throughput() -> None:
+    # about 8 MB of build output, logged by one process
+    n_lines = 100000
+    stdin = b"".join(b"compiling module %06d ......................................................................\n" % n for n in range(n_lines))
+    start = time.perf_counter()
+    output = call_cli_stdin("--stdin --plain --nowrap", stdin)
+    duration = time.perf_counter() - start
+    assert len(output.splitlines()) == n_lines
+    print(f"logged {len(stdin) / 1e6:.1f} MB, {n_lines} lines from stdin in {duration:.2f} s = {n_lines / duration:.0f} lines/s")
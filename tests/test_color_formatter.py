@@ -0,0 +1,64 @@
+# STDLIB
+import io
+import logging
+from typing import Any, Dict, List
+
+# EXT
+import pytest
+
+# OWN
+import lib_log_utils
+from lib_log_utils import log_handlers
+
+fmts = [
+    "[%(asctime)s][%(levelname)-8s][%(name)s]: %(message)s",
+    "%(levelname)s %(message)s | %(hostname)s %(programname)s %(username)s",
+    log_handlers.default_fmt,
+]
+field_styles: Dict[str, Dict[str, Any]] = {"asctime": {"color": "green"}, "levelname": {"color": "yellow", "bold": True}, "message": {"underline": True}}
+level_styles: Dict[str, Dict[str, Any]] = {"debug": {"color": 22}, "info": {}, "warn": {"color": "red", "bright": True}, "error": {"background": "red"}}
+
+
+def set_created(record: logging.LogRecord) -> bool:
+    record.created = 1700000000.0
+    return True
+
+
+def log_messages(native: bool, fmt: str, single_record: bool) -> List[str]:
+    logger = logging.getLogger("test_color_formatter")
+    logger.propagate = False
+    logger.setLevel(1)
+    stream = io.StringIO()
+    handler = log_handlers.set_stream_handler_color(
+        logger, stream=stream, level=1, fmt=fmt, field_styles=field_styles, level_styles=level_styles, native=native  # type: ignore
+    )
+    # the same timestamp for both formatters
+    handler.addFilter(set_created)
+    try:
+        for level in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL, 5):
+            logger.log(level, "message with %s and %d%%", "args", 100)
+            logger.log(level, "line1\nline2")
+            lib_log_utils.log_level("a banner with some words", level, width=20, banner=True, logger=logger, single_record=single_record)
+        try:
+            raise RuntimeError("test")
+        except RuntimeError:
+            logger.exception("an exception")
+    finally:
+        logger.removeHandler(handler)
+    return stream.getvalue().splitlines()
+
+
+@pytest.mark.parametrize("fmt", fmts)
+@pytest.mark.parametrize("single_record", [True, False])
+def test_color_formatter_conformance(fmt: str, single_record: bool) -> None:
+    assert log_messages(native=True, fmt=fmt, single_record=single_record) == log_messages(native=False, fmt=fmt, single_record=single_record)
+
+
+def test_color_formatter_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("COLOREDLOGS_LOG_FORMAT", "%(levelname)s|%(message)s")
+    monkeypatch.setenv("COLOREDLOGS_LEVEL_STYLES", "info=blue,bold;error=background=green")
+    monkeypatch.setenv("COLOREDLOGS_FIELD_STYLES", "levelname=magenta")
+    native = log_messages(native=True, fmt=fmts[0], single_record=False)
+    assert native[0] == "\x1b[35mDEBUG|message with args and 100%\x1b[0m"
+    assert native[7] == "\x1b[35mINFO|\x1b[1;34mmessage with args and 100%\x1b[0m\x1b[0m"
+    assert native == log_messages(native=False, fmt=fmts[0], single_record=False)
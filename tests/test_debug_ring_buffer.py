@@ -0,0 +1,133 @@
+# STDLIB
+import io
+import logging
+from typing import Iterator, Tuple
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_handlers
+from lib_log_utils import log_traceback
+
+
+@pytest.fixture
+def logger_and_stream() -> Iterator[Tuple[logging.Logger, io.StringIO]]:
+    logger = logging.getLogger("test_debug_ring_buffer")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    stream = io.StringIO()
+    stream_handler = log_handlers.set_stream_handler(logger, stream=stream, level=logging.NOTSET, fmt="[%(levelname)s] %(message)s")  # type: ignore
+    yield logger, stream
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    stream_handler.close()
+
+
+class CountingMessage(object):
+    """counts how often the message is formatted"""
+
+    n_formatted = 0
+
+    def __str__(self) -> str:
+        CountingMessage.n_formatted += 1
+        return "lazy"
+
+
+def test_debug_ring_buffer_is_formatted_only_on_dump(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_debug_ring_buffer_handler(logger)
+    CountingMessage.n_formatted = 0
+    for _ in range(10):
+        logger.debug(CountingMessage())
+    # the stream handler had level NOTSET, it was raised to the threshold
+    assert stream.getvalue() == ""
+    assert CountingMessage.n_formatted == 0
+    logger.error("failed")
+    assert stream.getvalue().splitlines() == ["[DEBUG] lazy"] * 10 + ["[ERROR] failed"]
+
+
+def test_debug_ring_buffer_limits(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    handler = log_handlers.set_debug_ring_buffer_handler(logger, capacity=100, max_bytes=3 * (log_handlers.DebugRingBufferHandler.record_overhead + 100))
+    for number in range(10):
+        logger.log(5, f"{number:<100}")
+    logger.critical("failed")
+    assert [line.strip() for line in stream.getvalue().splitlines()] == ["[SPAM] 7", "[SPAM] 8", "[SPAM] 9", "[CRITICAL] failed"]
+    assert len(handler._records) == 0
+
+
+def test_debug_ring_buffer_log_exception_traceback(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_debug_ring_buffer_handler(logger)
+    logger.debug("context")
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        # logs to the root logger - the context of our logger is dumped anyway
+        log_traceback.log_exception_traceback("failed", log_level=logging.NOTSET, log_level_exec_info=logging.NOTSET)
+    assert stream.getvalue() == "[DEBUG] context\n"
+
+
+def test_debug_ring_buffer_child_logger(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_debug_ring_buffer_handler(logger)
+    child_logger = logging.getLogger("test_debug_ring_buffer.child")
+    child_logger.debug("child context")
+    child_logger.info("child info")
+    assert stream.getvalue() == "[INFO] child info\n"
+    child_logger.error("child error")
+    assert stream.getvalue().splitlines() == ["[INFO] child info", "[DEBUG] child context", "[ERROR] child error"]
+
+
+def test_debug_ring_buffer_child_logger_with_own_handler(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    # the child inherits the lowered level of the logger - its own handler must not write the captured records
+    logger, stream = logger_and_stream
+    child_logger = logging.getLogger("test_debug_ring_buffer.child_with_handler")
+    child_stream = io.StringIO()
+    child_handler = log_handlers.set_stream_handler(child_logger, stream=child_stream, level=logging.NOTSET, fmt="[%(levelname)s] %(message)s")  # type: ignore
+    try:
+        log_handlers.set_debug_ring_buffer_handler(logger)
+        child_logger.debug("child context")
+        child_logger.info("child info")
+        assert child_stream.getvalue() == "[INFO] child info\n"
+        child_logger.error("child error")
+        assert child_stream.getvalue() == "[INFO] child info\n[ERROR] child error\n"
+        assert stream.getvalue().splitlines() == ["[INFO] child info", "[DEBUG] child context", "[ERROR] child error"]
+    finally:
+        child_logger.removeHandler(child_handler)
+
+
+def test_debug_ring_buffer_propagates_to_root_handler() -> None:
+    # the common setup : a named logger which propagates to the handler of the root logger
+    root_logger = logging.getLogger()
+    root_level = root_logger.level
+    root_logger.setLevel(logging.WARNING)
+    root_stream = io.StringIO()
+    root_handler = logging.StreamHandler(root_stream)
+    root_handler.setFormatter(logging.Formatter("[%(name)s][%(levelname)s] %(message)s"))
+    root_logger.addHandler(root_handler)
+    logger = logging.getLogger("test_debug_ring_buffer_propagate")
+    try:
+        handler = log_handlers.set_debug_ring_buffer_handler(logger)
+        assert handler.threshold == logging.WARNING
+        logger.debug("captured debug")
+        logger.info("captured info")
+        logging.getLogger("test_debug_ring_buffer_propagate.child").debug("captured child debug")
+        # other loggers are not affected
+        logging.getLogger("test_debug_ring_buffer_other").warning("other warning")
+        logging.getLogger("test_debug_ring_buffer_other").info("other info")
+        assert root_stream.getvalue() == "[test_debug_ring_buffer_other][WARNING] other warning\n"
+        logger.error("failed")
+        assert root_stream.getvalue().splitlines() == [
+            "[test_debug_ring_buffer_other][WARNING] other warning",
+            "[test_debug_ring_buffer_propagate][DEBUG] captured debug",
+            "[test_debug_ring_buffer_propagate][INFO] captured info",
+            "[test_debug_ring_buffer_propagate.child][DEBUG] captured child debug",
+            "[test_debug_ring_buffer_propagate][ERROR] failed",
+        ]
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+        root_logger.removeHandler(root_handler)
+        root_logger.setLevel(root_level)
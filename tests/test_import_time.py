@@ -0,0 +1,49 @@
+# STDLIB
+import os
+import pathlib
+import subprocess
+import sys
+from typing import Set, Tuple
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent
+
+# the maximum cumulative import time of "import lib_log_utils" in milliseconds, can be overridden for slow test machines.
+# the import takes about 80 ms, coloredlogs and click would add about 60 ms
+import_budget_ms = float(os.environ.get("LIB_LOG_UTILS_IMPORT_BUDGET_MS", "120"))
+
+# those are only imported when they are needed - for the colored stream handler, the colortest, the commandline
+# and the identity fields of the extended log format
+lazy_imported_modules = {"coloredlogs", "humanfriendly", "cli_exit_tools", "click", "lib_platform", "lib_programname"}
+
+
+def get_import_time(module_name: str) -> Tuple[float, Set[str]]:
+    """returns the cumulative import time in milliseconds and the names of all imported modules, measured with python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"], check=True, capture_output=True, text=True, cwd=str(path_repository)
+    )
+    import_time_ms = 0.0
+    imported_modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        imported_modules.add(name.strip())
+        if name.strip() == module_name:
+            import_time_ms = int(cumulative) / 1000
+    return import_time_ms, imported_modules
+
+
+def test_import_does_not_import_lazy_modules() -> None:
+    _, imported_modules = get_import_time("lib_log_utils")
+    assert not imported_modules & lazy_imported_modules
+    # the module of the commandline as well - its click command cli_main is built on first access
+    _, imported_modules = get_import_time("lib_log_utils.lib_log_utils_cli")
+    assert not imported_modules & lazy_imported_modules
+
+
+def test_import_time_budget() -> None:
+    # best of 3, to be robust against a busy test machine
+    import_time_ms = min(get_import_time("lib_log_utils")[0] for _ in range(3))
+    assert 0 < import_time_ms < import_budget_ms, f"import lib_log_utils took {import_time_ms:.1f} ms, the budget is {import_budget_ms:.1f} ms"
@@ -0,0 +1,108 @@
+# STDLIB
+import io
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+# EXT
+import pytest
+
+# OWN
+import lib_log_utils
+from lib_log_utils import log_handlers
+from lib_log_utils import log_identity
+
+
+@pytest.fixture
+def logger_and_stream() -> Iterator[Tuple[logging.Logger, io.StringIO]]:
+    logger = logging.getLogger("test_json_handler")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    stream = io.StringIO()
+    handler = log_handlers.set_json_stream_handler(logger, stream=stream, level=logging.NOTSET)  # type: ignore
+    yield logger, stream
+    logger.removeHandler(handler)
+
+
+def get_json_lines(stream: io.StringIO) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    logger.warning('say "%s"\tand \\ %s', "ham", "späm")
+    identity = log_identity.get_identity()
+    (json_line,) = get_json_lines(stream)
+    assert json_line["message"] == 'say "ham"\tand \\ späm'
+    assert json_line["level"] == "WARNING"
+    assert json_line["user"] == identity["username"]
+    assert json_line["hostname"] == identity["hostname_short"]
+    assert json_line["program"] == identity["program_name"]
+    assert json_line["pid"] == int(identity["pid"])
+
+
+def test_multi_line_messages_are_one_object(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    lib_log_utils.log_error("this is\none nice piece of ham", width=10, logger=logger)
+    lib_log_utils.banner_error("spam", width=10, logger=logger)
+    lib_log_utils.log_error(lambda: "lazy\nmessage", logger=logger)
+    assert [json_line["message"] for json_line in get_json_lines(stream)] == [
+        "this is\none nice\npiece of\nham",
+        "**********\n* spam   *\n**********",
+        "lazy\nmessage",
+    ]
+
+
+def test_other_loggers_are_not_affected(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    # a logger without a JsonFormatter still gets one record per line, while a JsonFormatter exists elsewhere
+    other_logger = logging.getLogger("test_json_handler_other")
+    other_logger.propagate = False
+    other_logger.setLevel(logging.INFO)
+    other_stream = io.StringIO()
+    other_handler = logging.StreamHandler(other_stream)
+    other_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    other_logger.addHandler(other_handler)
+    try:
+        lib_log_utils.log_error("first\nsecond", logger=other_logger)
+    finally:
+        other_logger.removeHandler(other_handler)
+    assert other_stream.getvalue() == "[ERROR] first\n[ERROR] second\n"
+
+
+def test_exception(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("failed")
+    (json_line,) = get_json_lines(stream)
+    assert json_line["message"] == "failed"
+    assert json_line["exception"].startswith("Traceback (most recent call last):")
+    assert json_line["exception"].endswith("ZeroDivisionError: division by zero")
+
+
+def test_pid_after_fork() -> None:
+    formatter = log_handlers.JsonFormatter()
+    for pid in (1, 2, 1):
+        record = logging.makeLogRecord(dict(msg="test", levelname="INFO", process=pid))
+        assert json.loads(formatter.format(record))["pid"] == pid
+
+
+def test_time() -> None:
+    formatter = log_handlers.JsonFormatter(datefmt="%Y-%m-%d %H:%M:%S,%f")
+    for created in (1700000000.001, 1700000000.999, 1700000001.5):
+        record = logging.makeLogRecord(dict(msg="test", levelname="INFO", created=created, msecs=(created - int(created)) * 1000))
+        expected = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created)) + ",%03d" % record.msecs
+        assert json.loads(formatter.format(record))["time"] == expected
+
+
+def test_stdlib_encoder(monkeypatch: pytest.MonkeyPatch) -> None:
+    # without orjson, the json module of the standard library is used
+    monkeypatch.setitem(sys.modules, "orjson", None)  # type: ignore
+    encode_string = log_handlers.get_json_string_encoder()
+    assert encode_string is json.encoder.encode_basestring  # type: ignore
+    formatter = log_handlers.JsonFormatter()
+    record = logging.makeLogRecord(dict(msg='"späm"\n', levelname="INFO"))
+    assert json.loads(formatter.format(record))["message"] == '"späm"\n'
@@ -0,0 +1,87 @@
+# STDLIB
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Iterator, Tuple
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_daemon
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent
+path_cli_command = path_repository / "lib_log_utils" / "lib_log_utils_cli.py"
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX") or not hasattr(socket, "SCM_RIGHTS"), reason="needs unix domain sockets")
+
+
+@pytest.fixture
+def daemon(tmp_path: pathlib.Path) -> Iterator[Tuple[Dict[str, str], pathlib.Path]]:
+    """starts log_util --serve, yields the environment for the clients and the stderr file of the daemon"""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("LOG_UTIL_") and not key.startswith("COLOREDLOGS_")}
+    env["XDG_RUNTIME_DIR"] = str(tmp_path)
+    daemon_stderr = tmp_path / "daemon_stderr.txt"
+    with open(daemon_stderr, "wb") as daemon_stderr_file:
+        process = subprocess.Popen([sys.executable, str(path_cli_command), "--serve"], stderr=daemon_stderr_file, env=env)
+    socket_path = str(tmp_path / f"log_util-{os.getuid()}" / "log_util.sock")
+    try:
+        deadline = time.monotonic() + 30
+        while not log_daemon.is_daemon_running(socket_path):
+            assert process.poll() is None, daemon_stderr.read_text()
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        yield env, daemon_stderr
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def run_client(env: Dict[str, str], *args: str) -> str:
+    """runs a client, returns its stderr - written to a file, like the stderr of the daemon"""
+    client_code = "import sys; from lib_log_utils import log_daemon; sys.exit(0 if log_daemon.send(*sys.argv[1:]) else 1)"
+    result = subprocess.run([sys.executable, "-c", client_code, *args], cwd=str(path_repository), capture_output=True, text=True, env=env)
+    assert result.returncode == 0, "the message was not logged by the daemon"
+    return result.stderr
+
+
+def test_message_is_written_to_client_stderr(daemon: Tuple[Dict[str, str], pathlib.Path]) -> None:
+    env, daemon_stderr = daemon
+    assert "first message" in run_client(env, "first message", "warning")
+    assert "second message" in run_client(env, "second message", "error")
+    assert "message" not in daemon_stderr.read_text()
+    socket_dir = pathlib.Path(env["XDG_RUNTIME_DIR"]) / f"log_util-{os.getuid()}"
+    assert socket_dir.stat().st_mode & 0o777 == 0o700
+
+
+def test_cli_round_trip(daemon: Tuple[Dict[str, str], pathlib.Path]) -> None:
+    env, daemon_stderr = daemon
+    result = subprocess.run([sys.executable, str(path_cli_command), "-l", "error", "from the cli"], capture_output=True, text=True, env=env, check=True)
+    assert "from the cli" in result.stderr
+    assert "from the cli" not in daemon_stderr.read_text()
+
+
+def test_stalled_client_does_not_block(daemon: Tuple[Dict[str, str], pathlib.Path]) -> None:
+    env, _ = daemon
+    socket_path = os.path.join(env["XDG_RUNTIME_DIR"], f"log_util-{os.getuid()}", "log_util.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled_socket:
+        stalled_socket.connect(socket_path)
+        stalled_socket.sendall(b'{"message": "never finish')
+        start = time.perf_counter()
+        assert "after the stalled client" in run_client(env, "after the stalled client")
+        assert time.perf_counter() - start < log_daemon.server_timeout + log_daemon.client_timeout
+
+
+def test_squatted_socket_dir_is_not_used(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("LOG_UTIL_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    socket_dir = pathlib.Path(log_daemon.get_socket_dir())
+    socket_dir.mkdir(mode=0o755)
+    socket_dir.chmod(0o755)
+    (socket_dir / "log_util.sock").touch()
+    assert not log_daemon.send("test")
+    with pytest.raises(RuntimeError, match="not a private directory"):
+        log_daemon.serve()
@@ -0,0 +1,45 @@
+# STDLIB
+import random
+import textwrap
+from typing import List
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_wrap
+
+# the building blocks of the random texts - words, long words, runs of spaces, tabs, hyphens, special whitespace,
+# unicode whitespace, ASCII separators which str.strip drops and non-ASCII characters
+text_parts = ["a", "ham", "spam", " ", "  ", "     ", "\t", "x" * 15, "y" * 70, "-", "--", "well-known", " - ", "\r", "\x0b", "\x1c"]
+text_parts += ["\xa0", "\u3000", "\u2009", "é", "ünïcode"]
+
+
+def get_texts(seed: int, n_texts: int = 1000) -> List[str]:
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(text_parts) for _ in range(rnd.randint(0, 40))) for _ in range(n_texts)]
+
+
+@pytest.mark.parametrize("width", [3, 8, 10, 17, 40, 138, 140])
+@pytest.mark.parametrize("indent", ["", "* "])
+def test_wrap_is_identical_to_textwrap(width: int, indent: str) -> None:
+    for text in get_texts(seed=width):
+        expected = textwrap.wrap(text, width=width, tabsize=4, replace_whitespace=False, initial_indent=indent, subsequent_indent=indent)
+        assert log_wrap.wrap(text, width=width, initial_indent=indent, subsequent_indent=indent) == expected, repr(text)
+
+
+def test_wrap_ascii_only_is_identical_to_textwrap() -> None:
+    # ASCII texts without hyphens are wrapped by log_wrap itself, not by textwrap
+    rnd = random.Random(4711)
+    for _ in range(5000):
+        text = "".join(rnd.choice(["a", "bb", "ccc", " ", "  ", "\t", "z" * 25]) for _ in range(rnd.randint(0, 60)))
+        width = rnd.randint(2, 30)
+        indent = rnd.choice(["", "* "])
+        subsequent_indent = rnd.choice(["", "* ", "    "])
+        expected = textwrap.wrap(text, width=width, tabsize=4, replace_whitespace=False, initial_indent=indent, subsequent_indent=subsequent_indent)
+        assert log_wrap.wrap(text, width=width, initial_indent=indent, subsequent_indent=subsequent_indent) == expected, repr(text)
+
+
+def test_wrap_invalid_width() -> None:
+    with pytest.raises(ValueError):
+        log_wrap.wrap("test", width=0)
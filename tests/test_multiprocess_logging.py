@@ -0,0 +1,99 @@
+# STDLIB
+import logging
+import multiprocessing
+import os
+import pathlib
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Tuple
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_handlers
+from lib_log_utils import log_multiprocess
+
+start_methods = [method for method in ("fork", "spawn") if method in multiprocessing.get_all_start_methods()]
+
+
+def log_records(task: int, n_records: int) -> int:
+    # runs in the worker processes
+    logger = logging.getLogger("test_multiprocess_logging.worker")
+    for number in range(n_records):
+        logger.info("task %d record %d %s", task, number, "x" * 40)
+    logger.debug("not logged, below the level of the parent")
+    return os.getpid()
+
+
+def log_exception(_: int) -> None:
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logging.getLogger("test_multiprocess_logging.worker").exception("failed in %s", "worker")
+
+
+@pytest.fixture
+def file_logger(tmp_path: pathlib.Path) -> Iterator[Tuple[logging.Logger, pathlib.Path]]:
+    log_file = tmp_path / "workers.log"
+    logger = logging.getLogger("test_multiprocess_logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = log_handlers.set_file_handler(str(log_file), logger=logger, fmt="%(process)d|%(name)s|%(levelname)s|%(message)s", buffer_size=1024 * 1024)
+    yield logger, log_file
+    logger.removeHandler(handler)
+    handler.close()
+
+
+@pytest.mark.parametrize("start_method", start_methods)
+def test_32_workers(file_logger: Tuple[logging.Logger, pathlib.Path], start_method: str) -> None:
+    logger, log_file = file_logger
+    n_tasks, n_records = 32, 500
+    context = multiprocessing.get_context(start_method)
+    start = time.perf_counter()
+    writer = log_multiprocess.start_process_log_writer(logger=logger, context=context)
+    with ProcessPoolExecutor(32, mp_context=context, initializer=log_multiprocess.init_worker, initargs=writer.initargs) as pool:
+        pids = set(pool.map(log_records, range(n_tasks), [n_records] * n_tasks))
+    writer.stop()
+    duration = time.perf_counter() - start
+    print(f"{start_method}: {n_tasks * n_records / duration:.0f} records per second with 32 workers")
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == n_tasks * n_records
+    # every line is complete, and the records of every task are in order
+    line_pattern = re.compile(r"(\d+)\|test_multiprocess_logging\.worker\|INFO\|task (\d+) record (\d+) x{40}")
+    next_record = [0] * n_tasks
+    for line in lines:
+        match = line_pattern.fullmatch(line)
+        assert match, line
+        assert int(match.group(1)) in pids
+        task, number = int(match.group(2)), int(match.group(3))
+        assert number == next_record[task]
+        next_record[task] += 1
+    assert os.getpid() not in pids
+
+
+@pytest.mark.parametrize("start_method", start_methods)
+def test_exception(file_logger: Tuple[logging.Logger, pathlib.Path], start_method: str) -> None:
+    logger, log_file = file_logger
+    context = multiprocessing.get_context(start_method)
+    writer = log_multiprocess.start_process_log_writer(logger=logger, context=context)
+    with ProcessPoolExecutor(1, mp_context=context, initializer=log_multiprocess.init_worker, initargs=writer.initargs) as pool:
+        list(pool.map(log_exception, [0]))
+    writer.stop()
+    text = log_file.read_text()
+    assert "|ERROR|failed in worker\nTraceback (most recent call last):" in text
+    assert text.endswith("ZeroDivisionError: division by zero\n")
+
+
+def test_parent_handlers_are_used(file_logger: Tuple[logging.Logger, pathlib.Path]) -> None:
+    # the writer passes the records to the handlers the logger has when the records arrive
+    logger, log_file = file_logger
+    writer = log_multiprocess.start_process_log_writer(logger=logger)
+    forwarding_handler = log_multiprocess.ForwardingHandler(writer.queue)
+    record = logging.makeLogRecord(dict(name="test", msg="from %s", args=("worker",), levelno=logging.WARNING, levelname="WARNING", process=4711))
+    forwarding_handler.handle(record)
+    writer.stop()
+    writer.stop()
+    assert log_file.read_text() == "4711|test|WARNING|from worker\n"
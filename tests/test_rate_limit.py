@@ -0,0 +1,179 @@
+# STDLIB
+import io
+import logging
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+import types
+from typing import Iterator, List, Tuple
+
+# EXT
+import pytest
+
+# OWN
+import lib_log_utils
+from lib_log_utils import log_handlers
+from lib_log_utils import log_rate_limit
+from lib_log_utils.log_config import log_settings
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def logger_and_stream() -> Iterator[Tuple[logging.Logger, io.StringIO]]:
+    logger = logging.getLogger("test_rate_limit")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    stream = io.StringIO()
+    yield logger, stream
+    log_settings.rate_limiter = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> List[float]:
+    """the monotonic clock of log_rate_limit stands still unless the test moves it - no token is refilled while the test logs"""
+    now = [time.monotonic()]
+    monkeypatch.setattr(log_rate_limit, "time", types.SimpleNamespace(monotonic=lambda: now[0], sleep=time.sleep))
+    return now
+
+
+def test_log_level_rate_limit_by_call_site(logger_and_stream: Tuple[logging.Logger, io.StringIO], clock: List[float]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_stream_handler(logger, stream=stream, level=logging.NOTSET, fmt="[%(levelname)s] %(message)s")  # type: ignore
+    log_settings.rate_limiter = log_rate_limit.RateLimiter(rate=20, burst=2)
+
+    def connect(number: int) -> None:
+        lib_log_utils.log_error(f"connection {number} failed", logger=logger)
+
+    for number in range(100):
+        connect(number)
+    # an other call site has its own bucket
+    lib_log_utils.log_error("other call site", logger=logger)
+    clock[0] += 0.1
+    connect(100)
+    lines = stream.getvalue().splitlines()
+    call_site = f"{__file__}:{connect.__code__.co_firstlineno + 1}"
+    assert lines == [
+        "[ERROR] connection 0 failed",
+        "[ERROR] connection 1 failed",
+        "[ERROR] other call site",
+        f"[ERROR] suppressed 98 similar messages ({call_site})",
+        "[ERROR] connection 100 failed",
+    ]
+
+
+def test_log_level_summary_is_periodic(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_stream_handler(logger, stream=stream, level=logging.NOTSET, fmt="%(message)s")  # type: ignore
+    log_settings.rate_limiter = log_rate_limit.RateLimiter(rate=50, burst=1, report_interval=0.01)
+    deadline = time.monotonic() + 0.3
+    n_logged = 0
+    while time.monotonic() < deadline:
+        lib_log_utils.log_error("flood", logger=logger)
+        n_logged += 1
+    # the last count of the flood is reported by the timer thread
+    deadline = time.monotonic() + 5
+    while log_settings.rate_limiter.suppressed() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    lines = stream.getvalue().splitlines()
+    summaries = [line for line in lines if line.startswith("suppressed ")]
+    # one record per 20 ms passes, and reports the records which were suppressed before
+    assert 3 <= len(summaries) <= 20
+    assert all(line.endswith(f"({__file__}:{test_log_level_summary_is_periodic.__code__.co_firstlineno + 7})") for line in summaries)
+    # nothing is left unreported - the last record of the flood may have passed itself
+    assert not log_settings.rate_limiter.suppressed()
+    n_passed = lines.count("flood")
+    n_suppressed = sum(int(line.split()[1]) for line in summaries)
+    assert n_passed + n_suppressed == n_logged
+
+
+def test_per_level_budgets(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_stream_handler(logger, stream=stream, level=logging.NOTSET, fmt="%(levelname)s")  # type: ignore
+    log_settings.rate_limiter = log_rate_limit.RateLimiter(rate=1, burst=5, budgets={logging.ERROR: (1, 1), logging.CRITICAL: None}, key_by="template")
+    for _ in range(10):
+        lib_log_utils.log_info("message", logger=logger)
+        lib_log_utils.log_error("message", logger=logger)
+        lib_log_utils.log_critical("message", logger=logger)
+    assert stream.getvalue().split().count("INFO") == 5
+    assert stream.getvalue().split().count("ERROR") == 1
+    assert stream.getvalue().split().count("CRITICAL") == 10
+
+
+def test_rate_limit_filter_on_handler(logger_and_stream: Tuple[logging.Logger, io.StringIO], clock: List[float]) -> None:
+    logger, stream = logger_and_stream
+    rate_limiter = log_rate_limit.RateLimiter(rate=1000, burst=3, key_by="template")
+    handler = log_handlers.set_stream_handler(
+        logger, stream=stream, level=logging.NOTSET, fmt="[%(levelname)s] %(message)s", rate_limiter=rate_limiter  # type: ignore
+    )
+    for number in range(10):
+        logger.warning("request %s failed", number)
+    clock[0] += 0.01
+    logger.warning("request %s failed", 10)
+    assert stream.getvalue().splitlines() == [
+        "[WARNING] request 0 failed",
+        "[WARNING] request 1 failed",
+        "[WARNING] request 2 failed",
+        "[WARNING] suppressed 7 similar messages ('request %s failed')",
+        "[WARNING] request 10 failed",
+    ]
+    assert any(isinstance(log_filter, log_rate_limit.RateLimitFilter) for log_filter in handler.filters)
+
+
+def test_rate_limit_filter_reports_last_count(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    rate_limiter = log_rate_limit.RateLimiter(rate=20, burst=1, key_by="template", report_interval=0.01)
+    log_handlers.set_stream_handler(logger, stream=stream, level=logging.NOTSET, fmt="[%(levelname)s] %(message)s", rate_limiter=rate_limiter)  # type: ignore
+    for number in range(5):
+        logger.warning("request %s failed", number)
+    deadline = time.monotonic() + 5
+    while rate_limiter.suppressed() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stream.getvalue().splitlines() == ["[WARNING] request 0 failed", "[WARNING] suppressed 4 similar messages ('request %s failed')"]
+
+
+def test_last_count_is_reported_at_exit(tmp_path: pathlib.Path) -> None:
+    script = (
+        "import logging, sys\n"
+        f"sys.path.insert(0, {str(path_repository)!r})\n"
+        "import lib_log_utils\n"
+        "from lib_log_utils import log_handlers, log_rate_limit\n"
+        "from lib_log_utils.log_config import log_settings\n"
+        "logger = logging.getLogger('flood')\n"
+        "logger.setLevel(logging.INFO)\n"
+        "log_handlers.set_stream_handler(logger, stream=sys.stdout, fmt='%(message)s')\n"
+        "log_settings.rate_limiter = log_rate_limit.RateLimiter(rate=0.001, burst=1, key_by='template', report_interval=0)\n"
+        "for _ in range(10):\n"
+        "    lib_log_utils.log_error('flood', logger=logger)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout == "flood\nsuppressed 9 similar messages ('flood')\n"
+
+
+def test_rate_limit_threads(logger_and_stream: Tuple[logging.Logger, io.StringIO]) -> None:
+    logger, stream = logger_and_stream
+    log_handlers.set_stream_handler(logger, stream=stream, level=logging.NOTSET, fmt="%(message)s")  # type: ignore
+    log_settings.rate_limiter = log_rate_limit.RateLimiter(rate=0.001, burst=10)
+
+    def flood() -> None:
+        for _ in range(1000):
+            lib_log_utils.log_error("flood", logger=logger)
+
+    threads = [threading.Thread(target=flood) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # without a lock, a few records more may pass - but the flood is stopped
+    assert 10 <= stream.getvalue().splitlines().count("flood") <= 20
+
+
+def test_max_keys() -> None:
+    rate_limiter = log_rate_limit.RateLimiter(rate=1, burst=1, key_by="template", max_keys=100)
+    for number in range(1000):
+        rate_limiter.check(logging.INFO, f"message {number}")
+    assert len(rate_limiter._levels[logging.INFO][1]) <= 100
@@ -0,0 +1,109 @@
+# STDLIB
+import logging
+import os
+import pathlib
+import random
+import signal
+import subprocess
+import sys
+from typing import List
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_handlers
+
+path_repository = pathlib.Path(__file__).resolve().parent.parent
+
+
+def expected_records(messages: List[str], capacity: int) -> List[str]:
+    """the newest messages which fit into the ring buffer, with 4 bytes frame length each"""
+    records: List[str] = []
+    used = 0
+    for message in reversed(messages):
+        frame_size = 4 + len(message.encode("utf-8"))
+        if used + frame_size > capacity:
+            break
+        records.insert(0, message)
+        used += frame_size
+    return records
+
+
+@pytest.mark.parametrize("size", [100, 257, 4096])
+def test_ring_buffer_handler_wraps_around(tmp_path: pathlib.Path, size: int) -> None:
+    rnd = random.Random(size)
+    ring_file = str(tmp_path / "flight.ring")
+    handler = log_handlers.MmapRingBufferHandler(ring_file, size=size)
+    messages: List[str] = []
+    try:
+        for number in range(500):
+            message = f"{number} " + "".join(rnd.choice("abcä€ ") for _ in range(rnd.randint(0, 40)))
+            handler.emit(logging.makeLogRecord(dict(msg=message)))
+            messages.append(message)
+            if number % 37 == 0:
+                assert log_handlers.read_ring_buffer(ring_file) == expected_records(messages, handler.capacity)
+    finally:
+        handler.close()
+    assert log_handlers.read_ring_buffer(ring_file) == expected_records(messages, size - 32)
+
+
+def test_ring_buffer_handler_continues_existing_file(tmp_path: pathlib.Path) -> None:
+    ring_file = str(tmp_path / "flight.ring")
+    for message in ("first run", "second run"):
+        handler = log_handlers.MmapRingBufferHandler(ring_file, size=1024)
+        handler.emit(logging.makeLogRecord(dict(msg=message)))
+        handler.close()
+    assert log_handlers.read_ring_buffer(ring_file) == ["first run", "second run"]
+    # another size starts a new ring buffer
+    handler = log_handlers.MmapRingBufferHandler(ring_file, size=2048)
+    handler.close()
+    assert log_handlers.read_ring_buffer(ring_file) == []
+
+
+def test_read_ring_buffer_rejects_other_files(tmp_path: pathlib.Path) -> None:
+    other_file = tmp_path / "other.log"
+    other_file.write_text("this is not a ring buffer, but a long enough text file")
+    with pytest.raises(ValueError, match="is not a ring buffer"):
+        log_handlers.read_ring_buffer(str(other_file))
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_ring_buffer_handler_survives_sigkill(tmp_path: pathlib.Path) -> None:
+    ring_file = str(tmp_path / "flight.ring")
+    script = (
+        "import logging, os, signal, sys\n"
+        f"sys.path.insert(0, {str(path_repository)!r})\n"
+        "from lib_log_utils import log_handlers\n"
+        "logger = logging.getLogger()\n"
+        "logger.setLevel(logging.DEBUG)\n"
+        f"log_handlers.set_ring_buffer_handler({ring_file!r}, logger=logger, fmt='%(message)s', size=64 * 1024)\n"
+        "for n in range(10000):\n"
+        "    logger.debug('debug record %d', n)\n"
+        "os.kill(os.getpid(), signal.SIGKILL)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, env=dict(os.environ))
+    assert result.returncode == -signal.SIGKILL, result.stderr
+    records = log_handlers.read_ring_buffer(ring_file)
+    assert records[-1] == "debug record 9999"
+    assert records == [f"debug record {n}" for n in range(10000 - len(records), 10000)]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_ring_buffer_handler_fork(tmp_path: pathlib.Path) -> None:
+    ring_file = str(tmp_path / "flight.ring")
+    handler = log_handlers.MmapRingBufferHandler(ring_file, size=1024)
+    try:
+        handler.emit(logging.makeLogRecord(dict(msg="parent")))
+        pid = os.fork()
+        if pid == 0:
+            try:
+                handler.emit(logging.makeLogRecord(dict(msg="child")))
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        handler.emit(logging.makeLogRecord(dict(msg="parent again")))
+    finally:
+        handler.close()
+    assert log_handlers.read_ring_buffer(ring_file) == ["parent", "parent again"]
+    assert log_handlers.read_ring_buffer(f"{ring_file}.{pid}") == ["child"]
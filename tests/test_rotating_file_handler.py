@@ -0,0 +1,88 @@
+# STDLIB
+import gzip
+import logging
+import lzma
+import pathlib
+import threading
+import time
+from typing import List
+
+# EXT
+import pytest
+
+# OWN
+from lib_log_utils import log_handlers
+
+
+def emit(handler: logging.Handler, messages: List[str]) -> None:
+    for message in messages:
+        handler.handle(logging.makeLogRecord(dict(msg=message, levelno=logging.INFO)))
+
+
+def read_all(handler: log_handlers.RotatingFileHandler) -> List[str]:
+    """returns the lines of all segments and the current file, the oldest first"""
+    lines: List[str] = []
+    for segment in handler.get_segments():
+        if segment.endswith(".gz"):
+            lines.extend(gzip.open(segment, "rt", encoding="utf-8").read().splitlines())
+        elif segment.endswith(".xz"):
+            lines.extend(lzma.open(segment, "rt", encoding="utf-8").read().splitlines())
+        else:
+            lines.extend(pathlib.Path(segment).read_text(encoding="utf-8").splitlines())
+    lines.extend(pathlib.Path(handler.baseFilename).read_text(encoding="utf-8").splitlines())
+    return lines
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "lzma"])
+@pytest.mark.parametrize("buffer_size", [0, 300])
+def test_rotating_file_handler_size(tmp_path: pathlib.Path, compression: str, buffer_size: int) -> None:
+    messages = [f"record {number:04d} with some text" for number in range(500)]
+    handler = log_handlers.RotatingFileHandler(str(tmp_path / "size.log"), max_bytes=1000, buffer_size=buffer_size, flush_interval=0, compression=compression)
+    emit(handler, messages)
+    handler.close()
+    assert read_all(handler) == messages
+    suffix = {None: "", "gzip": ".gz", "lzma": ".xz"}[compression]
+    assert all(segment.endswith(suffix) for segment in handler.get_segments())
+    if compression is None:
+        assert all(pathlib.Path(segment).stat().st_size <= 1000 for segment in handler.get_segments())
+
+
+def test_rotating_file_handler_retention(tmp_path: pathlib.Path) -> None:
+    handler = log_handlers.RotatingFileHandler(str(tmp_path / "retention.log"), max_bytes=1000, max_total_bytes=3000)
+    emit(handler, [f"record {number:04d} with some text" for number in range(500)])
+    handler.close()
+    segments = handler.get_segments()
+    assert 2 <= len(segments) <= 3
+    assert sum(pathlib.Path(segment).stat().st_size for segment in segments) <= 3000
+    # the newest records are kept
+    assert read_all(handler)[-1] == "record 0499 with some text"
+
+
+def test_rotating_file_handler_interval(tmp_path: pathlib.Path) -> None:
+    handler = log_handlers.RotatingFileHandler(str(tmp_path / "interval.log"), rotate_interval=0.05)
+    emit(handler, ["first"])
+    time.sleep(0.1)
+    emit(handler, ["second"])
+    handler.close()
+    assert len(handler.get_segments()) == 1
+    assert read_all(handler) == ["first", "second"]
+
+
+def test_rotating_file_handler_compression_does_not_block_emit(tmp_path: pathlib.Path) -> None:
+    compression_may_finish = threading.Event()
+
+    class SlowCompressionHandler(log_handlers.RotatingFileHandler):
+        def _compress(self, segment: str) -> None:
+            compression_may_finish.wait(10)
+            super()._compress(segment)
+
+    handler = SlowCompressionHandler(str(tmp_path / "slow.log"), max_bytes=1000, compression="gzip")
+    messages = [f"record {number:04d} with some text" for number in range(500)]
+    start = time.perf_counter()
+    emit(handler, messages)
+    # all records are written and rotated, while the first compression is still waiting
+    assert time.perf_counter() - start < 5
+    assert not compression_may_finish.is_set()
+    compression_may_finish.set()
+    handler.close()
+    assert read_all(handler) == messages
@@ -0,0 +1,92 @@
+# STDLIB
+import io
+import logging
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+# EXT
+import pytest
+
+# OWN
+import lib_log_utils
+from lib_log_utils import log_handlers
+from lib_log_utils import log_shell_lib
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="the shell library needs bash")
+
+fmt_conformance = "[%(levelname)-8s][%(hostname)s]: %(message)s"
+field_styles: Dict[str, Dict[str, Any]] = {"levelname": {"color": "yellow"}, "hostname": {"color": "blue"}}
+level_styles: Dict[str, Dict[str, Any]] = {"info": {}, "warning": {"color": "red", "bright": True}, "error": {"background": "red"}}
+
+
+def get_messages(n_messages: int = 60) -> List[Tuple[str, int]]:
+    """random messages with long words, runs of spaces, tabs, empty and whitespace only lines and non ascii characters"""
+    rnd = random.Random(4711)
+    words = ["a", "ham", "spam", "eggs", "täst", "x" * 23, "y" * 61, "  ", "\t", "word\tword", "   "]
+    levels = [logging.INFO, logging.WARNING, logging.ERROR]
+    l_messages = ["", "\n", "   ", "single", "trailing newline\n", "\ttabbed\n\n  indented  "]
+    for _ in range(n_messages):
+        l_lines = [" ".join(rnd.choice(words) for _ in range(rnd.randint(0, 14))) for _ in range(rnd.randint(1, 3))]
+        l_messages.append("\n".join(l_lines))
+    return [(message, levels[index % len(levels)]) for index, message in enumerate(l_messages)]
+
+
+def log_with_python(messages: List[Tuple[str, int]], width: int, wrap: bool, banner: bool, colored: bool) -> List[str]:
+    logger = logging.getLogger("test_shell_lib")
+    logger.propagate = False
+    logger.setLevel(1)
+    stream = io.StringIO()
+    if colored:
+        handler = log_handlers.set_stream_handler_color(
+            logger, stream=stream, level=1, fmt=fmt_conformance, field_styles=field_styles, level_styles=level_styles  # type: ignore
+        )
+    else:
+        handler = log_handlers.set_stream_handler(logger, stream=stream, level=1, fmt=fmt_conformance)  # type: ignore
+    try:
+        for message, level in messages:
+            lib_log_utils.log_level(message, level, width=width, wrap=wrap, logger=logger, banner=banner)
+    finally:
+        logger.removeHandler(handler)
+    return stream.getvalue().splitlines()
+
+
+def log_with_shell_lib(messages: List[Tuple[str, int]], width: int, wrap: bool, banner: bool, colored: bool) -> List[str]:
+    shell_lib = log_shell_lib.generate_shell_lib(
+        fmt=fmt_conformance, width=width, wrap=wrap, quiet=False, level=1, colored=colored, field_styles=field_styles, level_styles=level_styles
+    )
+    l_commands = [f"log_level {logging.getLevelName(level)} {log_shell_lib.shell_quote(message)} {int(banner)}" for message, level in messages]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path_shell_lib = os.path.join(tmp_dir, "log_lib.sh")
+        with open(path_shell_lib, "w", encoding="utf-8") as shell_lib_file:
+            shell_lib_file.write(shell_lib)
+        script = f". {log_shell_lib.shell_quote(path_shell_lib)}\n" + "\n".join(l_commands) + "\n"
+        env = {key: value for key, value in os.environ.items() if not key.startswith("COLOREDLOGS_")}
+        env["LC_ALL"] = "C.UTF-8"
+        result = subprocess.run(["bash", "-c", script], check=True, capture_output=True, env=env)
+    assert result.stdout == b""
+    return result.stderr.decode("utf-8").splitlines()
+
+
+@pytest.mark.parametrize("width", [10, 17, 40])
+@pytest.mark.parametrize("wrap", [True, False])
+@pytest.mark.parametrize("banner", [True, False])
+def test_shell_lib_conformance(width: int, wrap: bool, banner: bool) -> None:
+    messages = get_messages()
+    assert log_with_shell_lib(messages, width, wrap, banner, colored=False) == log_with_python(messages, width, wrap, banner, colored=False)
+
+
+@pytest.mark.parametrize("banner", [True, False])
+def test_shell_lib_conformance_colored(banner: bool) -> None:
+    messages = get_messages(n_messages=20)
+    assert log_with_shell_lib(messages, 30, True, banner, colored=True) == log_with_python(messages, 30, True, banner, colored=True)
+
+
+def test_shell_lib_quiet_and_level() -> None:
+    shell_lib = log_shell_lib.generate_shell_lib(fmt="%(message)s", quiet=False, level=logging.WARNING, colored=False)
+    script = shell_lib + "\nlog_info hidden\nlog_warning shown\nbanner_error banner\n_LLU_QUIET=1\nlog_error quiet\n"
+    result = subprocess.run(["bash", "-c", script], check=True, capture_output=True)
+    assert result.stderr.decode("utf-8").split() == ["shown"] + ["*" * 140] + ["*", "banner", "*"] + ["*" * 140]